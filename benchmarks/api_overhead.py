@@ -0,0 +1,92 @@
+"""
+API层开销基准测试
+
+以 BROWSER_ENGINE=simulated 启动服务后运行本脚本：每个工作协程反复执行 创建标签页 -> 获取HTML -> 关闭标签页，
+分别统计三个路由的延迟和整体吞吐量。模拟引擎不启动浏览器，测得的是FastAPI路由、访问调度和标签页登记表本身的开销；
+通过 SIM_* 环境变量加入导航耗时、挑战和故障注入后，也可以用来对这些路径做压力测试。
+
+    HOST_RATE_LIMIT_DEFAULT=0 BROWSER_ENGINE=simulated SIM_NAVIGATION_LATENCY=0 SIM_ACTION_LATENCY=0 python main.py
+    python benchmarks/api_overhead.py --concurrency 1,16,64,256 --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from engine_capacity import http_request, percentile
+
+ROUTES = ("create_tab", "get_tab_html", "close_tab")
+
+
+async def run_level(server: str, url: str, concurrency: int, total: int) -> dict:
+    """以固定并发度执行完整的标签页生命周期，统计各路由延迟"""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    counter = iter(range(total))
+
+    async def timed(route: str, method: str, path: str, body=None) -> bool:
+        started = time.perf_counter()
+        try:
+            status, _ = await http_request(server, method, path, body)
+        except OSError:
+            status = None
+        if status != 200:
+            errors[route] += 1
+            return False
+        latencies[route].append(time.perf_counter() - started)
+        return True
+
+    async def worker():
+        for i in counter:
+            name = f"overhead-{concurrency}-{i}"
+            if not await timed("create_tab", "POST", "/tabs/", {"url": url, "tab_name": name}):
+                continue
+            await timed("get_tab_html", "GET", f"/tabs/{name}/html")
+            await timed("close_tab", "DELETE", f"/tabs/{name}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    requests = sum(len(v) for v in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "throughput": round(requests / elapsed, 1) if elapsed else 0.0,
+        "routes": {
+            route: {
+                "ok": len(latencies[route]),
+                "errors": errors[route],
+                "p50_ms": round(statistics.median(latencies[route]) * 1000, 2) if latencies[route] else None,
+                "p95_ms": round(percentile(latencies[route], 95) * 1000, 2) if latencies[route] else None,
+            }
+            for route in ROUTES
+        },
+    }
+
+
+async def main(args):
+    status, content = await http_request(args.server, "GET", "/status")
+    engine = json.loads(content).get("engine", "drission") if status == 200 else "unknown"
+    print(f"服务: {args.server}  引擎: {engine}")
+    if engine != "simulated":
+        print("提示: 未使用模拟引擎，结果包含真实浏览器的耗时")
+
+    print(f"{'并发':>6} {'吞吐(次/秒)':>12} {'路由':>14} {'成功':>7} {'错误':>6} {'P50(ms)':>9} {'P95(ms)':>9}")
+    for level in args.concurrency:
+        r = await run_level(args.server, args.url, level, args.iterations)
+        for index, (route, stats) in enumerate(r["routes"].items()):
+            head = f"{r['concurrency']:>6} {r['throughput']:>12}" if index == 0 else f"{'':>6} {'':>12}"
+            print(f"{head} {route:>14} {stats['ok']:>7} {stats['errors']:>6} "
+                  f"{stats['p50_ms']!s:>9} {stats['p95_ms']!s:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API层开销基准测试")
+    parser.add_argument("--server", default="http://127.0.0.1:9850", help="服务地址")
+    parser.add_argument("--url", default="http://bench.test/", help="标签页访问的页面（模拟引擎不会真正访问）")
+    parser.add_argument("--concurrency", default="1,16,64",
+                        type=lambda s: [int(x) for x in s.split(",") if x.strip()], help="逗号分隔的并发度列表")
+    parser.add_argument("--iterations", type=int, default=1000, help="每个并发度执行的生命周期次数")
+    asyncio.run(main(parser.parse_args()))
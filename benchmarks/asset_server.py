@@ -0,0 +1,77 @@
+"""
+共享资源缓存的本地替身服务器
+
+提供一个引用多个CSS/JS/字体资源的页面，各资源带有不同的缓存头，并在 /__stats 中统计每个资源被下载的次数。
+以 ASSET_CACHE_ENABLED=true 启动服务后，用多个标签页（或不同的浏览器上下文）访问该页面：
+可缓存的资源在 /__stats 中只应被下载一次，GET /assets/ 中的 hits 和 bytes_saved 随之增长。
+
+    python benchmarks/asset_server.py --port 8000
+    curl -X POST http://127.0.0.1:9850/tabs/ -H 'Content-Type: application/json' \\
+        -d '{"url": "http://127.0.0.1:8000/", "tab_name": "a1", "context": "c1"}'
+    curl -X POST http://127.0.0.1:9850/tabs/ -H 'Content-Type: application/json' \\
+        -d '{"url": "http://127.0.0.1:8000/", "tab_name": "a2", "context": "c2"}'
+    curl http://127.0.0.1:8000/__stats
+    curl http://127.0.0.1:9850/assets/
+"""
+import argparse
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><title>asset cache stand-in</title>
+<link rel="stylesheet" href="/static/app.css">
+<link rel="stylesheet" href="/static/private.css">
+<script src="/static/app.js"></script>
+<script src="/static/no-store.js"></script>
+</head><body><p class="font">asset cache stand-in</p></body></html>
+"""
+
+# 路径 -> (Content-Type, Cache-Control, 响应体)
+ASSETS = {
+    "/static/app.css": ("text/css", "public, max-age=3600",
+                        b"@font-face{font-family:f;src:url(/static/font.woff2)}.font{font-family:f}" + b" " * 50000),
+    "/static/app.js": ("application/javascript", "public, max-age=3600", b"window.appLoaded = true;" + b" " * 200000),
+    "/static/font.woff2": ("font/woff2", "public, max-age=31536000, immutable", b"\0" * 30000),
+    "/static/private.css": ("text/css", "private, max-age=3600", b"p{color:red}"),
+    "/static/no-store.js": ("application/javascript", "no-store", b"window.noStore = true;"),
+}
+
+downloads = Counter()
+downloads_lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/__stats":
+            with downloads_lock:
+                body = json.dumps(downloads, indent=2).encode()
+            return self._send(200, "application/json", "no-store", body)
+        if self.path == "/":
+            return self._send(200, "text/html", "no-store", PAGE)
+        asset = ASSETS.get(self.path)
+        if asset is None:
+            return self._send(404, "text/plain", "no-store", b"not found")
+        with downloads_lock:
+            downloads[self.path] += 1
+        self._send(200, *asset)
+
+    def _send(self, status: int, content_type: str, cache_control: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Cache-Control", cache_control)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="共享资源缓存的本地替身服务器")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    print(f"替身服务器: http://127.0.0.1:{args.port}/  下载统计: http://127.0.0.1:{args.port}/__stats")
+    ThreadingHTTPServer(("0.0.0.0", args.port), Handler).serve_forever()
@@ -0,0 +1,127 @@
+"""
+浏览器引擎并发容量基准测试
+
+分别以 BROWSER_ENGINE=drission 和 BROWSER_ENGINE=cdp 启动服务后运行本脚本，比较两种引擎在不同并发度下的
+吞吐量和延迟。脚本只依赖标准库，用法示例：
+
+    python benchmarks/engine_capacity.py --server http://127.0.0.1:9850 --url http://127.0.0.1:8000/ \\
+        --tabs 8 --concurrency 1,8,32,64 --requests 200
+
+建议以 HOST_RATE_LIMIT_DEFAULT=0、CHALLENGE_PROBE_AFTER=0 启动服务，并使用本地静态页面作为目标，
+使测量结果反映引擎本身而不是站点限速或挑战等待。
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+async def http_request(server: str, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, bytes]:
+    """发送一个HTTP/1.1请求并返回(状态码, 响应体)"""
+    parts = urlsplit(server)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    payload = json.dumps(body).encode() if body is not None else b''
+    head = (f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+    writer.write(head.encode() + payload)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    header, _, content = data.partition(b"\r\n\r\n")
+    status = int(header.split(b" ", 2)[1])
+    if b"transfer-encoding: chunked" in header.lower():
+        content = dechunk(content)
+    return status, content
+
+
+def dechunk(data: bytes) -> bytes:
+    """解码chunked响应体"""
+    result = b''
+    while data:
+        size_line, _, data = data.partition(b"\r\n")
+        size = int(size_line.split(b";")[0], 16)
+        if size == 0:
+            break
+        result += data[:size]
+        data = data[size + 2:]
+    return result
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def run_level(server: str, tab_names: List[str], concurrency: int, total: int) -> dict:
+    """以固定并发度持续请求标签页HTML，统计吞吐量和延迟"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                status, _ = await http_request(server, "GET", f"/tabs/{tab_names[i % len(tab_names)]}/html")
+                if status != 200:
+                    errors += 1
+                    continue
+            except OSError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+async def main(args):
+    status, content = await http_request(args.server, "GET", "/status")
+    engine = json.loads(content).get("engine", "drission") if status == 200 else "unknown"
+    print(f"服务: {args.server}  引擎: {engine}")
+
+    tab_names = [f"bench-{i}" for i in range(args.tabs)]
+    created = await asyncio.gather(*[
+        http_request(args.server, "POST", "/tabs/", {"url": args.url, "tab_name": name}) for name in tab_names
+    ])
+    failed = [name for name, (status, _) in zip(tab_names, created) if status != 200]
+    if failed:
+        print(f"创建标签页失败: {', '.join(failed)}")
+    tab_names = [name for name in tab_names if name not in failed]
+
+    try:
+        if tab_names:
+            print(f"{'并发':>6} {'请求':>6} {'错误':>6} {'吞吐(次/秒)':>12} {'P50(ms)':>10} {'P95(ms)':>10} {'最大(ms)':>10}")
+            for level in args.concurrency:
+                r = await run_level(args.server, tab_names, level, args.requests)
+                print(f"{r['concurrency']:>6} {r['requests']:>6} {r['errors']:>6} {r['throughput']:>12} "
+                      f"{r['p50_ms']!s:>10} {r['p95_ms']!s:>10} {r['max_ms']!s:>10}")
+    finally:
+        await asyncio.gather(*[http_request(args.server, "DELETE", f"/tabs/{name}") for name in tab_names])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="浏览器引擎并发容量基准测试")
+    parser.add_argument("--server", default="http://127.0.0.1:9850", help="服务地址")
+    parser.add_argument("--url", required=True, help="标签页访问的目标页面")
+    parser.add_argument("--tabs", type=int, default=8, help="预先创建的标签页数量")
+    parser.add_argument("--concurrency", default="1,8,32,64",
+                        type=lambda s: [int(x) for x in s.split(",") if x.strip()], help="逗号分隔的并发度列表")
+    parser.add_argument("--requests", type=int, default=200, help="每个并发度发送的请求数")
+    asyncio.run(main(parser.parse_args()))
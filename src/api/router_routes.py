@@ -0,0 +1,256 @@
+"""分片路由器的API路由：标签页请求转发到所属分片，聚合类请求分发到所有分片后合并"""
+import asyncio
+import json
+from typing import Dict, Optional, Tuple
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from src.api.schemas import ShardJoinRequest
+from src.config.settings import REQUEST_TIMEOUT_HEADER, TAB_EVENT_KEEPALIVE
+from src.core.shard_router import ShardUnavailable, shard_router
+from src.core.tab_events import TAB_EVENT_TYPES
+
+tabs_proxy = APIRouter(prefix="/tabs", tags=["tabs"])
+contexts_proxy = APIRouter(prefix="/contexts", tags=["contexts"])
+shards_router = APIRouter(prefix="/shards", tags=["shards"])
+fetch_proxy = APIRouter(prefix="/fetch", tags=["fetch"])
+aggregate_router = APIRouter(tags=["aggregate"])
+
+# 转发给分片的请求头
+FORWARDED_HEADERS = ('content-type', REQUEST_TIMEOUT_HEADER.lower())
+
+
+def _forward_headers(http_request: Request) -> Dict[str, str]:
+    return {k: v for k, v in http_request.headers.items() if k.lower() in FORWARDED_HEADERS}
+
+
+def _to_response(response: httpx.Response) -> Response:
+    """把分片的响应原样返回给客户端"""
+    return Response(content=response.content, status_code=response.status_code,
+                    media_type=response.headers.get('content-type'))
+
+
+async def _forward_tab(tab_name: str, http_request: Request) -> Tuple[str, httpx.Response]:
+    """把请求转发到标签页所在的分片"""
+    body = await http_request.body()
+    try:
+        return await shard_router.forward_tab(
+            tab_name, http_request.method, http_request.url.path, params=http_request.query_params,
+            content=body or None, headers=_forward_headers(http_request)
+        )
+    except ShardUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _tab_name_from_body(http_request: Request) -> str:
+    """从JSON请求体中读取tab_name"""
+    try:
+        tab_name = json.loads(await http_request.body()).get('tab_name')
+    except (ValueError, AttributeError):
+        tab_name = None
+    if not tab_name:
+        raise HTTPException(status_code=400, detail="请求体中缺少tab_name")
+    return tab_name
+
+
+@tabs_proxy.post("/")
+async def create_tab(http_request: Request):
+    """在按tab_name一致性哈希选出的分片上创建标签页"""
+    tab_name = await _tab_name_from_body(http_request)
+    url, response = await _forward_tab(tab_name, http_request)
+    if response.status_code == 200:
+        shard_router.placement[tab_name] = url
+    return _to_response(response)
+
+
+@tabs_proxy.get("/", response_model=dict)
+async def list_tabs():
+    """合并所有分片的标签页列表"""
+    results = await shard_router.fanout("GET", "/tabs/")
+    shards = {url: r["body"].get("tabs", []) for url, r in results.items() if r["status_code"] == 200}
+    return {"tabs": [tab for tabs in shards.values() for tab in tabs], "shards": shards}
+
+
+@tabs_proxy.get("/events")
+async def stream_tab_events(http_request: Request, types: Optional[str] = None):
+    """合并所有分片的SSE标签页事件流"""
+    if types:
+        unknown = {t.strip() for t in types.split(',') if t.strip()} - set(TAB_EVENT_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的事件类型: {', '.join(sorted(unknown))}")
+
+    urls = [url for url, shard in shard_router.shards.items() if shard["healthy"]]
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(url: str):
+        try:
+            async with shard_router.client.stream("GET", f"{url}/tabs/events", params=http_request.query_params,
+                                                  timeout=None) as response:
+                block = []
+                async for line in response.aiter_lines():
+                    if line:
+                        block.append(line)
+                        continue
+                    # 分片自己的心跳不转发，由路由器统一发送
+                    if block and not block[0].startswith(':'):
+                        await queue.put("\n".join(block) + "\n\n")
+                    block = []
+        except Exception as e:
+            logger.warning(f"订阅分片 {url} 的事件流中断: {e}")
+
+    async def event_stream():
+        tasks = [asyncio.create_task(pump(url)) for url in urls]
+        try:
+            while not await http_request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), TAB_EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@tabs_proxy.post("/click/")
+async def click_on_element(http_request: Request):
+    """转发点击请求到标签页所在分片"""
+    tab_name = await _tab_name_from_body(http_request)
+    _, response = await _forward_tab(tab_name, http_request)
+    return _to_response(response)
+
+
+@tabs_proxy.api_route("/{tab_name}/{action:path}", methods=["GET", "POST", "PUT", "DELETE"])
+async def forward_tab_action(tab_name: str, action: str, http_request: Request):
+    """转发标签页的HTML、DOM变更、批量操作等请求"""
+    _, response = await _forward_tab(tab_name, http_request)
+    return _to_response(response)
+
+
+@tabs_proxy.delete("/{tab_name}")
+async def close_tab(tab_name: str, http_request: Request):
+    """关闭标签页所在分片上的标签页"""
+    _, response = await _forward_tab(tab_name, http_request)
+    if response.status_code == 200:
+        shard_router.placement.pop(tab_name, None)
+    return _to_response(response)
+
+
+@contexts_proxy.get("/", response_model=dict)
+async def list_contexts():
+    """合并所有分片的浏览器上下文，同名上下文在每个分片上是相互独立的"""
+    results = await shard_router.fanout("GET", "/contexts/")
+    merged: Dict[str, dict] = {}
+    for url, r in results.items():
+        if r["status_code"] != 200:
+            continue
+        for name, context in r["body"].get("contexts", {}).items():
+            entry = merged.setdefault(name, {"tabs": [], "shards": {}})
+            entry["tabs"].extend(context["tabs"])
+            entry["shards"][url] = context["context_id"]
+    return {"contexts": merged}
+
+
+@contexts_proxy.delete("/{context}", response_model=dict)
+async def close_context(context: str):
+    """在所有分片上销毁同名浏览器上下文"""
+    results = await shard_router.fanout("DELETE", f"/contexts/{context}")
+    closed = {url: r["body"].get("closed_tabs", []) for url, r in results.items() if r["status_code"] == 200}
+    if not closed:
+        raise HTTPException(status_code=404, detail=f"浏览器上下文 '{context}' 未找到")
+    for tabs in closed.values():
+        for tab_name in tabs:
+            shard_router.placement.pop(tab_name, None)
+    return {
+        "code": 0,
+        "message": "浏览器上下文已销毁",
+        "context": context,
+        "closed_tabs": [tab for tabs in closed.values() for tab in tabs]
+    }
+
+
+@fetch_proxy.post("/")
+async def fetch_page(http_request: Request):
+    """按URL一致性哈希选择分片，同一页面总是落在同一分片上，以便命中其响应缓存"""
+    body = await http_request.body()
+    try:
+        url = json.loads(body).get('url')
+    except (ValueError, AttributeError):
+        url = None
+    if not url:
+        raise HTTPException(status_code=400, detail="请求体中缺少url")
+    shard = shard_router.ring.get(url)
+    if shard is None:
+        raise HTTPException(status_code=503, detail="没有可用的分片")
+    try:
+        response = await shard_router.forward(shard, "POST", http_request.url.path, content=body,
+                                              headers=_forward_headers(http_request))
+    except ShardUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _to_response(response)
+
+
+async def fanout_request(http_request: Request):
+    """把请求分发到所有分片，按分片返回各自的结果"""
+    results = await shard_router.fanout(http_request.method, http_request.url.path,
+                                        params=http_request.query_params, content=await http_request.body() or None)
+    return {"code": 0, "shards": {url: r["body"] for url, r in results.items()}}
+
+
+# 各分片独立维护的状态，按分片分别返回
+for path, method in (
+        ("/profile/", "GET"),
+        ("/profile/purge", "POST"),
+        ("/profile/sync", "POST"),
+        ("/challenges/profile", "GET"),
+        ("/challenges/profile/{domain}", "DELETE"),
+        ("/challenges/solver", "GET"),
+        ("/scheduler/hosts", "GET"),
+        ("/scheduler/refresh", "GET"),
+        ("/assets/", "GET"),
+        ("/assets/", "DELETE"),
+        ("/browsers/", "GET"),
+        ("/browsers/rules", "PUT"),
+        ("/browsers/rules/{pattern}", "DELETE"),
+        ("/fetch/cache", "GET"),
+        ("/fetch/cache", "DELETE"),
+):
+    aggregate_router.add_api_route(path, fanout_request, methods=[method], response_model=dict)
+
+
+@shards_router.get("/", response_model=dict)
+async def list_shards():
+    """获取分片状态和标签页分布"""
+    return {"code": 0, **shard_router.stats()}
+
+
+@shards_router.post("/", response_model=dict)
+async def join_shard(request: ShardJoinRequest):
+    """加入新分片，启用自动重新平衡时会把哈希到该分片的标签页迁移过去"""
+    shard = await shard_router.join(request.url)
+    return {"code": 0, "url": request.url, **shard}
+
+
+@shards_router.delete("/", response_model=dict)
+async def leave_shard(url: str):
+    """让分片离开，先把其上的标签页迁移到其他分片"""
+    try:
+        moves = await shard_router.leave(url)
+        return {"code": 0, "url": url, "moves": moves}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@shards_router.post("/rebalance", response_model=dict)
+async def rebalance_shards():
+    """立即把归属与哈希环不一致的标签页迁移到对应分片"""
+    moves = await shard_router.rebalance()
+    return {"code": 0, "moves": moves}
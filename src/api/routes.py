@@ -1,28 +1,129 @@
 """API路由处理器"""
 import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from loguru import logger
 
-from src.api.schemas import ClickRequest, NewTabRequest
+from src.api.schemas import (
+    ActionsRequest, BrowserRuleRequest, ClickRequest, FetchRequest, MoveTabRequest, NewTabRequest,
+    RefreshScheduleRequest
+)
+from src.config.settings import (
+    DEBUG_ENDPOINTS_ENABLED, DEBUG_MAX_SECONDS, DEBUG_PROFILE_INTERVAL, DEBUG_TRACE_CATEGORIES,
+    DISCONNECT_POLL_INTERVAL, REQUEST_DEFAULT_TIMEOUT, REQUEST_TIMEOUT_HEADER, TAB_EVENT_KEEPALIVE
+)
+from src.core.asset_cache import asset_cache
 from src.core.browser_manager import browser_manager
+from src.core.challenge_solver import challenge_solver
+from src.core.deadline import ClientDisconnected, Deadline, DeadlineExceeded, RequestAborted, deadline_scope
+from src.core.engine_base import call_engine
+from src.core.refresh_scheduler import refresh_scheduler
+from src.core.response_cache import identity_fingerprint, response_cache
+from src.core.tab_events import TAB_EVENT_TYPES, tab_event_bus
+from src.utils.stack_sampler import fold, sample_stacks
 
 router = APIRouter(prefix="/tabs", tags=["tabs"])
+contexts_router = APIRouter(prefix="/contexts", tags=["contexts"])
+profile_router = APIRouter(prefix="/profile", tags=["profile"])
+challenges_router = APIRouter(prefix="/challenges", tags=["challenges"])
+scheduler_router = APIRouter(prefix="/scheduler", tags=["scheduler"])
+assets_router = APIRouter(prefix="/assets", tags=["assets"])
+debug_router = APIRouter(prefix="/debug", tags=["debug"])
+browsers_router = APIRouter(prefix="/browsers", tags=["browsers"])
+fetch_router = APIRouter(prefix="/fetch", tags=["fetch"])
+
+
+def _request_deadline(http_request: Request) -> Deadline:
+    """从请求头或timeout查询参数解析请求的截止时间"""
+    value = http_request.headers.get(REQUEST_TIMEOUT_HEADER) or http_request.query_params.get('timeout')
+    timeout = REQUEST_DEFAULT_TIMEOUT
+    if value:
+        try:
+            timeout = float(value)
+        except ValueError:
+            logger.warning(f"忽略无效的截止时间: {value}")
+    return Deadline(timeout if timeout > 0 else None)
+
+
+async def _watch_disconnect(http_request: Request, deadline: Deadline, task: asyncio.Task):
+    """客户端断开连接时取消仍在进行的浏览器工作"""
+    while not task.done():
+        if await http_request.is_disconnected():
+            logger.info(f"客户端已断开，放弃请求 {http_request.url.path}")
+            deadline.cancel(ClientDisconnected("客户端已断开连接"))
+            task.cancel()
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+async def _run_blocking(http_request: Request, func: Callable, *args,
+                        before: Optional[Callable[[], Awaitable]] = None, tab_name: Optional[str] = None) -> Any:
+    """
+    执行浏览器操作（阻塞调用放到工作线程，协程直接在事件循环中运行），并传播请求截止时间
+
+    超时或客户端断开时立即返回，同时取消截止时间，使工作线程在下一个检查点退出并释放标签页。
+    指定tab_name时，调用与该标签页的后台刷新互斥，期间该标签页标记为正在使用（不会被冻结），已冻结的标签页先在工作线程中恢复
+    """
+    deadline = _request_deadline(http_request)
+
+    async def run():
+        # 前台请求进行期间，定时刷新暂缓执行
+        with refresh_scheduler.foreground_work():
+            if before is not None:
+                await before()
+            with deadline_scope(deadline):
+                if tab_name is None:
+                    return await call_engine(func, *args)
+                async with refresh_scheduler.tab_lock(tab_name):
+                    with browser_manager.using_tab(tab_name):
+                        await call_engine(browser_manager.thaw_if_frozen, tab_name)
+                        return await call_engine(func, *args)
+
+    task = asyncio.create_task(run())
+    watcher = asyncio.create_task(_watch_disconnect(http_request, deadline, task))
+    try:
+        return await asyncio.wait_for(task, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        deadline.cancel(DeadlineExceeded("请求已超过截止时间"))
+        raise deadline.error
+    except asyncio.CancelledError:
+        if isinstance(deadline.error, ClientDisconnected):
+            raise deadline.error
+        deadline.cancel(ClientDisconnected("请求已被取消"))
+        raise
+    finally:
+        watcher.cancel()
+
+
+def _aborted(e: RequestAborted) -> HTTPException:
+    """把放弃的请求转换为HTTP错误"""
+    return HTTPException(status_code=e.status_code, detail=str(e))
 
 
 @router.post("/", response_model=dict)
-async def create_tab(request: NewTabRequest):
+async def create_tab(request: NewTabRequest, http_request: Request):
     """创建新的浏览器标签页"""
     try:
-        result = await asyncio.to_thread(
+        result = await _run_blocking(
+            http_request,
             browser_manager.create_tab, 
             request.url, 
             request.tab_name, 
             request.cookie,
             request.local_storage,
-            request.user_agent
+            request.user_agent,
+            request.context,
+            request.browser,
+            # 按域名限速，排队等待时不占用工作线程
+            before=lambda: browser_manager.rate_limiter.acquire(request.url)
         )
         return result
+    except RequestAborted as e:
+        raise _aborted(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -36,49 +137,488 @@ async def list_tabs():
     return {"tabs": tabs}
 
 
+def _parse_event_filters(types: Optional[str], tab_name: Optional[str]):
+    """解析逗号分隔的事件过滤参数"""
+    event_types = [t.strip() for t in types.split(',') if t.strip()] if types else None
+    if event_types:
+        unknown = set(event_types) - set(TAB_EVENT_TYPES)
+        if unknown:
+            raise ValueError(f"未知的事件类型: {', '.join(sorted(unknown))}")
+    tab_names = [n.strip() for n in tab_name.split(',') if n.strip()] if tab_name else None
+    return event_types, tab_names
+
+
+@router.get("/events")
+async def stream_tab_events(request: Request, types: Optional[str] = None, tab_name: Optional[str] = None):
+    """以SSE方式推送标签页生命周期事件"""
+    try:
+        event_types, tab_names = _parse_event_filters(types, tab_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    subscription = tab_event_bus.subscribe(event_types, tab_names)
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=TAB_EVENT_KEEPALIVE)
+                if event is None:
+                    # 心跳注释，保持连接不被代理断开
+                    yield ": keepalive\n\n"
+                    continue
+                data = json.dumps(event, ensure_ascii=False)
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n"
+        finally:
+            tab_event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/events/ws")
+async def websocket_tab_events(websocket: WebSocket, types: Optional[str] = None, tab_name: Optional[str] = None):
+    """以WebSocket方式推送标签页生命周期事件"""
+    try:
+        event_types, tab_names = _parse_event_filters(types, tab_name)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    await websocket.accept()
+    subscription = tab_event_bus.subscribe(event_types, tab_names)
+    try:
+        while True:
+            event = await subscription.get(timeout=TAB_EVENT_KEEPALIVE)
+            if event is None:
+                await websocket.send_json({"type": "keepalive"})
+                continue
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        tab_event_bus.unsubscribe(subscription)
+
+
 @router.get("/{tab_name}/html", response_model=dict)
-async def get_tab_html(tab_name: str):
-    """从特定标签页获取HTML内容"""
+async def get_tab_html(tab_name: str, http_request: Request, max_age: Optional[float] = None):
+    """
+    从特定标签页获取HTML内容
+
+    登记了定时刷新的标签页直接返回最新快照；快照比max_age秒更旧时重新渲染（max_age=0强制重新渲染）
+    """
     try:
+        job = refresh_scheduler.snapshot(tab_name, max_age)
+        if job is not None and tab_name in browser_manager.tabs_pool:
+            return {"code": 0, "tab_name": tab_name, "html": job.html, "snapshot": True,
+                    "refreshed_at": job.refreshed_at, "age": round(job.age(), 3)}
         tab = browser_manager.get_tab(tab_name)
-        html = await asyncio.to_thread(browser_manager.get_tab_html, tab)
-        return {"code": 0, "tab_name": tab_name, "html": html}
+        html = await _run_blocking(http_request, browser_manager.get_tab_html, tab, tab_name=tab_name)
+        refresh_scheduler.store(tab_name, html)
+        return {"code": 0, "tab_name": tab_name, "html": html, "snapshot": False}
+    except RequestAborted as e:
+        raise _aborted(e)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取HTML失败: {str(e)}")
 
 
+@router.get("/{tab_name}/changes", response_model=dict)
+async def get_tab_changes(tab_name: str, http_request: Request, since: int = 0, epoch: Optional[str] = None):
+    """获取标签页自since序号以来的DOM增量变更"""
+    try:
+        tab = browser_manager.get_tab(tab_name)
+        result = await _run_blocking(http_request, browser_manager.get_tab_changes, tab, since, epoch,
+                                     tab_name=tab_name)
+        return {"code": 0, "tab_name": tab_name, **result}
+    except RequestAborted as e:
+        raise _aborted(e)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取DOM变更失败: {str(e)}")
+
+
+@router.get("/{tab_name}/state", response_model=dict)
+async def export_tab_state(tab_name: str):
+    """导出标签页的URL、Cookie、本地存储和User-Agent，供分片路由器迁移标签页"""
+    try:
+        state = await call_engine(browser_manager.export_tab, tab_name)
+        return {"code": 0, **state}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导出标签页状态失败: {str(e)}")
+
+
 @router.post("/click/", response_model=dict)
-async def click_on_element(request: ClickRequest):
+async def click_on_element(request: ClickRequest, http_request: Request):
     """在特定标签页中点击元素"""
     try:
         tab = browser_manager.get_tab(request.tab_name)
-        await asyncio.to_thread(browser_manager.click_element, tab, request.selector)
+        try:
+            await _run_blocking(http_request, browser_manager.click_element, tab, request.selector,
+                                tab_name=request.tab_name)
+        finally:
+            # 点击可能改变了页面，定时刷新的旧快照作废
+            refresh_scheduler.invalidate(request.tab_name)
         logger.debug(f"{tab.url} 页面点击成功.")
         return {
             "code": 0, 
             "message": f"在标签页 {request.tab_name} 上点击了选择器为 {request.selector} 的元素"
         }
+    except RequestAborted as e:
+        raise _aborted(e)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         if 'tab' in locals() and tab:
             try:
-                tab.close()
+                await call_engine(tab.close)
                 logger.info(f"异常中已关闭标签页: {request.tab_name}")
             except Exception as cleanup_error:
                 logger.error(f"清理标签页 {request.tab_name} 时出错: {cleanup_error}")
         raise HTTPException(status_code=500, detail=f"错误: {str(e)}")
 
 
+@router.post("/{tab_name}/actions", response_model=dict)
+async def run_tab_actions(tab_name: str, request: ActionsRequest, http_request: Request):
+    """在标签页中一次性执行一组操作步骤"""
+    try:
+        tab = browser_manager.get_tab(tab_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        result = await _run_blocking(
+            http_request,
+            browser_manager.run_actions,
+            tab,
+            [step.model_dump() for step in request.steps],
+            request.check_challenge,
+            request.stop_on_error,
+            tab_name=tab_name
+        )
+        return {"code": 0 if result["completed"] else 1, "tab_name": tab_name, **result}
+    except RequestAborted as e:
+        raise _aborted(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"执行操作失败: {str(e)}")
+    finally:
+        # 操作步骤可能改变了页面，定时刷新的旧快照作废
+        refresh_scheduler.invalidate(tab_name)
+
+
+@router.post("/{tab_name}/move", response_model=dict)
+async def move_tab(tab_name: str, request: MoveTabRequest, http_request: Request):
+    """把标签页移动到有头浏览器（通过noVNC实时调试）或移回无头浏览器"""
+    try:
+        tab = browser_manager.get_tab(tab_name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def acquire_host_slot():
+        # drission引擎读取URL需要一次CDP往返，放到工作线程中
+        url = await asyncio.to_thread(lambda: tab.url)
+        await browser_manager.rate_limiter.acquire(url)
+
+    try:
+        return await _run_blocking(
+            http_request,
+            browser_manager.move_tab,
+            tab_name,
+            request.browser,
+            before=acquire_host_slot,
+            tab_name=tab_name
+        )
+    except RequestAborted as e:
+        raise _aborted(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"移动标签页失败: {str(e)}")
+
+
+@router.put("/{tab_name}/schedule", response_model=dict)
+async def schedule_tab_refresh(tab_name: str, request: RefreshScheduleRequest):
+    """登记标签页的定时刷新，后台以低优先级刷新并保存快照，之后读取HTML直接返回快照"""
+    if tab_name not in browser_manager.tabs_pool:
+        raise HTTPException(status_code=404, detail=f"标签页 '{tab_name}' 未找到")
+    try:
+        job = refresh_scheduler.schedule(tab_name, request.interval, request.jitter, request.wait_for,
+                                         request.wait_timeout)
+        return {"code": 0, "message": "定时刷新已登记", **job.status()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{tab_name}/schedule", response_model=dict)
+async def get_tab_refresh_schedule(tab_name: str):
+    """获取标签页的刷新计划、快照时间和最近一次刷新结果"""
+    job = refresh_scheduler.get(tab_name)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"标签页 '{tab_name}' 没有定时刷新")
+    return {"code": 0, **job.status()}
+
+
+@router.delete("/{tab_name}/schedule", response_model=dict)
+async def unschedule_tab_refresh(tab_name: str):
+    """取消标签页的定时刷新，已保存的快照随之丢弃"""
+    if not refresh_scheduler.unschedule(tab_name):
+        raise HTTPException(status_code=404, detail=f"标签页 '{tab_name}' 没有定时刷新")
+    return {"code": 0, "message": "定时刷新已取消", "tab_name": tab_name}
+
+
 @router.delete("/{tab_name}", response_model=dict)
 async def close_tab(tab_name: str):
     """关闭特定标签页"""
     try:
-        await asyncio.to_thread(browser_manager.close_tab, tab_name)
+        await call_engine(browser_manager.close_tab, tab_name)
+        refresh_scheduler.unschedule(tab_name)
         return {"code": 0, "message": "标签页已关闭", "tab_name": tab_name}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="标签页已关闭")
+
+
+@contexts_router.get("/", response_model=dict)
+async def list_contexts():
+    """列出所有命名浏览器上下文"""
+    return {"contexts": browser_manager.list_contexts()}
+
+
+@contexts_router.delete("/{context}", response_model=dict)
+async def close_context(context: str):
+    """销毁命名浏览器上下文及其中的标签页"""
+    try:
+        closed_tabs = await call_engine(browser_manager.close_context, context)
+        for tab_name in closed_tabs:
+            refresh_scheduler.unschedule(tab_name)
+        return {"code": 0, "message": "浏览器上下文已销毁", "context": context, "closed_tabs": closed_tabs}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"销毁浏览器上下文失败: {str(e)}")
+
+
+@profile_router.get("/", response_model=dict)
+async def get_profile_stats():
+    """获取浏览器配置文件存储占用情况"""
+    stats = await asyncio.to_thread(browser_manager.profile.stats)
+    return {"code": 0, **stats}
+
+
+@profile_router.post("/purge", response_model=dict)
+async def purge_profile():
+    """清理浏览器缓存和可丢弃目录，保留Cookie和登录数据"""
+    try:
+        result = await call_engine(browser_manager.purge_profile)
+        return {"code": 0, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"清理配置文件失败: {str(e)}")
+
+
+@profile_router.post("/sync", response_model=dict)
+async def sync_profile():
+    """tmpfs模式下立即把持久数据同步回磁盘"""
+    try:
+        result = await asyncio.to_thread(browser_manager.profile.sync_to_disk)
+        return {"code": 0, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"同步配置文件失败: {str(e)}")
+
+
+@challenges_router.get("/profile", response_model=dict)
+async def get_challenge_profile():
+    """获取按域名学习到的挑战统计数据和当前检测策略"""
+    profile = browser_manager.challenge_profile
+    return {"code": 0, "enabled": profile.enabled, "domains": profile.snapshot()}
+
+
+@challenges_router.delete("/profile/{domain}", response_model=dict)
+async def reset_challenge_profile(domain: str):
+    """清除某个域名的挑战统计数据，使其重新从完整检测开始"""
+    try:
+        await asyncio.to_thread(browser_manager.challenge_profile.reset, domain)
+        return {"code": 0, "message": "挑战统计数据已清除", "domain": domain}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@challenges_router.get("/solver", response_model=dict)
+async def get_challenge_solver_stats():
+    """获取正在求解的标签页、求解结果计数和各状态耗时"""
+    return {"code": 0, **challenge_solver.stats()}
+
+
+@scheduler_router.get("/hosts", response_model=dict)
+async def get_host_scheduler_stats():
+    """获取各域名的速率限制和排队等待统计"""
+    return {"code": 0, "hosts": browser_manager.rate_limiter.stats()}
+
+
+@scheduler_router.get("/refresh", response_model=dict)
+async def get_refresh_scheduler_stats():
+    """获取所有定时刷新计划、快照年龄和刷新统计"""
+    return {"code": 0, **refresh_scheduler.stats()}
+
+
+@assets_router.get("/", response_model=dict)
+async def get_asset_cache_stats():
+    """获取共享资源缓存的命中率、节省流量和存储占用"""
+    stats = await asyncio.to_thread(asset_cache.stats)
+    return {"code": 0, "enabled": asset_cache.enabled, **stats}
+
+
+@assets_router.delete("/", response_model=dict)
+async def clear_asset_cache():
+    """清空共享资源缓存"""
+    try:
+        removed = await asyncio.to_thread(asset_cache.clear)
+        return {"code": 0, "message": "资源缓存已清空", "removed": removed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"清空资源缓存失败: {str(e)}")
+
+
+@browsers_router.get("/", response_model=dict)
+async def get_browsers():
+    """获取浏览器模式、按域名的路由规则和各浏览器中的标签页"""
+    return {"code": 0, **browser_manager.browser_stats()}
+
+
+@browsers_router.put("/rules", response_model=dict)
+async def set_browser_rule(request: BrowserRuleRequest):
+    """添加或替换按域名选择浏览器的规则，新规则优先匹配，只影响之后创建的标签页"""
+    browser_manager.routing.set_rule(request.pattern, request.browser)
+    return {"code": 0, "rules": browser_manager.routing.list_rules()}
+
+
+@browsers_router.delete("/rules/{pattern}", response_model=dict)
+async def delete_browser_rule(pattern: str):
+    """删除按域名选择浏览器的规则"""
+    if not browser_manager.routing.remove_rule(pattern):
+        raise HTTPException(status_code=404, detail=f"规则 '{pattern}' 未找到")
+    return {"code": 0, "rules": browser_manager.routing.list_rules()}
+
+
+# 同一时间只允许一个调用栈采样和一个性能跟踪，避免叠加开销
+_profile_lock = asyncio.Lock()
+_trace_lock = asyncio.Lock()
+
+
+def _check_debug(seconds: float):
+    """调试端点默认关闭，并限制单次采样时长"""
+    if not DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="调试端点未启用")
+    if not 0 < seconds <= DEBUG_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds 必须在 0 到 {DEBUG_MAX_SECONDS} 之间")
+
+
+@debug_router.get("/profile")
+async def profile_python(seconds: float = 10, interval: float = DEBUG_PROFILE_INTERVAL, thread: Optional[str] = None):
+    """采样Python进程所有线程的调用栈，返回火焰图折叠格式（可用flamegraph.pl或speedscope打开）"""
+    _check_debug(seconds)
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="已有正在进行的采样")
+    async with _profile_lock:
+        counts, rounds = await asyncio.to_thread(sample_stacks, seconds, max(interval, 0.001), thread)
+    return PlainTextResponse(fold(counts), headers={"X-Profile-Samples": str(rounds)})
+
+
+@debug_router.get("/trace", response_model=dict)
+async def trace_tab(tab: str, http_request: Request, seconds: float = 5, categories: Optional[str] = None):
+    """记录标签页的CDP性能跟踪，返回可在DevTools性能面板或Perfetto中打开的跟踪数据"""
+    _check_debug(seconds)
+    if _trace_lock.locked():
+        raise HTTPException(status_code=409, detail="已有正在进行的性能跟踪")
+    try:
+        tab_obj = browser_manager.get_tab(tab)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    included = [c.strip() for c in categories.split(',') if c.strip()] if categories else DEBUG_TRACE_CATEGORIES
+    async with _trace_lock:
+        try:
+            events = await _run_blocking(http_request, browser_manager.trace_tab, tab_obj, seconds, included,
+                                         tab_name=tab)
+        except RequestAborted as e:
+            raise _aborted(e)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"性能跟踪失败: {str(e)}")
+    return {"traceEvents": events, "metadata": {"tab_name": tab, "seconds": seconds, "categories": included}}
+
+
+async def _load_page(request: FetchRequest, isolated: bool = False) -> str:
+    """
+    在临时标签页中打开页面并获取HTML，完成后关闭标签页
+
+    isolated时标签页放在一次性的浏览器上下文中，页面只带有请求本身的身份，完成后连同上下文的Cookie和存储一起销毁
+    """
+    tab_name = f"fetch-{uuid.uuid4().hex[:12]}"
+    context = tab_name if isolated else request.context
+    await browser_manager.rate_limiter.acquire(request.url)
+    try:
+        await call_engine(browser_manager.create_tab, request.url, tab_name, request.cookie, request.local_storage,
+                          request.user_agent, context, request.browser)
+        return await call_engine(browser_manager.get_tab_html, browser_manager.get_tab(tab_name))
+    finally:
+        # 请求在创建标签页期间被放弃时，工作线程可能在之后才把标签页登记到池中
+        try:
+            if isolated:
+                # 销毁上下文时一并关闭其中的标签页
+                await browser_manager.close_context(context)
+            elif tab_name in browser_manager.tabs_pool:
+                await call_engine(browser_manager.close_tab, tab_name)
+        except ValueError:
+            # 上下文还未创建
+            pass
+        except Exception as e:
+            logger.warning(f"关闭临时标签页 {tab_name} 失败: {e}")
+
+
+async def _fetch_page(request: FetchRequest):
+    """
+    经过响应缓存获取页面，身份指纹不同的请求不共用缓存
+
+    写入缓存的页面在一次性浏览器上下文中渲染，不会带上默认配置文件中其他身份留下的Cookie；
+    指定了context的请求使用调用方共享的浏览器状态，无法保证身份与指纹一致，不经过缓存
+    """
+    if not request.cache or request.context or not response_cache.caches(request.url):
+        return await response_cache.bypass(lambda: _load_page(request))
+    fingerprint = identity_fingerprint(request.cookie, request.local_storage, request.user_agent,
+                                       request.context, request.browser)
+    return await response_cache.fetch(request.url, fingerprint, lambda: _load_page(request, isolated=True))
+
+
+@fetch_router.post("/", response_model=dict)
+async def fetch_page(request: FetchRequest, http_request: Request):
+    """一次调用完成 创建标签页 -> 获取HTML -> 关闭标签页，启用响应缓存时相同URL和身份的请求直接返回缓存"""
+    try:
+        html, cache, age = await _run_blocking(http_request, _fetch_page, request)
+        return {"code": 0, "url": request.url, "html": html, "cache": cache, "age": age}
+    except RequestAborted as e:
+        raise _aborted(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取页面失败: {str(e)}")
+
+
+@fetch_router.get("/cache", response_model=dict)
+async def get_response_cache_stats():
+    """获取响应缓存的命中率、合并加载和后台刷新次数以及内存/磁盘占用"""
+    return {"code": 0, **response_cache.stats()}
+
+
+@fetch_router.delete("/cache", response_model=dict)
+async def clear_response_cache():
+    """清空响应缓存"""
+    try:
+        removed = await response_cache.clear()
+        return {"code": 0, "message": "响应缓存已清空", "removed": removed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"清空响应缓存失败: {str(e)}")
@@ -1,6 +1,6 @@
 """API request and response schemas."""
-from typing import Dict, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 
 
 class NewTabRequest(BaseModel):
@@ -10,6 +10,19 @@ class NewTabRequest(BaseModel):
     cookie: Optional[str] = None
     local_storage: Optional[Dict[str, str]] = None
     user_agent: Optional[str] = None
+    context: Optional[str] = None
+    browser: Optional[Literal['headed', 'headless']] = None
+
+
+class FetchRequest(BaseModel):
+    """Request schema for fetching a page's HTML through a temporary tab and the response cache."""
+    url: str
+    cookie: Optional[str] = None
+    local_storage: Optional[Dict[str, str]] = None
+    user_agent: Optional[str] = None
+    context: Optional[str] = None
+    browser: Optional[Literal['headed', 'headless']] = None
+    cache: bool = True
 
 
 class ClickRequest(BaseModel):
@@ -18,6 +31,51 @@ class ClickRequest(BaseModel):
     selector: str
 
 
+class ActionStep(BaseModel):
+    """A single step of a batched action script."""
+    action: Literal['input', 'click', 'wait_for', 'extract', 'navigate']
+    selector: Optional[str] = None
+    value: Optional[str] = None
+    url: Optional[str] = None
+    attr: Optional[str] = None
+    multiple: bool = False
+    clear: bool = True
+    timeout: float = 10
+    optional: bool = False
+
+    @model_validator(mode='after')
+    def check_required_fields(self):
+        """Ensure each action carries the fields it needs."""
+        if self.action == 'navigate':
+            if not self.url:
+                raise ValueError("navigate step requires 'url'")
+        elif not self.selector:
+            raise ValueError(f"{self.action} step requires 'selector'")
+        if self.action == 'input' and self.value is None:
+            raise ValueError("input step requires 'value'")
+        return self
+
+
+class ActionsRequest(BaseModel):
+    """Request schema for running a batched action script on a tab."""
+    steps: List[ActionStep] = Field(min_length=1)
+    check_challenge: bool = True
+    stop_on_error: bool = True
+
+
+class RefreshScheduleRequest(BaseModel):
+    """Request schema for registering a background refresh schedule on a tab."""
+    interval: float = Field(gt=0)
+    jitter: float = Field(default=0, ge=0)
+    wait_for: Optional[str] = None
+    wait_timeout: float = Field(default=15, gt=0)
+
+
+class ShardJoinRequest(BaseModel):
+    """Request schema for adding a shard to the router."""
+    url: str
+
+
 class TabResponse(BaseModel):
     """Response schema for tab operations."""
     code: int
@@ -35,3 +93,14 @@ class HTMLResponse(BaseModel):
 class TabsListResponse(BaseModel):
     """Response schema for listing tabs."""
     tabs: list[str]
+
+
+class MoveTabRequest(BaseModel):
+    """Request schema for moving a tab to the headed or headless browser."""
+    browser: Literal['headed', 'headless']
+
+
+class BrowserRuleRequest(BaseModel):
+    """Request schema for adding a per-domain browser routing rule."""
+    pattern: str
+    browser: Literal['headed', 'headless']
@@ -75,9 +75,18 @@ CHALLENGE_BOX_SELECTORS: List[str] = [
     'input[name="cf-turnstile-response"]'
 ]
 
+# 分片部署：设置SHARD_ID后本进程作为一个分片运行，服务端口、浏览器调试端口和用户数据目录按分片号错开，
+# 同一台机器上可以启动多个分片，由路由器（src/router_main.py）按标签页名称转发请求
+SHARD_ID = os.getenv("SHARD_ID", "")
+SHARD_SUFFIX = f"-shard{SHARD_ID}" if SHARD_ID else ""
+_SHARD_OFFSET = int(SHARD_ID) if SHARD_ID else 0
+# 每个分片占用的浏览器调试端口数：有头浏览器和混合模式下的无头浏览器各一个
+_DEBUG_PORTS_PER_SHARD = 2
+
 # 应用设置
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
-APP_PORT = int(os.getenv("APP_PORT", "9850"))
+APP_PORT = int(os.getenv("APP_PORT", "9850")) + _SHARD_OFFSET
+BROWSER_DEBUG_PORT = 9222 + _SHARD_OFFSET * _DEBUG_PORTS_PER_SHARD  # 分片模式下浏览器的远程调试端口
 CHROME_PATH = os.getenv("CHROME_PATH", "/usr/bin/chromium-browser")
 BROWSER_MONITOR_INTERVAL = 10  # 秒
 
@@ -85,4 +94,317 @@ BROWSER_MONITOR_INTERVAL = 10  # 秒
 APP_VERSION = os.getenv("APP_VERSION", "2.0.2")
 
 # 用户数据路径
-USER_DATA_PATH = os.getenv("USER_DATA_PATH", "/var/lib/chromium/user_data")
\ No newline at end of file
+USER_DATA_PATH = os.getenv("USER_DATA_PATH", "/var/lib/chromium/user_data") + SHARD_SUFFIX
+
+# 标签页事件流配置
+TAB_EVENT_QUEUE_SIZE = int(os.getenv("TAB_EVENT_QUEUE_SIZE", "1000"))  # 每个订阅者缓冲的最大事件数
+TAB_EVENT_KEEPALIVE = 15  # 秒，SSE心跳间隔
+
+# DOM变更记录配置
+MUTATION_BUFFER_SIZE = int(os.getenv("MUTATION_BUFFER_SIZE", "5000"))  # 页面内保留的最大变更记录数
+
+# 在页面内安装的DOM变更记录脚本，按序号保存新增/删除/修改的节点
+MUTATION_RECORDER_JS = """
+(function() {
+    if (window.__ntcRecorder) {
+        return;
+    }
+    const maxRecords = __MAX_RECORDS__;
+    const recorder = {
+        epoch: Date.now().toString(36) + Math.random().toString(36).slice(2, 8),
+        seq: 0,
+        base: 0,
+        records: []
+    };
+    window.__ntcRecorder = recorder;
+
+    function htmlOf(node) {
+        if (node.nodeType === Node.ELEMENT_NODE) {
+            return node.outerHTML;
+        }
+        return node.textContent;
+    }
+
+    function push(record) {
+        recorder.seq += 1;
+        record.seq = recorder.seq;
+        recorder.records.push(record);
+        if (recorder.records.length > maxRecords) {
+            recorder.records.splice(0, recorder.records.length - maxRecords);
+            recorder.base = recorder.records[0].seq - 1;
+        }
+    }
+
+    // 回调收到记录时DOM已是整批变更之后的状态：从最终状态倒序撤销childList变更，
+    // 还原每条记录发生时各父节点的子节点列表，按记录发生时的状态计算位置和路径
+    function onMutations(mutations) {
+        const lists = new Map();
+        // 还原过程中父节点发生变化的节点，值为记录发生时的父节点（null表示未挂在文档上）
+        const parents = new Map();
+
+        function parentOf(node) {
+            return parents.has(node) ? parents.get(node) : node.parentElement;
+        }
+
+        function childrenOf(parent) {
+            let list = lists.get(parent);
+            if (!list) {
+                list = Array.prototype.slice.call(parent.childNodes);
+                lists.set(parent, list);
+            }
+            return list;
+        }
+
+        // 节点在父节点元素子节点中的序号（nth-child），父节点被还原过时使用还原后的列表
+        function elementIndex(parent, node) {
+            let index = 0;
+            for (const child of (lists.get(parent) || parent.childNodes)) {
+                if (child.nodeType === Node.ELEMENT_NODE) {
+                    index += 1;
+                }
+                if (child === node) {
+                    return index;
+                }
+            }
+            return 0;
+        }
+
+        // 生成可用于querySelector的节点路径
+        function pathOf(node) {
+            if (!node || node.nodeType !== Node.ELEMENT_NODE) {
+                return null;
+            }
+            const parts = [];
+            while (node && node.nodeType === Node.ELEMENT_NODE && node !== document.documentElement) {
+                const parent = parentOf(node);
+                if (!parent) {
+                    return null;
+                }
+                parts.unshift(node.tagName.toLowerCase() + ':nth-child(' + elementIndex(parent, node) + ')');
+                node = parent;
+            }
+            parts.unshift('html');
+            return parts.join(' > ');
+        }
+
+        function childPath(parentPath, parent, node) {
+            if (parentPath === null || node.nodeType !== Node.ELEMENT_NODE) {
+                return null;
+            }
+            return parentPath + ' > ' + node.tagName.toLowerCase() + ':nth-child(' + elementIndex(parent, node) + ')';
+        }
+
+        const batch = new Array(mutations.length);
+        for (let i = mutations.length - 1; i >= 0; i--) {
+            const m = mutations[i];
+            if (m.type === 'attributes') {
+                batch[i] = [{
+                    type: 'attributes',
+                    path: pathOf(m.target),
+                    name: m.attributeName,
+                    value: m.target.getAttribute(m.attributeName)
+                }];
+            } else if (m.type === 'characterData') {
+                // 父节点可能有多个文本节点，同时返回该文本节点在父节点子节点列表中的序号
+                const parent = parentOf(m.target);
+                batch[i] = [{
+                    type: 'text',
+                    parent: pathOf(parent),
+                    index: parent ? childrenOf(parent).indexOf(m.target) : -1,
+                    value: m.target.textContent
+                }];
+            } else if (m.type === 'childList') {
+                const list = childrenOf(m.target);
+                const parent = pathOf(m.target);
+                // 新增节点的位置取本条变更之后的状态
+                const added = [];
+                for (const node of m.addedNodes) {
+                    added.push({
+                        type: 'added',
+                        parent: parent,
+                        index: list.indexOf(node),
+                        path: childPath(parent, m.target, node),
+                        html: htmlOf(node)
+                    });
+                }
+                // 撤销本条变更：移除新增节点，把删除的节点放回相邻兄弟节点之间
+                for (const node of m.addedNodes) {
+                    const at = list.indexOf(node);
+                    if (at >= 0) {
+                        list.splice(at, 1);
+                    }
+                    parents.set(node, null);
+                }
+                let at = 0;
+                if (m.previousSibling) {
+                    at = list.indexOf(m.previousSibling) + 1;
+                } else if (m.nextSibling) {
+                    at = Math.max(list.indexOf(m.nextSibling), 0);
+                }
+                list.splice.apply(list, [at, 0].concat(Array.prototype.slice.call(m.removedNodes)));
+                for (const node of m.removedNodes) {
+                    parents.set(node, m.target);
+                }
+                // 删除节点的位置取本条变更之前的状态，从后往前排列，按顺序应用时每个序号都有效
+                const removed = [];
+                for (let j = m.removedNodes.length - 1; j >= 0; j--) {
+                    removed.push({type: 'removed', parent: parent, index: at + j, html: htmlOf(m.removedNodes[j])});
+                }
+                batch[i] = removed.concat(added);
+            }
+        }
+
+        for (const records of batch) {
+            if (records) {
+                records.forEach(push);
+            }
+        }
+    }
+
+    // 返回since之后的变更，since超出保留范围时返回null，调用方需回退到全量快照
+    recorder.changes = function(since) {
+        if (since < recorder.base || since > recorder.seq) {
+            return null;
+        }
+        return recorder.records.filter(function(r) { return r.seq > since; });
+    };
+
+    recorder.snapshot = function() {
+        return {epoch: recorder.epoch, seq: recorder.seq, html: document.documentElement.outerHTML};
+    };
+
+    function start() {
+        new MutationObserver(onMutations).observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            attributes: true,
+            characterData: true
+        });
+    }
+
+    if (document.documentElement) {
+        start();
+    } else {
+        document.addEventListener('DOMContentLoaded', start);
+    }
+})();
+""".replace("__MAX_RECORDS__", str(MUTATION_BUFFER_SIZE))
+
+# 浏览器配置文件存储管理
+PROFILE_CACHE_SIZE_MB = int(os.getenv("PROFILE_CACHE_SIZE_MB", "256"))  # HTTP磁盘缓存上限，0表示不限制
+PROFILE_PURGE_INTERVAL = int(os.getenv("PROFILE_PURGE_INTERVAL", "21600"))  # 秒，定期清理可丢弃目录，0表示禁用
+# tmpfs模式：设置后浏览器在该目录（如 /dev/shm/chromium_user_data）运行，只把持久数据同步回USER_DATA_PATH
+PROFILE_TMPFS_PATH = os.getenv("PROFILE_TMPFS_PATH", "")
+PROFILE_TMPFS_PATH = PROFILE_TMPFS_PATH + SHARD_SUFFIX if PROFILE_TMPFS_PATH else ""
+PROFILE_SYNC_INTERVAL = int(os.getenv("PROFILE_SYNC_INTERVAL", "300"))  # 秒，tmpfs模式下同步回磁盘的间隔
+
+# 按域名自适应的挑战检测配置
+CHALLENGE_PROFILE_ENABLED = os.getenv("CHALLENGE_PROFILE_ENABLED", "true").lower() == "true"
+CHALLENGE_PROFILE_PATH = os.getenv(
+    "CHALLENGE_PROFILE_PATH", os.path.join(os.path.dirname(USER_DATA_PATH), f"challenge_profile{SHARD_SUFFIX}.json")
+)
+CHALLENGE_PROBE_AFTER = int(os.getenv("CHALLENGE_PROBE_AFTER", "3"))  # 连续无挑战次数达到后改为快速探测
+CHALLENGE_SKIP_AFTER = int(os.getenv("CHALLENGE_SKIP_AFTER", "20"))  # 连续无挑战次数达到后跳过检测
+CHALLENGE_SKIP_RECHECK = int(os.getenv("CHALLENGE_SKIP_RECHECK", "10"))  # 跳过模式下每隔多少次请求探测一次
+CHALLENGE_PROFILE_SAVE_INTERVAL = 60  # 秒，统计数据写盘的最小间隔
+
+# 空闲标签页冻结和内存压力回收配置
+TAB_FREEZE_IDLE = int(os.getenv("TAB_FREEZE_IDLE", "300"))  # 秒，标签页空闲超过该时间后冻结，0表示禁用
+MEMORY_SOFT_LIMIT_MB = int(os.getenv("MEMORY_SOFT_LIMIT_MB", "0"))  # 浏览器进程树RSS超过后逐个冻结最冷的标签页，0表示禁用
+MEMORY_HARD_LIMIT_MB = int(os.getenv("MEMORY_HARD_LIMIT_MB", "0"))  # 超过后逐个关闭最冷的标签页，0表示禁用
+CPU_SOFT_LIMIT_PERCENT = float(os.getenv("CPU_SOFT_LIMIT_PERCENT", "0"))  # CPU占用超过后冻结最冷的标签页，0表示禁用
+
+# 按域名的访问速率限制（令牌桶），格式为 "速率/突发"，速率单位为次/秒；默认不限制，如 "1/5" 启用每秒1次、最多突发5次
+HOST_RATE_LIMIT_DEFAULT = os.getenv("HOST_RATE_LIMIT_DEFAULT", "0")  # "0" 表示不限制
+# 按域名模式覆盖默认值，逗号分隔，如 "*.example.com=0.2/1,tracker.org=1/5"
+HOST_RATE_LIMITS = os.getenv("HOST_RATE_LIMITS", "")
+
+# 请求截止时间和取消配置
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"  # 客户端通过该请求头（秒）或timeout查询参数指定截止时间
+REQUEST_DEFAULT_TIMEOUT = float(os.getenv("REQUEST_DEFAULT_TIMEOUT", "0"))  # 秒，未指定时的默认截止时间，0表示不限制
+DISCONNECT_POLL_INTERVAL = 0.5  # 秒，检测客户端断开连接的间隔
+
+# 浏览器引擎：drission（DrissionPage，阻塞调用在工作线程中执行）、cdp（asyncio直连CDP，标签页在事件循环中复用）
+# 或 simulated（不启动浏览器，在进程内模拟页面行为，用于API层基准测试和压力测试）
+BROWSER_ENGINE = os.getenv("BROWSER_ENGINE", "drission").lower()
+CDP_COMMAND_TIMEOUT = float(os.getenv("CDP_COMMAND_TIMEOUT", "30"))  # 秒，cdp引擎单条CDP命令的超时
+CDP_LAUNCH_TIMEOUT = 30  # 秒，cdp引擎等待浏览器调试端口就绪的超时
+
+# 分片路由器配置
+SHARD_NODES = os.getenv("SHARD_NODES", "")  # 逗号分隔的分片地址，如 http://127.0.0.1:9850,http://10.0.0.2:9850
+ROUTER_PORT = int(os.getenv("ROUTER_PORT", "9840"))
+SHARD_VIRTUAL_NODES = 128  # 每个分片在一致性哈希环上的虚拟节点数
+SHARD_HEALTH_INTERVAL = int(os.getenv("SHARD_HEALTH_INTERVAL", "5"))  # 秒，分片健康检查和标签页归属同步的间隔
+SHARD_AUTO_REBALANCE = os.getenv("SHARD_AUTO_REBALANCE", "true").lower() == "true"  # 分片加入后自动迁移标签页
+SHARD_REQUEST_TIMEOUT = float(os.getenv("SHARD_REQUEST_TIMEOUT", "300"))  # 秒，转发到分片的请求超时
+
+# 共享静态资源缓存：通过Fetch拦截让所有标签页和浏览器进程共用同一份资源缓存
+ASSET_CACHE_ENABLED = os.getenv("ASSET_CACHE_ENABLED", "false").lower() == "true"
+ASSET_CACHE_PATH = os.getenv("ASSET_CACHE_PATH", os.path.join(os.path.dirname(USER_DATA_PATH), "asset_cache"))
+ASSET_CACHE_SIZE_MB = int(os.getenv("ASSET_CACHE_SIZE_MB", "512"))  # 缓存总大小上限，超过后按LRU淘汰
+ASSET_CACHE_MAX_ITEM_MB = 10  # 单个资源的大小上限
+ASSET_CACHE_DEFAULT_TTL = 86400  # 秒，只有Last-Modified时启发式新鲜期的上限
+# 经过缓存的资源类型（CDP Network.ResourceType）
+ASSET_CACHE_TYPES: List[str] = [
+    t.strip() for t in os.getenv("ASSET_CACHE_TYPES", "Stylesheet,Script,Font,Image").split(",") if t.strip()
+]
+ASSET_CACHE_WORKERS = 8  # 处理拦截请求的线程数
+
+# 按需性能分析端点（/debug/profile、/debug/trace），默认关闭
+DEBUG_ENDPOINTS_ENABLED = os.getenv("DEBUG_ENDPOINTS_ENABLED", "false").lower() == "true"
+DEBUG_PROFILE_INTERVAL = 0.01  # 秒，调用栈采样间隔
+DEBUG_MAX_SECONDS = float(os.getenv("DEBUG_MAX_SECONDS", "60"))  # 单次采样/跟踪的最长时间
+# CDP性能跟踪默认记录的类别，与DevTools性能面板一致
+DEBUG_TRACE_CATEGORIES: List[str] = [
+    'devtools.timeline', 'disabled-by-default-devtools.timeline', 'disabled-by-default-devtools.timeline.frame',
+    'v8.execute', 'blink.user_timing', 'loading', 'latencyInfo',
+]
+
+# 浏览器模式：headed 只启动一个有头浏览器（可通过noVNC查看）；hybrid 批量任务在新版无头浏览器中运行，
+# 另保留一个有头浏览器用于noVNC调试和只有有头模式才能通过挑战的站点
+BROWSER_MODE = os.getenv("BROWSER_MODE", "headed").lower()
+# 混合模式下按域名选择浏览器，逗号分隔、按顺序匹配，如 "*.example.com=headed,tracker.org=headless"，
+# 未匹配的域名使用无头浏览器
+BROWSER_ROUTING_RULES = os.getenv("BROWSER_ROUTING_RULES", "")
+HEADED_USER_DATA_PATH = USER_DATA_PATH + "-headed"  # 混合模式下有头浏览器的独立用户数据目录
+# 混合模式下无头浏览器的远程调试端口，取本分片端口段中的第二个，不会与其他分片的端口重叠
+HEADLESS_DEBUG_PORT = BROWSER_DEBUG_PORT + 1
+
+# 模拟引擎（BROWSER_ENGINE=simulated）的页面行为，耗时和大小可写作 "最小-最大" 在范围内均匀取值
+SIM_NAVIGATION_LATENCY = os.getenv("SIM_NAVIGATION_LATENCY", "0.05")  # 秒，每次导航的耗时
+SIM_ACTION_LATENCY = os.getenv("SIM_ACTION_LATENCY", "0.005")  # 秒，读取HTML、点击、输入等单个操作的耗时
+SIM_PAGE_SIZE_KB = os.getenv("SIM_PAGE_SIZE_KB", "50")  # 生成页面的HTML大小
+SIM_CHALLENGE_RATE = float(os.getenv("SIM_CHALLENGE_RATE", "0"))  # 导航后出现挑战页面的概率
+SIM_CHALLENGE_SOLVE_TIME = os.getenv("SIM_CHALLENGE_SOLVE_TIME", "3")  # 秒，求解挑战的耗时
+SIM_CHALLENGE_SUCCESS_RATE = float(os.getenv("SIM_CHALLENGE_SUCCESS_RATE", "1"))  # 挑战求解成功的概率
+SIM_FAILURE_RATE = float(os.getenv("SIM_FAILURE_RATE", "0"))  # 每个操作抛出错误的概率
+SIM_HANG_RATE = float(os.getenv("SIM_HANG_RATE", "0"))  # 每个操作卡住直到请求截止的概率
+SIM_CRASH_RATE = float(os.getenv("SIM_CRASH_RATE", "0"))  # 每个操作后标签页崩溃的概率
+SIM_HANG_TIME = 300  # 秒，卡住的操作在没有截止时间时的最长等待
+SIM_SEED = os.getenv("SIM_SEED", "")  # 随机种子，设置后故障注入可复现
+
+# 挑战求解状态机：所有标签页的求解由事件循环统一调度，只有检查和点击等短操作在共享线程池中执行
+CHALLENGE_SOLVER_WORKERS = int(os.getenv("CHALLENGE_SOLVER_WORKERS", "4"))  # 执行求解步骤的线程数
+CHALLENGE_SOLVE_ATTEMPTS = int(os.getenv("CHALLENGE_SOLVE_ATTEMPTS", "3"))  # 每次求解最多尝试的次数
+CHALLENGE_POLL_INTERVAL = 1  # 秒，定位组件和等待成功标记时的轮询间隔
+CHALLENGE_SETTLE_TIME = 5  # 秒，首次检测前等待页面完成跳转
+CHALLENGE_VERIFY_TIME = 2  # 秒，确认挑战页面已消失前的等待
+CHALLENGE_LOCATE_TIMEOUT = 20  # 秒，单次尝试中定位Turnstile组件的超时
+CHALLENGE_SUCCESS_TIMEOUT = 10  # 秒，点击后等待成功标记的超时
+
+# 页面响应缓存：POST /fetch/ 按 URL + 身份指纹（Cookie、本地存储、User-Agent、上下文）缓存渲染后的HTML
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_DEFAULT_TTL = float(os.getenv("RESPONSE_CACHE_DEFAULT_TTL", "60"))  # 秒，未匹配域名规则时的新鲜期，0表示不缓存
+# 按域名的新鲜期，"模式=秒数" 逗号分隔，按顺序匹配，例如 "login.example.org=0,*.example.org=300"
+RESPONSE_CACHE_TTLS = os.getenv("RESPONSE_CACHE_TTLS", "")
+RESPONSE_CACHE_STALE_TTL = float(os.getenv("RESPONSE_CACHE_STALE_TTL", "300"))  # 秒，过期后仍可先返回旧内容并在后台刷新的时长
+RESPONSE_CACHE_SIZE_MB = int(os.getenv("RESPONSE_CACHE_SIZE_MB", "64"))  # 内存缓存大小上限，超过后按LRU淘汰
+RESPONSE_CACHE_DISK_PATH = os.getenv("RESPONSE_CACHE_DISK_PATH", "")  # 从内存淘汰的条目溢出到该目录，留空不启用
+RESPONSE_CACHE_DISK_SIZE_MB = int(os.getenv("RESPONSE_CACHE_DISK_SIZE_MB", "512"))  # 磁盘溢出的大小上限
+RESPONSE_CACHE_MAX_ITEM_MB = 5  # 单个页面的大小上限
+
+# 定时刷新：按标签页登记刷新计划，后台以低优先级刷新并保存最新的HTML快照
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "1"))  # 同时执行的后台刷新数
+REFRESH_TIMEOUT = float(os.getenv("REFRESH_TIMEOUT", "120"))  # 秒，单次后台刷新的截止时间
+REFRESH_MIN_INTERVAL = float(os.getenv("REFRESH_MIN_INTERVAL", "10"))  # 秒，允许登记的最短刷新间隔
+REFRESH_YIELD_POLL = 0.5  # 秒，有前台请求时推迟刷新的检查间隔，最多推迟一个刷新间隔
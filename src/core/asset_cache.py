@@ -0,0 +1,269 @@
+"""跨标签页、跨浏览器进程共享的静态资源缓存（内容寻址存储 + LRU淘汰）"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.config.settings import (
+    ASSET_CACHE_DEFAULT_TTL, ASSET_CACHE_ENABLED, ASSET_CACHE_MAX_ITEM_MB, ASSET_CACHE_PATH, ASSET_CACHE_SIZE_MB
+)
+
+# 不写入缓存、也不在命中时返回的响应头（响应体已被解码，长度由浏览器重新计算）
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie', 'connection', 'age'}
+
+# 淘汰时把总大小降到上限的该比例以下，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+
+def _header_map(headers: List[dict]) -> Dict[str, str]:
+    """把CDP的头部列表转换为小写名称的字典"""
+    return {h['name'].lower(): h['value'] for h in headers}
+
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> Optional[float]:
+    """
+    按HTTP缓存语义计算响应剩余的新鲜期
+
+    max-age和启发式新鲜期要减去Age头（响应在上游缓存/CDN中已经存放的秒数）；Expires是绝对时间，直接与当前时间相减
+
+    Args:
+        headers: 小写名称的响应头
+        now: 当前时间戳
+
+    Returns:
+        Optional[float]: 还可以缓存的秒数，不可共享缓存或已过期时为None
+    """
+    if 'set-cookie' in headers:
+        return None
+    vary = {v.strip().lower() for v in headers.get('vary', '').split(',') if v.strip()}
+    if vary - {'accept-encoding'}:
+        return None
+    if headers.get('access-control-allow-origin', '*') != '*':
+        return None
+
+    directives = {}
+    for item in headers.get('cache-control', '').lower().split(','):
+        name, _, value = item.strip().partition('=')
+        if name:
+            directives[name] = value.strip('"')
+    if {'no-store', 'no-cache', 'private'} & directives.keys():
+        return None
+    try:
+        current_age = max(0.0, float(headers.get('age', 0)))
+    except ValueError:
+        current_age = 0.0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                lifetime = float(directives[name]) - current_age
+            except ValueError:
+                return None
+            return lifetime if lifetime > 0 else None
+
+    try:
+        if 'expires' in headers:
+            lifetime = parsedate_to_datetime(headers['expires']).timestamp() - now
+            return lifetime if lifetime > 0 else None
+        if 'last-modified' in headers:
+            # 启发式新鲜期：距上次修改时间的10%
+            age = now - parsedate_to_datetime(headers['last-modified']).timestamp()
+            lifetime = min(age * 0.1, ASSET_CACHE_DEFAULT_TTL) - current_age
+            return lifetime if age > 0 and lifetime > 0 else None
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class AssetCache:
+    """按URL索引、按内容哈希存储的资源缓存，索引保存在SQLite中以便多个进程共享"""
+
+    def __init__(self, path: str = ASSET_CACHE_PATH, max_bytes: int = ASSET_CACHE_SIZE_MB * 1024 * 1024,
+                 enabled: bool = ASSET_CACHE_ENABLED):
+        self.enabled = enabled
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_item_bytes = ASSET_CACHE_MAX_ITEM_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        # 本进程的命中统计
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "uncacheable": 0, "evictions": 0, "bytes_saved": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        """延迟打开索引数据库，只在缓存启用时调用，未启用时不创建缓存目录"""
+        if self._db is None:
+            os.makedirs(os.path.join(self.path, 'objects'), exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.path, 'index.db'), timeout=5, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS assets ('
+                'url TEXT PRIMARY KEY, digest TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL,'
+                'size INTEGER NOT NULL, expires REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS assets_last_access ON assets (last_access)')
+            self._db.commit()
+        return self._db
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, 'objects', digest[:2], digest)
+
+    def get(self, url: str) -> Optional[Tuple[int, List[dict], bytes]]:
+        """
+        查找未过期的缓存资源
+
+        Returns:
+            Optional[Tuple[int, List[dict], bytes]]: (状态码, CDP格式的响应头, 响应体)，未命中时为None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute('SELECT digest, status, headers, size, expires FROM assets WHERE url = ?',
+                             (url,)).fetchone()
+            if row is None or row[4] <= now:
+                self.counters["misses"] += 1
+                return None
+            digest, status, headers, size, _ = row
+            try:
+                with open(self._blob_path(digest), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                # 内容已被其他进程淘汰
+                db.execute('DELETE FROM assets WHERE url = ?', (url,))
+                db.commit()
+                self.counters["misses"] += 1
+                return None
+            db.execute('UPDATE assets SET last_access = ? WHERE url = ?', (now, url))
+            db.commit()
+            self.counters["hits"] += 1
+            self.counters["bytes_saved"] += size
+        return status, json.loads(headers), body
+
+    def cacheable(self, status: int, headers: List[dict]) -> bool:
+        """在读取响应体之前按状态码、缓存头和声明的长度判断是否值得缓存"""
+        header_map = _header_map(headers)
+        try:
+            if int(header_map.get('content-length', 0)) > self.max_item_bytes:
+                return False
+        except ValueError:
+            pass
+        if status == 200 and freshness_lifetime(header_map, time.time()) is not None:
+            return True
+        with self._lock:
+            self.counters["uncacheable"] += 1
+        return False
+
+    def put(self, url: str, status: int, headers: List[dict], body: bytes) -> bool:
+        """按缓存头判断是否可共享缓存，可以则写入，返回是否已缓存"""
+        if not self.enabled:
+            return False
+        now = time.time()
+        lifetime = freshness_lifetime(_header_map(headers), now) if status == 200 else None
+        if lifetime is None or len(body) > self.max_item_bytes:
+            with self._lock:
+                self.counters["uncacheable"] += 1
+            return False
+
+        digest = hashlib.sha256(body).hexdigest()
+        kept = fulfill_headers(headers)
+        blob = self._blob_path(digest)
+        with self._lock:
+            try:
+                if not os.path.exists(blob):
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    tmp = f"{blob}.{os.getpid()}.tmp"
+                    with open(tmp, 'wb') as f:
+                        f.write(body)
+                    os.replace(tmp, blob)
+                db = self._conn()
+                db.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (url, digest, status, json.dumps(kept), len(body), now + lifetime, now))
+                db.commit()
+                self.counters["stores"] += 1
+                self._evict(db)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"写入资源缓存失败 {url}: {e}")
+                return False
+        return True
+
+    def _evict(self, db: sqlite3.Connection):
+        """总大小超过上限时按最近访问时间淘汰，并删除不再被引用的内容"""
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM assets').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        for url, digest, size in db.execute('SELECT url, digest, size FROM assets ORDER BY last_access').fetchall():
+            if total <= target:
+                break
+            db.execute('DELETE FROM assets WHERE url = ?', (url,))
+            total -= size
+            self.counters["evictions"] += 1
+            if db.execute('SELECT 1 FROM assets WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+        db.commit()
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            db = self._conn()
+            digests = {row[0] for row in db.execute('SELECT digest FROM assets')}
+            count = db.execute('DELETE FROM assets').rowcount
+            db.commit()
+            for digest in digests:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+            return count
+
+    def stats(self) -> dict:
+        """返回命中率、节省流量和存储占用"""
+        with self._lock:
+            entries = size = objects = 0
+            if self.enabled:
+                entries, size, objects = self._conn().execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(DISTINCT digest) FROM assets'
+                ).fetchone()
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+                "bytes_saved_mb": round(self.counters["bytes_saved"] / 1024 / 1024, 2),
+                "entries": entries,
+                "objects": objects,
+                "size_mb": round(size / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_bytes / 1024 / 1024, 2),
+            }
+
+
+def fulfill_headers(headers: List[dict]) -> List[dict]:
+    """去掉与已解码响应体不符的头部，用于Fetch.fulfillRequest"""
+    return [h for h in headers if h['name'].lower() not in DROPPED_HEADERS]
+
+
+def encode_body(body: bytes) -> str:
+    """把响应体编码为Fetch.fulfillRequest需要的base64字符串"""
+    return base64.b64encode(body).decode('ascii')
+
+
+def decode_body(result: dict) -> bytes:
+    """解码Fetch.getResponseBody的返回值"""
+    if result.get('base64Encoded'):
+        return base64.b64decode(result['body'])
+    return result['body'].encode('utf-8')
+
+
+# 全局资源缓存实例
+asset_cache = AssetCache()
@@ -1,86 +1,72 @@
 """浏览器管理和自动化功能"""
 import asyncio
+import importlib
+import json
 import os
-import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from DrissionPage import Chromium, ChromiumOptions
 from DrissionPage.items import MixTab
-from fake_useragent import UserAgent
 from loguru import logger
 
-from src.config.settings import JS_SCRIPT, BROWSER_MONITOR_INTERVAL, CHROME_PATH, USER_DATA_PATH
+from src.config.settings import (
+    JS_SCRIPT, ASSET_CACHE_ENABLED, ASSET_CACHE_TYPES, ASSET_CACHE_WORKERS, BROWSER_DEBUG_PORT, BROWSER_ENGINE,
+    BROWSER_MODE, BROWSER_MONITOR_INTERVAL, CPU_SOFT_LIMIT_PERCENT, HEADED_USER_DATA_PATH, HEADLESS_DEBUG_PORT,
+    MEMORY_HARD_LIMIT_MB, MEMORY_SOFT_LIMIT_MB, MUTATION_RECORDER_JS, TAB_FREEZE_IDLE
+)
+from src.core.asset_cache import asset_cache, decode_body, encode_body, fulfill_headers
+from src.core.browser_routing import BROWSER_HEADED, BROWSER_HEADLESS
+from src.core.challenge_profile import STRATEGY_PROBE, STRATEGY_SKIP, domain_of
+from src.core.challenge_solver import challenge_solver
+from src.core.chromium_options import create_chromium_options
+from src.core.deadline import RequestAborted, checkpoint, current_deadline
+from src.core.engine_base import RECORDER_STATE_JS, BrowserEngineBase
+from src.core.profile_manager import ProfileManager
+from src.core.tab_events import tab_event_bus
+from src.utils.challenge_utils import detect_challenge_type
+from src.utils.proc_utils import CLOCK_TICKS, process_tree_usage
 
 
-class BrowserManager:
+class BrowserManager(BrowserEngineBase):
     """管理浏览器实例和标签页操作"""
     
     def __init__(self):
+        super().__init__()
+        self.profile = ProfileManager()
+        self.profile.prepare()
+        # 混合模式下self.dp是承担批量任务的无头浏览器，另启动一个有头浏览器用于noVNC调试
+        self.mode = BROWSER_MODE
+        self.hybrid = self.mode == 'hybrid'
         self.chromium_options = self._create_chromium_options()
         self.dp = Chromium(self.chromium_options)
-        self.lock = asyncio.Lock()
-        self.tabs_pool: Dict[str, MixTab] = {}
+        self.headed_options: Optional[ChromiumOptions] = None
+        self.headed_dp: Optional[Chromium] = None
+        if self.hybrid:
+            self.headed_options = create_chromium_options(HEADED_USER_DATA_PATH, port=BROWSER_DEBUG_PORT)
+            self.headed_dp = Chromium(self.headed_options)
+        # 有头浏览器中的命名上下文和标签页
+        self.headed_contexts: Dict[str, str] = {}
+        self.headed_tabs: Set[str] = set()
+        self._headless_user_agent: Optional[str] = None
+        self._context_lock = threading.Lock()
+        # 冻结和恢复互斥，避免恢复检查时另一个线程正在冻结同一标签页
+        self._freeze_lock = threading.Lock()
+        self.resource_usage: Optional[dict] = None
+        self._last_cpu_sample: Optional[tuple] = None
         self._monitor_task = None
+        self._profile_task = None
+        self._resource_task = None
+        self._asset_executor: Optional[ThreadPoolExecutor] = None
 
     def _create_chromium_options(self) -> ChromiumOptions:
         """配置Chromium浏览器选项"""
-        ua = UserAgent(browsers=['Edge', 'Chrome'], os=['Linux'])
-        co = ChromiumOptions()
-        
-        # 基础配置
-        # co.set_argument('--disable-webgl')
-        co.set_argument('--disable-gpu')
-        co.set_argument('--lang=zh-CN.UTF-8')
-        # 移除headless模式，以便noVNC可以显示
-        co.set_argument('--no-headless')
-        
-        # 新增Chrome参数
-        co.set_argument('--no-first-run')
-        co.set_argument('--force-color-profile=srgb')
-        # 禁用指标记录和报告，减少browsermetrics文件生成
-        co.set_argument('--disable-metrics')
-        co.set_argument('--disable-metrics-reporting')
-        co.set_argument('--disable-breakpad')
-        co.set_argument('--disable-background-networking')
-        co.set_argument('--no-report-upload')
-        co.set_argument('--password-store=basic')
-        co.set_argument('--use-mock-keychain')
-        co.set_argument('--export-tagged-pdf')
-        co.set_argument('--no-default-browser-check')
-        co.set_argument('--disable-background-mode')
-        co.set_argument('--enable-features=NetworkService,NetworkServiceInProcess,LoadCryptoTokenExtension,PermuteTLSExtensions')
-        co.set_argument('--disable-features=FlashDeprecationWarning,EnablePasswordsAccountStorage,UMA')
-        co.set_argument('--deny-permission-prompts')
-        # 语言设置 - 使用完整的区域设置格式
-        co.set_argument('--accept-lang=zh-CN,zh-CN.UTF-8,zh,en-US,en')
-        co.set_argument('--force-language=zh-CN')
-        co.set_argument('--force-lang=zh-CN.UTF-8')
-        
-        # Linux系统特定配置
-        if platform.system() == "Linux":
-            co.set_argument('--no-sandbox')
-            co.set_argument('--disable-dev-shm-usage')
-
-        co.set_user_data_path(USER_DATA_PATH)
-
-        # 设置自定义浏览器路径（如果提供）
-        if CHROME_PATH:
-            co.set_browser_path(CHROME_PATH)
-        
-        # 设置浏览器首选项（语言相关）
-        # 使用set_pref方法设置单个首选项
-        co.set_pref('intl.accept_languages', 'zh-CN,zh,en-US,en')
-        co.set_pref('spellcheck.dictionary', 'zh-CN')
-        co.set_pref('browser.enable_spellchecking', True)
-        co.set_pref('browser.spellcheck.dictionary', 'zh-CN')
-        co.set_pref('translate.enabled', False)  # 禁用自动翻译
-        co.set_pref('intl.selected_languages', 'zh-CN')
-        co.set_pref('intl.locale.requested', 'zh-CN')
-        
-        # 设置随机User-Agent
-        # co.set_user_agent(ua.random)
-        return co
+        if self.hybrid:
+            return create_chromium_options(self.profile.active_path, headless=True, port=HEADLESS_DEBUG_PORT)
+        return create_chromium_options(self.profile.active_path)
 
     async def monitor_browser(self):
         """定期监控浏览器状态"""
@@ -94,34 +80,200 @@ class BrowserManager:
                         self.dp.quit()
                     except Exception as close_err:
                         logger.error(f"关闭浏览器时出错：{close_err}")
+                    # 浏览器已退出，可以同步运行期间推迟的数据并完整清理缓存目录
+                    await asyncio.to_thread(self.profile.sync_to_disk, False)
+                    await asyncio.to_thread(self.profile.purge)
                     # 创建新实例
                     self.dp = Chromium(self.chromium_options)
                     logger.info("浏览器已重启")
+                    # 旧浏览器中的标签页和上下文已失效，从池中移除
+                    self.contexts.clear()
+                    self._last_cpu_sample = None
+                    for tab_name in [t for t in self.tabs_pool if t not in self.headed_tabs]:
+                        self._forget_tab(tab_name)
+                        tab_event_bus.publish('tab_evicted', tab_name, reason='browser_restart')
+
+            if self.headed_dp is not None and not self.headed_dp.states.is_alive:
+                logger.warning("检测到有头浏览器异常")
+                async with self.lock:
+                    try:
+                        self.headed_dp.quit()
+                    except Exception as close_err:
+                        logger.error(f"关闭有头浏览器时出错：{close_err}")
+                    self.headed_dp = Chromium(self.headed_options)
+                    logger.info("有头浏览器已重启")
+                    self.headed_contexts.clear()
+                    for tab_name in list(self.headed_tabs):
+                        self._forget_tab(tab_name)
+                        tab_event_bus.publish('tab_evicted', tab_name, reason='browser_restart')
+
+    async def watch_resources(self):
+        """冻结空闲标签页，并在浏览器内存/CPU超过阈值时逐步冻结、关闭最冷的标签页"""
+        while True:
+            await asyncio.sleep(BROWSER_MONITOR_INTERVAL)
+            try:
+                if TAB_FREEZE_IDLE > 0:
+                    now = time.monotonic()
+                    for tab_name in self._coldest_tabs(include_frozen=False):
+                        if now - self.tab_last_used.get(tab_name, now) < TAB_FREEZE_IDLE:
+                            break
+                        await asyncio.to_thread(self.freeze_tab, tab_name, 'idle')
+
+                usage = await asyncio.to_thread(self._sample_resources)
+                if usage is None:
+                    continue
+                rss_mb = usage["rss_mb"]
+                if MEMORY_HARD_LIMIT_MB > 0 and rss_mb > MEMORY_HARD_LIMIT_MB:
+                    coldest = self._coldest_tabs(include_frozen=True)
+                    if coldest:
+                        logger.warning(f"浏览器内存 {rss_mb:.0f} MB 超过硬限制，关闭标签页 {coldest[0]}")
+                        await asyncio.to_thread(self.evict_tab, coldest[0], 'memory_pressure')
+                elif (MEMORY_SOFT_LIMIT_MB > 0 and rss_mb > MEMORY_SOFT_LIMIT_MB) or (
+                        CPU_SOFT_LIMIT_PERCENT > 0 and (usage["cpu_percent"] or 0) > CPU_SOFT_LIMIT_PERCENT):
+                    coldest = self._coldest_tabs(include_frozen=False)
+                    if coldest:
+                        logger.info(f"浏览器资源占用过高（{rss_mb:.0f} MB，CPU {usage['cpu_percent']}%），"
+                                    f"冻结标签页 {coldest[0]}")
+                        await asyncio.to_thread(self.freeze_tab, coldest[0], 'resource_pressure')
+            except Exception as e:
+                logger.error(f"资源监控出错: {e}")
+
+    def _sample_resources(self) -> Optional[dict]:
+        """从/proc读取浏览器进程树的内存和CPU占用"""
+        root_pid = self.dp.process_id
+        if not root_pid:
+            return None
+        rss, ticks, processes = process_tree_usage(root_pid)
+        now = time.monotonic()
+        cpu_percent = None
+        if self._last_cpu_sample:
+            last_ticks, last_time = self._last_cpu_sample
+            elapsed = now - last_time
+            if elapsed > 0:
+                cpu_percent = round(max(ticks - last_ticks, 0) / CLOCK_TICKS / elapsed * 100, 1)
+        self._last_cpu_sample = (ticks, now)
+        self.resource_usage = {
+            "rss_mb": round(rss / 1024 / 1024, 1),
+            "cpu_percent": cpu_percent,
+            "processes": processes,
+            "tabs": len(self.tabs_pool),
+            "frozen_tabs": len(self.frozen_tabs),
+            "timestamp": time.time(),
+        }
+        return self.resource_usage
+
+    def _coldest_tabs(self, include_frozen: bool) -> List[str]:
+        """按最近使用时间从旧到新排列标签页，有头浏览器中的标签页用于实时调试，不参与冻结和回收"""
+        names = [n for n in self.tabs_pool
+                 if n not in self.headed_tabs and (include_frozen or n not in self.frozen_tabs)]
+        return sorted(names, key=lambda n: self.tab_last_used.get(n, 0))
+
+    def freeze_tab(self, tab_name: str, reason: str = 'idle'):
+        """
+        把标签页切换到冻结状态，停止其中的定时器和脚本执行
+
+        挑选标签页和执行冻结之间可能已有请求开始使用它，因此冻结前重新检查：正在被调用的标签页不冻结，
+        空闲冻结还要确认标签页仍然空闲了TAB_FREEZE_IDLE秒
+        """
+        with self._freeze_lock:
+            tab = self.tabs_pool.get(tab_name)
+            if tab is None or tab_name in self.frozen_tabs or self.tab_in_use.get(tab_name):
+                return
+            if reason == 'idle' and time.monotonic() - self.tab_last_used.get(tab_name, 0) < TAB_FREEZE_IDLE:
+                return
+            try:
+                tab.run_cdp('Page.setWebLifecycleState', state='frozen')
+                self.frozen_tabs.add(tab_name)
+                tab_event_bus.publish('tab_frozen', tab_name, reason=reason)
+                logger.debug(f"已冻结标签页 {tab_name}（{reason}）")
+            except Exception as e:
+                logger.warning(f"冻结标签页 {tab_name} 失败: {e}")
+
+    def thaw_if_frozen(self, tab_name: str):
+        """在工作线程中恢复已冻结的标签页"""
+        with self._freeze_lock:
+            if tab_name not in self.frozen_tabs:
+                return
+            tab = self.tabs_pool.get(tab_name)
+            if tab is not None:
+                try:
+                    tab.run_cdp('Page.setWebLifecycleState', state='active')
+                    tab_event_bus.publish('tab_thawed', tab_name)
+                    logger.debug(f"已恢复标签页 {tab_name}")
+                except Exception as e:
+                    logger.warning(f"恢复标签页 {tab_name} 失败: {e}")
+            self.frozen_tabs.discard(tab_name)
+
+    def evict_tab(self, tab_name: str, reason: str):
+        """在资源压力下关闭标签页"""
+        tab = self.tabs_pool.get(tab_name)
+        if tab is None:
+            return
+        self._forget_tab(tab_name)
+        try:
+            tab.close()
+        except Exception as e:
+            logger.error(f"关闭标签页 {tab_name} 时出错: {e}")
+        tab_event_bus.publish('tab_evicted', tab_name, reason=reason)
+
+    def _forget_tab(self, tab_name: str):
+        """从所有登记表中移除标签页，返回被移除的标签页"""
+        self.headed_tabs.discard(tab_name)
+        return super()._forget_tab(tab_name)
+
+    def purge_profile(self) -> dict:
+        """在浏览器运行期间清理缓存：通过CDP清空HTTP缓存，并删除崩溃转储等目录"""
+        result = self.profile.purge(running=True)
+        try:
+            self.dp.latest_tab.run_cdp('Network.clearBrowserCache')
+            result["http_cache_cleared"] = True
+        except Exception as e:
+            logger.warning(f"清空浏览器HTTP缓存失败: {e}")
+            result["http_cache_cleared"] = False
+        return result
+
+    async def start(self):
+        """启动浏览器"""
+        self.dp.latest_tab
 
     async def start_monitoring(self):
         """启动浏览器监控任务"""
         self._monitor_task = asyncio.create_task(self.monitor_browser())
+        self._profile_task = asyncio.create_task(self.maintain_profile())
+        self._resource_task = asyncio.create_task(self.watch_resources())
 
     async def stop_monitoring(self):
         """停止浏览器监控任务"""
-        if self._monitor_task:
-            self._monitor_task.cancel()
-            try:
-                await self._monitor_task
-            except asyncio.CancelledError:
-                pass
+        for task in (self._monitor_task, self._profile_task, self._resource_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
 
-    def create_tab(self, url: str, tab_name: str, cookie: Optional[str] = None, local_storage: Optional[Dict[str, str]] = None, user_agent: Optional[str] = None) -> dict:
-        """创建新的浏览器标签页"""
+    def create_tab(self, url: str, tab_name: str, cookie: Optional[str] = None, local_storage: Optional[Dict[str, str]] = None, user_agent: Optional[str] = None, context: Optional[str] = None, browser: Optional[str] = None) -> dict:
+        """创建新的浏览器标签页，指定context时放入对应的独立浏览器上下文，混合模式下按browser或路由规则选择浏览器"""
         # 检查是否已有同名标签页
         if tab_name in self.tabs_pool:
             raise ValueError(f"标签页名称 '{tab_name}' 已存在")
         
         logger.debug(f"正在访问: {url}")
+        # 非混合模式下只有一个浏览器，忽略browser参数
+        browser = (browser or self.routing.browser_for(url)) if self.hybrid else None
+        headed = browser == BROWSER_HEADED
 
         try:
             # 创建新标签页
-            tab = self.dp.new_tab(url)
+            if context:
+                tab = self._new_tab_in_context(url, context, headed)
+                self.tab_contexts[tab_name] = context
+            else:
+                tab = (self.headed_dp if headed else self.dp).new_tab(url)
+            self._attach_event_listeners(tab, tab_name)
+            if ASSET_CACHE_ENABLED:
+                self._attach_asset_cache(tab)
+            checkpoint()
             
             # 使用none加载模式，但需要在适当时候主动停止加载
             tab.set.load_mode.none()
@@ -131,6 +283,8 @@ class BrowserManager:
             if user_agent:
                 tab.set.user_agent(user_agent)
                 logger.debug(f"已设置自定义User-Agent: {user_agent}")
+            elif browser == BROWSER_HEADLESS:
+                tab.set.user_agent(self._masked_user_agent(tab))
             
             # 设置cookie（如果提供）
             if cookie:
@@ -142,23 +296,16 @@ class BrowserManager:
                     tab.set.local_storage(key, value)
             
             # 访问URL
-            tab.get(url)
-            
-            # 等待页面基本加载完成（DOMContentLoaded）
-            try:
-                # 等待页面标题出现或body元素存在，最多等待15秒
-                tab.wait.ele_displayed('tag:body', timeout=15)
-            except Exception as load_timeout:
-                logger.warning(f"页面基本元素加载较慢: {load_timeout}")
-            
-            # 主动停止加载，防止页面无限转圈
-            tab.stop_loading()
-            
-            # 额外等待1秒确保页面稳定
-            tab.wait(1)
+            checkpoint()
+            self._navigate(tab, url)
+            checkpoint()
 
             # 将标签页添加到池中
             self.tabs_pool[tab_name] = tab
+            self.tab_last_used[tab_name] = time.monotonic()
+            if headed:
+                self.headed_tabs.add(tab_name)
+            tab_event_bus.publish('tab_created', tab_name, url=tab.url, browser=browser)
 
             return {"code": 0, "message": "标签页创建成功", "tab_name": tab_name}
 
@@ -167,6 +314,7 @@ class BrowserManager:
             logger.error(f"创建标签页 {tab_name} 时出错: {e}")
 
             # 如果标签页已部分创建但失败，确保清理资源
+            self.tab_contexts.pop(tab_name, None)
             if 'tab' in locals() and tab:
                 try:
                     tab.close()
@@ -174,50 +322,378 @@ class BrowserManager:
                 except Exception as cleanup_error:
                     logger.error(f"清理标签页 {tab_name} 时出错: {cleanup_error}")
 
+            # 请求已被放弃时原样抛出，由路由返回对应状态码
+            if isinstance(e, RequestAborted):
+                raise
+
             # 返回适当的错误响应
             raise RuntimeError(f"创建标签页失败，内部错误: {e}")
 
-    def get_tab_html(self, tab: MixTab) -> str:
-        """从标签页获取HTML内容"""
-        from src.utils.challenge_utils import sync_cf_box_retry
+    def _get_or_create_context(self, context: str, headed: bool = False) -> str:
+        """按名称获取浏览器上下文ID，不存在时创建；有头和无头浏览器中的同名上下文相互独立"""
+        dp, contexts = (self.headed_dp, self.headed_contexts) if headed else (self.dp, self.contexts)
+        with self._context_lock:
+            context_id = contexts.get(context)
+            if context_id is None:
+                context_id = dp._run_cdp('Target.createBrowserContext', disposeOnDetach=False)['browserContextId']
+                contexts[context] = context_id
+                logger.info(f"已创建浏览器上下文: {context}")
+            return context_id
+
+    def _new_tab_in_context(self, url: str, context: str, headed: bool = False) -> MixTab:
+        """在命名浏览器上下文中创建标签页"""
+        dp = self.headed_dp if headed else self.dp
+        context_id = self._get_or_create_context(context, headed)
+        target_id = dp._run_cdp('Target.createTarget', url=url, browserContextId=context_id)['targetId']
+        return dp.get_tab(target_id)
+
+    def list_contexts(self) -> dict:
+        """列出所有命名浏览器上下文及其标签页，混合模式下包括只存在于有头浏览器中的上下文"""
+        result = super().list_contexts()
+        if not self.hybrid:
+            return result
+        for name in self.headed_contexts:
+            result.setdefault(name, {
+                "context_id": None,
+                "tabs": [t for t, c in self.tab_contexts.items() if c == name]
+            })
+        for name, entry in result.items():
+            entry["headed_context_id"] = self.headed_contexts.get(name)
+        return result
+
+    def _pop_context(self, context: str) -> tuple:
+        """从登记表中取出上下文在无头和有头浏览器中的ID"""
+        with self._context_lock:
+            if context not in self.contexts and context not in self.headed_contexts:
+                raise ValueError(f"浏览器上下文 '{context}' 未找到")
+            return self.contexts.pop(context, None), self.headed_contexts.pop(context, None)
+
+    def _dispose_context(self, context_ids: tuple):
+        context_id, headed_context_id = context_ids
+        if context_id:
+            self.dp._run_cdp('Target.disposeBrowserContext', browserContextId=context_id)
+        if headed_context_id:
+            self.headed_dp._run_cdp('Target.disposeBrowserContext', browserContextId=headed_context_id)
+
+    def _masked_user_agent(self, tab: MixTab) -> str:
+        """新版无头模式的User-Agent带有HeadlessChrome标识，替换为对应版本的普通Chrome"""
+        if self._headless_user_agent is None:
+            self._headless_user_agent = tab.user_agent.replace('HeadlessChrome', 'Chrome')
+        return self._headless_user_agent
+
+    def browser_of(self, tab_name: str) -> Optional[str]:
+        """标签页所在的浏览器，非混合模式下为None"""
+        if not self.hybrid:
+            return None
+        return BROWSER_HEADED if tab_name in self.headed_tabs else BROWSER_HEADLESS
+
+    def move_tab(self, tab_name: str, browser: str) -> dict:
+        """把标签页移动到另一个浏览器，按URL、Cookie、本地存储和User-Agent重建（页面内的DOM和脚本状态不保留）"""
+        if not self.hybrid:
+            raise ValueError("未启用混合模式（BROWSER_MODE=hybrid），只有一个浏览器")
+        state = self.export_tab(tab_name)
+        if state["browser"] == browser:
+            return {"code": 0, "message": "标签页已在目标浏览器中", "tab_name": tab_name, "browser": browser}
+
+        old_tab = self.tabs_pool[tab_name]
+        self._forget_tab(tab_name)
+        try:
+            self.create_tab(state["url"], tab_name, state["cookie"], state["local_storage"], state["user_agent"],
+                            state["context"], browser)
+        except Exception:
+            # 重建失败时保留原标签页
+            self.tabs_pool[tab_name] = old_tab
+            self.tab_last_used[tab_name] = time.monotonic()
+            if state["context"]:
+                self.tab_contexts[tab_name] = state["context"]
+            if state["browser"] == BROWSER_HEADED:
+                self.headed_tabs.add(tab_name)
+            raise
+        try:
+            old_tab.close()
+        except Exception as e:
+            logger.warning(f"关闭原标签页 {tab_name} 时出错: {e}")
+        tab_event_bus.publish('tab_moved', tab_name, url=state["url"], browser=browser)
+        logger.info(f"已将标签页 {tab_name} 移动到{browser}浏览器")
+        return {"code": 0, "message": "标签页已移动", "tab_name": tab_name, "browser": browser}
+
+    def browser_stats(self) -> dict:
+        """返回浏览器模式、路由规则和各浏览器中的标签页"""
+        tabs = {BROWSER_HEADED: [t for t in self.tabs_pool if not self.hybrid or t in self.headed_tabs]}
+        if self.hybrid:
+            tabs[BROWSER_HEADLESS] = [t for t in self.tabs_pool if t not in self.headed_tabs]
+        return {"mode": self.mode, "rules": self.routing.list_rules(), "tabs": tabs}
+
+    def _navigate(self, tab: MixTab, url: str):
+        """访问URL并等待页面基本稳定"""
+        deadline = current_deadline()
+        tab.get(url)
+        
+        # 等待页面基本加载完成（DOMContentLoaded）
+        try:
+            # 等待页面标题出现或body元素存在，最多等待15秒
+            tab.wait.ele_displayed('tag:body', timeout=deadline.clamp(15))
+        except Exception as load_timeout:
+            logger.warning(f"页面基本元素加载较慢: {load_timeout}")
         
+        # 主动停止加载，防止页面无限转圈
+        tab.stop_loading()
+        
+        # 额外等待1秒确保页面稳定
+        deadline.sleep(1)
+
+    @staticmethod
+    def _chain_callback(tab: MixTab, event: str, callback):
+        """为标签页的CDP事件追加回调，DrissionPage每个事件只保存一个回调，需保留其原有回调"""
+        driver = tab.driver
+        previous = driver.event_handlers.get(event)
+
+        def handler(**kwargs):
+            if previous:
+                previous(**kwargs)
+            try:
+                callback(**kwargs)
+            except Exception as e:
+                logger.debug(f"处理标签页事件 {event} 时出错: {e}")
+
+        driver.set_callback(event, handler)
+
+    def _attach_event_listeners(self, tab: MixTab, tab_name: str):
+        """订阅标签页CDP会话事件并转发到事件总线"""
+        def on_frame_navigated(frame: dict, **kwargs):
+            # 只关注主框架的导航
+            if not frame.get('parentId'):
+                tab_event_bus.publish('navigation_committed', tab_name, url=frame.get('url'))
+
+        def on_load_event_fired(**kwargs):
+            tab_event_bus.publish('load_finished', tab_name, url=tab.url)
+
+        def on_target_crashed(**kwargs):
+            tab_event_bus.publish('tab_crashed', tab_name)
+
+        self._chain_callback(tab, 'Page.frameNavigated', on_frame_navigated)
+        self._chain_callback(tab, 'Page.loadEventFired', on_load_event_fired)
+        self._chain_callback(tab, 'Inspector.targetCrashed', on_target_crashed)
+        try:
+            tab.run_cdp('Inspector.enable')
+        except Exception as e:
+            logger.debug(f"启用Inspector域失败: {e}")
+
+    def _attach_asset_cache(self, tab: MixTab):
+        """拦截标签页的静态资源请求：命中共享缓存时直接返回，未命中时在响应阶段写入缓存"""
+        if self._asset_executor is None:
+            self._asset_executor = ThreadPoolExecutor(max_workers=ASSET_CACHE_WORKERS,
+                                                      thread_name_prefix='asset-cache')
+
+        def handle(requestId: str, request: dict, responseStatusCode: Optional[int] = None,
+                   responseHeaders: Optional[list] = None, **kwargs):
+            url = request['url']
+            try:
+                if request.get('method') == 'GET':
+                    if responseStatusCode is None:
+                        cached = asset_cache.get(url)
+                        if cached:
+                            status, headers, body = cached
+                            tab.run_cdp('Fetch.fulfillRequest', requestId=requestId, responseCode=status,
+                                        responseHeaders=headers, body=encode_body(body))
+                            return
+                    elif asset_cache.cacheable(responseStatusCode, responseHeaders or []):
+                        body = decode_body(tab.run_cdp('Fetch.getResponseBody', requestId=requestId))
+                        asset_cache.put(url, responseStatusCode, responseHeaders, body)
+                        tab.run_cdp('Fetch.fulfillRequest', requestId=requestId, responseCode=responseStatusCode,
+                                    responseHeaders=fulfill_headers(responseHeaders), body=encode_body(body))
+                        return
+                tab.run_cdp('Fetch.continueRequest', requestId=requestId)
+            except Exception as e:
+                logger.debug(f"处理资源请求 {url} 时出错: {e}")
+                try:
+                    tab.run_cdp('Fetch.continueRequest', requestId=requestId)
+                except Exception:
+                    pass
+
+        def on_request_paused(**kwargs):
+            # 事件回调线程每个标签页只有一个，放到线程池中处理以免资源请求被串行化
+            self._asset_executor.submit(handle, **kwargs)
+
+        self._chain_callback(tab, 'Fetch.requestPaused', on_request_paused)
+        patterns = [{"urlPattern": "*", "resourceType": resource_type, "requestStage": stage}
+                    for resource_type in ASSET_CACHE_TYPES for stage in ('Request', 'Response')]
+        tab.run_cdp('Fetch.enable', patterns=patterns)
+
+    async def _check_challenge(self, tab: MixTab):
+        """
+        按域名策略处理CloudFlare挑战并发布挑战事件，等待由求解器在事件循环中调度，不占用线程
+
+        快速探测和求解器用同一个detect_challenge_type判断挑战：只有页面上已检测不到挑战才记为通过，
+        求解器无法处理的挑战记为失败，不会把域名推向跳过检测
+        """
+        tab_name = self._tab_name_of(tab)
+        url = await asyncio.to_thread(lambda: tab.url)
+        domain = domain_of(url)
+        strategy = self.challenge_profile.strategy(domain)
+
+        started = time.monotonic()
+        challenge_type = None
+        if strategy in (STRATEGY_SKIP, STRATEGY_PROBE):
+            # 跳过检测和快速探测都不等待，只检查一次当前页面；仍出现挑战时改用完整流程，以便统计并回退策略
+            challenge_type = await asyncio.to_thread(lambda: detect_challenge_type(tab.html))
+            if challenge_type is None:
+                if strategy == STRATEGY_SKIP:
+                    self.challenge_profile.record_skip(domain)
+                else:
+                    self.challenge_profile.record_check(domain)
+                return True, False
+            logger.debug(f"{strategy} 模式下发现 {domain} 出现挑战 {challenge_type}，改用完整流程")
+            tab_event_bus.publish('challenge_detected', tab_name, url=url, challenge_type=challenge_type)
+
+        def on_challenge(detected_type: str):
+            nonlocal challenge_type
+            if challenge_type is None:
+                challenge_type = detected_type
+                tab_event_bus.publish('challenge_detected', tab_name, url=url, challenge_type=challenge_type)
+
+        success, cf = await challenge_solver.solve(tab, tab_name, on_challenge=on_challenge)
+        elapsed = round(time.monotonic() - started, 3)
+        if cf or challenge_type:
+            # 探测发现的挑战在求解器首次检查前已自行消失时，求解器同样已用该检测确认页面正常
+            cf = True
+            event_type = 'challenge_solved' if success else 'challenge_failed'
+            tab_event_bus.publish(event_type, tab_name, url=url, elapsed=elapsed)
+            self.challenge_profile.record_check(domain, challenge_type or 'unknown', elapsed, success)
+        else:
+            self.challenge_profile.record_check(domain)
+        return success, cf
+
+    async def get_tab_html(self, tab: MixTab) -> str:
+        """从标签页获取HTML内容"""
+        deadline = current_deadline()
+
         # 处理CloudFlare挑战
-        sync_cf_box_retry(tab)
+        await self._check_challenge(tab)
         
         # 确保页面加载完成
         try:
             # 等待页面基本稳定
-            tab.wait(1)
+            await deadline.asleep(1)
             
             # 检查页面是否还在加载
-            if tab.states.is_loading:
+            if await asyncio.to_thread(lambda: tab.states.is_loading):
                 logger.debug(f"页面仍在加载，主动停止: {tab.url}")
-                tab.stop_loading()
+                await asyncio.to_thread(tab.stop_loading)
             
             # 额外等待确保页面稳定
-            tab.wait(0.5)
+            await deadline.asleep(0.5)
             
+        except RequestAborted:
+            raise
         except Exception as e:
             logger.warning(f"等待页面稳定时出错: {e}")
             # 即使出错也继续获取HTML
         
         # 最终停止加载并获取HTML
+        return await asyncio.to_thread(self._read_html, tab)
+
+    async def refresh_tab(self, tab: MixTab, wait_for: Optional[str] = None, wait_timeout: float = 15) -> str:
+        """重新加载标签页，处理挑战并等待wait_for元素出现后获取HTML，用于定时刷新"""
+        await asyncio.to_thread(self._reload, tab)
+        await self._check_challenge(tab)
+        if wait_for:
+            await asyncio.to_thread(self._wait_displayed, tab, wait_for, wait_timeout)
+        return await asyncio.to_thread(self._read_html, tab)
+
+    @staticmethod
+    def _reload(tab: MixTab):
+        """刷新页面并等待页面基本稳定"""
+        deadline = current_deadline()
+        tab.refresh()
+        try:
+            tab.wait.ele_displayed('tag:body', timeout=deadline.clamp(15))
+        except Exception as load_timeout:
+            logger.warning(f"页面基本元素加载较慢: {load_timeout}")
+        tab.stop_loading()
+        deadline.sleep(1)
+
+    @staticmethod
+    def _wait_displayed(tab: MixTab, selector: str, timeout: float):
+        if not tab.wait.ele_displayed(selector, timeout=current_deadline().clamp(timeout)):
+            raise RuntimeError(f"等待元素超时: {selector}")
+
+    @staticmethod
+    def _read_html(tab: MixTab) -> str:
         tab.stop_loading()
         html = tab.html
         logger.debug(f"成功获取网站 {tab.url} 的HTML，长度: {len(html)} 字符")
         return html
 
-    def click_element(self, tab: MixTab, selector: str):
+    @staticmethod
+    def _read_recorder(tab: MixTab, since: int) -> Optional[dict]:
+        state = tab.run_js(RECORDER_STATE_JS, since)
+        return json.loads(state) if state is not None else None
+
+    @staticmethod
+    def _install_recorder(tab: MixTab):
+        logger.debug(f"在页面 {tab.url} 中安装DOM变更记录器")
+        tab.add_init_js(MUTATION_RECORDER_JS)
+        tab.run_js(MUTATION_RECORDER_JS)
+
+    @staticmethod
+    def _recorder_snapshot(tab: MixTab) -> dict:
+        return json.loads(tab.run_js('return JSON.stringify(window.__ntcRecorder.snapshot());'))
+
+    async def click_element(self, tab: MixTab, selector: str):
         """在标签页中点击元素"""
-        from src.utils.challenge_utils import sync_cf_box_retry
-        
-        sync_cf_box_retry(tab)
+        await self._check_challenge(tab)
+        checkpoint()
+        await asyncio.to_thread(self._click_element, tab, selector)
+
+    @staticmethod
+    def _click_element(tab: MixTab, selector: str):
         try:
             tab.ele(selector).click(by_js=None)
         except Exception as e:
             logger.error(f"点击元素失败 {selector}: {e}")
             raise
 
+    def _run_action_step(self, tab: MixTab, step: Dict[str, Any]):
+        """在工作线程中执行单个操作步骤，返回提取结果（如有）"""
+        action = step['action']
+        selector = step.get('selector')
+        timeout = current_deadline().clamp(step.get('timeout', 10))
+
+        if action == 'navigate':
+            self.rate_limiter.acquire_sync(step['url'])
+            self._navigate(tab, step['url'])
+            return tab.url
+
+        if action == 'wait_for':
+            if not tab.wait.ele_displayed(selector, timeout=timeout):
+                raise RuntimeError(f"等待元素超时: {selector}")
+            return None
+
+        if action == 'extract' and step.get('multiple'):
+            return [self._extract_value(ele, step.get('attr')) for ele in tab.eles(selector, timeout=timeout)]
+
+        ele = tab.ele(selector, timeout=timeout)
+        if not ele:
+            raise RuntimeError(f"未找到元素: {selector}")
+
+        if action == 'input':
+            ele.input(step['value'], clear=step.get('clear', True))
+        elif action == 'click':
+            ele.click(by_js=None)
+        elif action == 'extract':
+            return self._extract_value(ele, step.get('attr'))
+        return None
+
+    @staticmethod
+    def _extract_value(ele, attr: Optional[str]):
+        """提取元素文本、HTML或属性值"""
+        if not attr:
+            return ele.text
+        if attr == 'html':
+            return ele.html
+        return ele.attr(attr)
+
     def close_tab(self, tab_name: str):
         """关闭特定标签页"""
         if tab_name not in self.tabs_pool:
@@ -225,28 +701,87 @@ class BrowserManager:
         
         tab = self.tabs_pool[tab_name]
         url = tab.url
-        del self.tabs_pool[tab_name]
+        self._forget_tab(tab_name)
         tab.close()
+        tab_event_bus.publish('tab_closed', tab_name, url=url)
         logger.debug(f"已关闭页面: {url}")
 
-    def list_tabs(self) -> list:
-        """列出所有活动标签页"""
-        return list(self.tabs_pool.keys())
+    def trace_tab(self, tab: MixTab, seconds: float, categories: List[str]) -> List[dict]:
+        """在给定时长内记录标签页的CDP性能跟踪，返回Chrome跟踪事件"""
+        driver = tab.driver
+        events: List[dict] = []
+        complete = threading.Event()
+        previous = {event: driver.event_handlers.get(event)
+                    for event in ('Tracing.dataCollected', 'Tracing.tracingComplete')}
+        driver.set_callback('Tracing.dataCollected', lambda value, **kwargs: events.extend(value))
+        driver.set_callback('Tracing.tracingComplete', lambda **kwargs: complete.set())
+        try:
+            tab.run_cdp('Tracing.start', transferMode='ReportEvents', traceConfig={"includedCategories": categories})
+            try:
+                current_deadline().sleep(seconds)
+            finally:
+                # 请求被放弃时也要结束跟踪，避免浏览器持续记录
+                tab.run_cdp('Tracing.end')
+                complete.wait(10)
+        finally:
+            for event, handler in previous.items():
+                driver.set_callback(event, handler)
+        return events
 
-    def get_tab(self, tab_name: str) -> MixTab:
-        """按名称获取特定标签页"""
-        if tab_name not in self.tabs_pool:
-            raise ValueError(f"标签页 '{tab_name}' 未找到")
-        return self.tabs_pool[tab_name]
+    def export_tab(self, tab_name: str) -> dict:
+        """导出标签页的可迁移状态，用于在分片之间重建标签页"""
+        tab = self.get_tab(tab_name)
+        self.thaw_if_frozen(tab_name)
+        local_storage = tab.run_js('return JSON.stringify(Object.assign({}, localStorage));')
+        return {
+            "tab_name": tab_name,
+            "url": tab.url,
+            "cookie": tab.cookies().as_str() or None,
+            "local_storage": json.loads(local_storage) if local_storage else None,
+            "user_agent": tab.user_agent,
+            "context": self.tab_contexts.get(tab_name),
+            "browser": self.browser_of(tab_name),
+        }
 
     async def cleanup(self):
         """清理浏览器资源"""
         await self.stop_monitoring()
+        if self._asset_executor is not None:
+            self._asset_executor.shutdown(wait=False, cancel_futures=True)
+        challenge_solver.shutdown()
+        for dp in (self.dp, self.headed_dp):
+            if dp is None:
+                continue
+            try:
+                dp.quit()
+            except Exception as e:
+                logger.error(f"浏览器清理过程中出错: {e}")
+        self.challenge_profile.save()
+        # 浏览器退出后数据已落盘，最后同步一次
         try:
-            self.dp.quit()
+            self.profile.sync_to_disk(running=False)
         except Exception as e:
-            logger.error(f"浏览器清理过程中出错: {e}")
+            logger.error(f"同步配置文件时出错: {e}")
+
+
+# 可选的浏览器引擎 {名称: "模块:类"}，只在选用时导入（cdp引擎依赖websockets）。
+# 引擎需要提供与BrowserManager相同的属性和方法，方法可以是同步的（路由在工作线程中调用）或协程（路由直接await）
+BROWSER_ENGINES = {
+    'cdp': 'src.core.cdp_engine:AsyncCDPBrowserManager',
+    'simulated': 'src.core.simulated_engine:SimulatedBrowserManager',
+}
+
+
+def create_browser_manager():
+    """按BROWSER_ENGINE配置创建浏览器管理器"""
+    target = BROWSER_ENGINES.get(BROWSER_ENGINE)
+    if target is None:
+        if BROWSER_ENGINE != 'drission':
+            logger.warning(f"未知的浏览器引擎 {BROWSER_ENGINE}，使用drission引擎")
+        return BrowserManager()
+    module, _, name = target.partition(':')
+    return getattr(importlib.import_module(module), name)()
 
 
 # 全局浏览器管理器实例
-browser_manager = BrowserManager()
+browser_manager = create_browser_manager()
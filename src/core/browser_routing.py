@@ -0,0 +1,69 @@
+"""混合模式下按域名选择有头或无头浏览器的路由规则"""
+import threading
+from fnmatch import fnmatch
+from typing import List, Tuple
+
+from loguru import logger
+
+from src.config.settings import BROWSER_ROUTING_RULES
+from src.core.challenge_profile import domain_of
+
+BROWSER_HEADED = 'headed'
+BROWSER_HEADLESS = 'headless'
+BROWSER_KINDS = (BROWSER_HEADED, BROWSER_HEADLESS)
+
+
+def parse_routing_rules(spec: str) -> List[Tuple[str, str]]:
+    """解析 "模式=headed|headless" 的逗号分隔规则列表"""
+    rules = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        pattern, _, browser = item.partition('=')
+        browser = browser.strip().lower()
+        if browser not in BROWSER_KINDS:
+            logger.warning(f"忽略无效的浏览器路由规则: {item}")
+            continue
+        rules.append((pattern.strip().lower(), browser))
+    return rules
+
+
+class BrowserRoutingRules:
+    """按规则顺序匹配域名，未匹配时使用无头浏览器"""
+
+    def __init__(self, spec: str = BROWSER_ROUTING_RULES):
+        self.rules = parse_routing_rules(spec)
+        self._lock = threading.Lock()
+
+    def browser_for(self, url: str) -> str:
+        """获取访问url应使用的浏览器"""
+        host = domain_of(url)
+        if host:
+            with self._lock:
+                for pattern, browser in self.rules:
+                    if fnmatch(host, pattern):
+                        return browser
+        return BROWSER_HEADLESS
+
+    def set_rule(self, pattern: str, browser: str):
+        """添加或替换规则，新规则排在最前面"""
+        if browser not in BROWSER_KINDS:
+            raise ValueError(f"未知的浏览器类型: {browser}")
+        pattern = pattern.strip().lower()
+        with self._lock:
+            self.rules = [(pattern, browser)] + [r for r in self.rules if r[0] != pattern]
+
+    def remove_rule(self, pattern: str) -> bool:
+        """删除规则，返回规则是否存在"""
+        pattern = pattern.strip().lower()
+        with self._lock:
+            kept = [r for r in self.rules if r[0] != pattern]
+            removed = len(kept) != len(self.rules)
+            self.rules = kept
+            return removed
+
+    def list_rules(self) -> List[dict]:
+        """按匹配顺序列出规则"""
+        with self._lock:
+            return [{"pattern": pattern, "browser": browser} for pattern, browser in self.rules]
+
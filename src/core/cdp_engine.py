@@ -0,0 +1,754 @@
+"""基于asyncio的CDP浏览器引擎，所有标签页在同一个事件循环中通过一条WebSocket连接复用"""
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import websockets
+from loguru import logger
+
+from src.config.settings import (
+    JS_SCRIPT, ASSET_CACHE_ENABLED, ASSET_CACHE_TYPES, BROWSER_MONITOR_INTERVAL, CDP_COMMAND_TIMEOUT, CDP_LAUNCH_TIMEOUT,
+    CHROME_PATH, MUTATION_RECORDER_JS
+)
+from src.core.asset_cache import asset_cache, decode_body, encode_body, fulfill_headers
+from src.core.challenge_profile import STRATEGY_FULL, STRATEGY_PROBE, STRATEGY_SKIP, domain_of
+from src.core.chromium_options import create_chromium_options
+from src.core.deadline import RequestAborted, current_deadline
+from src.core.engine_base import RECORDER_STATE_JS, BrowserEngineBase
+from src.core.profile_manager import ProfileManager
+from src.core.tab_events import tab_event_bus
+from src.utils.challenge_utils import detect_challenge_type
+
+# 在页面中按DrissionPage风格的定位符查找元素：支持CSS选择器以及 css:/c:、xpath:/x: 前缀
+FIND_ELEMENTS_JS = """
+function __ntcFind(selector, all) {
+    let expr = selector;
+    if (/^(xpath|x):/.test(expr)) {
+        expr = expr.slice(expr.indexOf(':') + 1);
+        const result = document.evaluate(expr, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < result.snapshotLength; i++) {
+            nodes.push(result.snapshotItem(i));
+        }
+        return all ? nodes : (nodes[0] || null);
+    }
+    if (/^(css|c):/.test(expr)) {
+        expr = expr.slice(expr.indexOf(':') + 1);
+    }
+    return all ? Array.from(document.querySelectorAll(expr)) : document.querySelector(expr);
+}
+"""
+
+
+class CDPError(Exception):
+    """CDP命令返回错误或连接已断开"""
+
+
+class CDPConnection:
+    """浏览器级别的CDP WebSocket连接，通过flatten会话复用给所有标签页"""
+
+    def __init__(self, ws_url: str):
+        self.ws_url = ws_url
+        self._ws = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._handlers: Dict[Tuple[Optional[str], str], List[Callable[[dict], None]]] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    async def connect(self):
+        """建立WebSocket连接并启动消息读取任务"""
+        # CDP消息（如完整HTML）可能很大，不限制单条消息大小
+        self._ws = await websockets.connect(self.ws_url, max_size=None, ping_interval=None)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    @property
+    def closed(self) -> bool:
+        return self._reader is None or self._reader.done()
+
+    async def send(self, method: str, params: Optional[dict] = None, session_id: Optional[str] = None,
+                   timeout: float = CDP_COMMAND_TIMEOUT) -> dict:
+        """发送CDP命令并等待结果"""
+        if self.closed:
+            raise CDPError("CDP连接已断开")
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await self._ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise CDPError(f"CDP命令 {method} 超时")
+        finally:
+            self._pending.pop(message_id, None)
+
+    def on(self, method: str, callback: Callable[[dict], None], session_id: Optional[str] = None):
+        """订阅CDP事件，回调在事件循环中执行"""
+        self._handlers.setdefault((session_id, method), []).append(callback)
+
+    def off(self, method: str, callback: Callable[[dict], None], session_id: Optional[str] = None):
+        """取消订阅CDP事件"""
+        handlers = self._handlers.get((session_id, method), [])
+        if callback in handlers:
+            handlers.remove(callback)
+
+    def remove_session(self, session_id: str):
+        """移除会话的所有事件订阅"""
+        for key in [k for k in self._handlers if k[0] == session_id]:
+            del self._handlers[key]
+
+    async def _read_loop(self):
+        """读取消息，把命令结果交给等待者，把事件分发给订阅者"""
+        try:
+            async for raw in self._ws:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self._pending.get(message["id"])
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CDPError(message["error"].get("message", str(message["error"]))))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+                for callback in self._handlers.get((message.get("sessionId"), message.get("method")), []):
+                    try:
+                        callback(message.get("params", {}))
+                    except Exception as e:
+                        logger.debug(f"处理CDP事件 {message.get('method')} 时出错: {e}")
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("CDP连接已断开"))
+
+    async def close(self):
+        """关闭连接"""
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+class AsyncCDPTab:
+    """通过flatten会话控制的单个标签页"""
+
+    def __init__(self, conn: CDPConnection, target_id: str, session_id: str):
+        self.conn = conn
+        self.target_id = target_id
+        self.session_id = session_id
+        self.url = ''
+
+    async def send(self, method: str, **params) -> dict:
+        """在标签页会话中发送CDP命令"""
+        return await self.conn.send(method, params, session_id=self.session_id)
+
+    async def run_js(self, expression: str, await_promise: bool = False) -> Any:
+        """执行JavaScript表达式并按值返回结果"""
+        result = await self.send('Runtime.evaluate', expression=expression, returnByValue=True,
+                                 awaitPromise=await_promise)
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get('description') or details.get('text'))
+        return result.get('result', {}).get('value')
+
+    async def call_js(self, body: str, *args) -> Any:
+        """以函数形式执行脚本，参数通过arguments传入"""
+        return await self.run_js(f"(function() {{ {body} }}).apply(null, {json.dumps(list(args))})")
+
+    async def html(self) -> str:
+        """获取当前文档的HTML"""
+        return await self.run_js('document.documentElement ? document.documentElement.outerHTML : ""') or ''
+
+    async def is_loading(self) -> bool:
+        return await self.run_js('document.readyState') == 'loading'
+
+    async def stop_loading(self):
+        await self.send('Page.stopLoading')
+
+    async def close(self):
+        """关闭标签页"""
+        await self.conn.send('Target.closeTarget', {"targetId": self.target_id})
+        self.conn.remove_session(self.session_id)
+
+    async def wait_ele(self, selector: str, timeout: float) -> bool:
+        """等待元素出现并可见"""
+        end = time.monotonic() + timeout
+        while True:
+            try:
+                visible = await self.call_js(
+                    FIND_ELEMENTS_JS +
+                    'const e = __ntcFind(arguments[0], false);'
+                    'return !!(e && (e.offsetWidth || e.offsetHeight || e.getClientRects().length));',
+                    selector
+                )
+            except CDPError:
+                # 导航过程中执行上下文会被销毁，稍后重试
+                visible = False
+            if visible:
+                return True
+            if time.monotonic() >= end:
+                return False
+            await current_deadline().asleep(0.2)
+
+    async def click(self, selector: str, timeout: float = 0):
+        """滚动到元素并在其中心派发真实鼠标事件，元素不可见时回退为JS点击"""
+        if timeout and not await self.wait_ele(selector, timeout):
+            raise RuntimeError(f"未找到元素: {selector}")
+        point = await self.call_js(
+            FIND_ELEMENTS_JS +
+            'const e = __ntcFind(arguments[0], false);'
+            'if (!e) { return null; }'
+            'e.scrollIntoView({block: "center", inline: "center"});'
+            'const r = e.getBoundingClientRect();'
+            'if (!r.width || !r.height) { e.click(); return {js: true}; }'
+            'return {x: r.left + r.width / 2, y: r.top + r.height / 2};',
+            selector
+        )
+        if point is None:
+            raise RuntimeError(f"未找到元素: {selector}")
+        if point.get('js'):
+            return
+        await self.click_at(point['x'], point['y'])
+
+    async def click_at(self, x: float, y: float):
+        """在视口坐标处派发一次鼠标点击"""
+        for event_type in ('mouseMoved', 'mousePressed', 'mouseReleased'):
+            await self.send('Input.dispatchMouseEvent', type=event_type, x=x, y=y, button='left', clickCount=1)
+
+    async def input(self, selector: str, value: str, clear: bool = True):
+        """聚焦元素并输入文本"""
+        found = await self.call_js(
+            FIND_ELEMENTS_JS +
+            'const e = __ntcFind(arguments[0], false);'
+            'if (!e) { return false; }'
+            'e.focus();'
+            'if (arguments[1]) { e.value = ""; e.dispatchEvent(new Event("input", {bubbles: true})); }'
+            'return true;',
+            selector, clear
+        )
+        if not found:
+            raise RuntimeError(f"未找到元素: {selector}")
+        await self.send('Input.insertText', text=str(value))
+
+    async def extract(self, selector: str, attr: Optional[str], multiple: bool) -> Any:
+        """提取元素文本、HTML或属性值"""
+        return await self.call_js(
+            FIND_ELEMENTS_JS +
+            'const attr = arguments[1];'
+            'const value = e => !attr ? e.innerText : (attr === "html" ? e.outerHTML : e.getAttribute(attr));'
+            'if (arguments[2]) { return __ntcFind(arguments[0], true).map(value); }'
+            'const e = __ntcFind(arguments[0], false);'
+            'if (!e) { throw new Error("未找到元素: " + arguments[0]); }'
+            'return value(e);',
+            selector, attr, multiple
+        )
+
+
+class AsyncCDPBrowserManager(BrowserEngineBase):
+    """
+    与BrowserManager接口一致的异步浏览器管理器
+
+    直接通过CDP WebSocket驱动Chromium，标签页操作都是协程，路由在事件循环中直接await，不占用工作线程
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.profile = ProfileManager()
+        self.profile.prepare()
+        self.chromium_options = create_chromium_options(self.profile.active_path)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.conn: Optional[CDPConnection] = None
+        self.resource_usage: Optional[dict] = None
+        self._monitor_task = None
+        self._profile_task = None
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def dp(self) -> Optional[CDPConnection]:
+        """兼容BrowserManager.dp，用于状态检查"""
+        return self.conn
+
+    def _launch_arguments(self) -> List[str]:
+        """复用DrissionPage的启动参数，改为由本引擎自行指定调试端口"""
+        arguments = [a for a in self.chromium_options.arguments
+                     if not a.startswith(('--remote-debugging-port', '--user-data-dir'))]
+        return arguments + [
+            f'--user-data-dir={self.profile.active_path}',
+            '--remote-debugging-port=0',
+            'about:blank',
+        ]
+
+    async def start(self):
+        """启动Chromium并连接到浏览器级别的CDP端点"""
+        browser_path = shutil.which(CHROME_PATH) or CHROME_PATH
+        port_file = os.path.join(self.profile.active_path, 'DevToolsActivePort')
+        if os.path.exists(port_file):
+            os.remove(port_file)
+        self.process = await asyncio.create_subprocess_exec(
+            browser_path, *self._launch_arguments(),
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+
+        # 浏览器就绪后会把端口和WebSocket路径写入DevToolsActivePort
+        end = time.monotonic() + CDP_LAUNCH_TIMEOUT
+        while True:
+            if self.process.returncode is not None:
+                raise RuntimeError(f"浏览器启动失败，退出码: {self.process.returncode}")
+            try:
+                with open(port_file, 'r') as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() >= end:
+                raise RuntimeError("等待浏览器调试端口超时")
+            await asyncio.sleep(0.1)
+
+        self.conn = CDPConnection(f'ws://127.0.0.1:{lines[0]}{lines[1]}')
+        await self.conn.connect()
+        logger.info(f"CDP引擎已连接浏览器，进程ID: {self.process.pid}")
+
+    async def _stop_browser(self):
+        """关闭连接并结束浏览器进程"""
+        if self.conn is not None:
+            try:
+                await self.conn.send('Browser.close', timeout=5)
+            except Exception:
+                pass
+            await self.conn.close()
+        if self.process is not None and self.process.returncode is None:
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+
+    async def monitor_browser(self):
+        """定期监控浏览器状态，进程退出或连接断开时重启"""
+        while True:
+            await asyncio.sleep(BROWSER_MONITOR_INTERVAL)
+            if self.process is None:
+                continue
+            if self.process.returncode is None and self.conn is not None and not self.conn.closed:
+                continue
+            logger.warning("检测到浏览器异常")
+            async with self.lock:
+                try:
+                    await self._stop_browser()
+                except Exception as close_err:
+                    logger.error(f"关闭浏览器时出错：{close_err}")
+                await asyncio.to_thread(self.profile.sync_to_disk, False)
+                await asyncio.to_thread(self.profile.purge)
+                try:
+                    await self.start()
+                    logger.info("浏览器已重启")
+                except Exception as e:
+                    logger.error(f"重启浏览器失败: {e}")
+                self.contexts.clear()
+                for tab_name in list(self.tabs_pool.keys()):
+                    self._forget_tab(tab_name)
+                    tab_event_bus.publish('tab_evicted', tab_name, reason='browser_restart')
+
+    async def purge_profile(self) -> dict:
+        """在浏览器运行期间清理缓存：通过CDP清空HTTP缓存，并删除崩溃转储等目录"""
+        result = await asyncio.to_thread(self.profile.purge, True)
+        try:
+            tab = next(iter(self.tabs_pool.values()), None)
+            if tab is None:
+                raise CDPError("没有可用于清空缓存的标签页")
+            await tab.send('Network.clearBrowserCache')
+            result["http_cache_cleared"] = True
+        except Exception as e:
+            logger.warning(f"清空浏览器HTTP缓存失败: {e}")
+            result["http_cache_cleared"] = False
+        return result
+
+    async def start_monitoring(self):
+        """启动浏览器监控任务"""
+        self._monitor_task = asyncio.create_task(self.monitor_browser())
+        self._profile_task = asyncio.create_task(self.maintain_profile())
+
+    async def stop_monitoring(self):
+        """停止浏览器监控任务"""
+        for task in (self._monitor_task, self._profile_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def _attach(self, target_id: str, tab_name: str) -> AsyncCDPTab:
+        """附加到目标并订阅生命周期事件"""
+        session_id = (await self.conn.send('Target.attachToTarget', {"targetId": target_id, "flatten": True}))['sessionId']
+        tab = AsyncCDPTab(self.conn, target_id, session_id)
+
+        def on_frame_navigated(params: dict):
+            frame = params.get('frame', {})
+            if not frame.get('parentId'):
+                tab.url = frame.get('url', tab.url)
+                tab_event_bus.publish('navigation_committed', tab_name, url=tab.url)
+
+        self.conn.on('Page.frameNavigated', on_frame_navigated, session_id)
+        self.conn.on('Page.loadEventFired', lambda params: tab_event_bus.publish('load_finished', tab_name, url=tab.url),
+                     session_id)
+        self.conn.on('Inspector.targetCrashed', lambda params: tab_event_bus.publish('tab_crashed', tab_name),
+                     session_id)
+        await asyncio.gather(tab.send('Page.enable'), tab.send('Inspector.enable'))
+        if ASSET_CACHE_ENABLED:
+            await self._attach_asset_cache(tab)
+        return tab
+
+    async def _attach_asset_cache(self, tab: AsyncCDPTab):
+        """拦截标签页的静态资源请求，使其经过共享资源缓存"""
+        def on_request_paused(params: dict):
+            task = asyncio.create_task(self._on_request_paused(tab, params))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        self.conn.on('Fetch.requestPaused', on_request_paused, tab.session_id)
+        patterns = [{"urlPattern": "*", "resourceType": resource_type, "requestStage": stage}
+                    for resource_type in ASSET_CACHE_TYPES for stage in ('Request', 'Response')]
+        await tab.send('Fetch.enable', patterns=patterns)
+
+    @staticmethod
+    async def _on_request_paused(tab: AsyncCDPTab, params: dict):
+        """命中共享缓存时直接返回资源，未命中时在响应阶段写入缓存"""
+        request_id = params['requestId']
+        url = params['request']['url']
+        status = params.get('responseStatusCode')
+        headers = params.get('responseHeaders') or []
+        try:
+            if params['request'].get('method') == 'GET':
+                if status is None:
+                    cached = await asyncio.to_thread(asset_cache.get, url)
+                    if cached:
+                        code, cached_headers, body = cached
+                        await tab.send('Fetch.fulfillRequest', requestId=request_id, responseCode=code,
+                                       responseHeaders=cached_headers, body=encode_body(body))
+                        return
+                elif asset_cache.cacheable(status, headers):
+                    body = decode_body(await tab.send('Fetch.getResponseBody', requestId=request_id))
+                    await asyncio.to_thread(asset_cache.put, url, status, headers, body)
+                    await tab.send('Fetch.fulfillRequest', requestId=request_id, responseCode=status,
+                                   responseHeaders=fulfill_headers(headers), body=encode_body(body))
+                    return
+            await tab.send('Fetch.continueRequest', requestId=request_id)
+        except Exception as e:
+            logger.debug(f"处理资源请求 {url} 时出错: {e}")
+            try:
+                await tab.send('Fetch.continueRequest', requestId=request_id)
+            except Exception:
+                pass
+
+    async def _get_or_create_context(self, context: str) -> str:
+        """按名称获取浏览器上下文ID，不存在时创建"""
+        async with self.lock:
+            context_id = self.contexts.get(context)
+            if context_id is None:
+                result = await self.conn.send('Target.createBrowserContext', {"disposeOnDetach": False})
+                context_id = result['browserContextId']
+                self.contexts[context] = context_id
+                logger.info(f"已创建浏览器上下文: {context}")
+            return context_id
+
+    async def create_tab(self, url: str, tab_name: str, cookie: Optional[str] = None,
+                         local_storage: Optional[Dict[str, str]] = None, user_agent: Optional[str] = None,
+                         context: Optional[str] = None, browser: Optional[str] = None) -> dict:
+        """创建新的浏览器标签页，指定context时放入对应的独立浏览器上下文（只有一个浏览器，忽略browser）"""
+        if tab_name in self.tabs_pool:
+            raise ValueError(f"标签页名称 '{tab_name}' 已存在")
+
+        logger.debug(f"正在访问: {url}")
+        deadline = current_deadline()
+        tab = None
+        try:
+            params = {"url": 'about:blank'}
+            if context:
+                params["browserContextId"] = await self._get_or_create_context(context)
+                self.tab_contexts[tab_name] = context
+            target_id = (await self.conn.send('Target.createTarget', params))['targetId']
+            tab = await self._attach(target_id, tab_name)
+            deadline.check()
+
+            await tab.send('Page.addScriptToEvaluateOnNewDocument', source=JS_SCRIPT)
+            if user_agent:
+                await tab.send('Network.setUserAgentOverride', userAgent=user_agent)
+                logger.debug(f"已设置自定义User-Agent: {user_agent}")
+            if cookie:
+                cookies = []
+                for item in cookie.split(';'):
+                    name, sep, value = item.strip().partition('=')
+                    if sep and name:
+                        cookies.append({"name": name, "value": value, "url": url})
+                await tab.send('Network.setCookies', cookies=cookies)
+
+            deadline.check()
+            await self._navigate(tab, url)
+            if local_storage:
+                # localStorage按源存储，需要在目标页面上设置后重新访问
+                await tab.call_js(
+                    'for (const [k, v] of Object.entries(arguments[0])) { localStorage.setItem(k, v); }',
+                    local_storage
+                )
+                await self._navigate(tab, url)
+            deadline.check()
+
+            self.tabs_pool[tab_name] = tab
+            self.tab_last_used[tab_name] = time.monotonic()
+            tab_event_bus.publish('tab_created', tab_name, url=tab.url)
+            return {"code": 0, "message": "标签页创建成功", "tab_name": tab_name}
+
+        except (Exception, asyncio.CancelledError) as e:
+            logger.error(f"创建标签页 {tab_name} 时出错: {e!r}")
+            self.tab_contexts.pop(tab_name, None)
+            if tab is not None:
+                await self._close_target(tab)
+                logger.info(f"异常中已关闭标签页: {tab_name}")
+            if isinstance(e, (RequestAborted, asyncio.CancelledError)):
+                raise
+            raise RuntimeError(f"创建标签页失败，内部错误: {e}")
+
+    async def _navigate(self, tab: AsyncCDPTab, url: str):
+        """访问URL并等待页面基本稳定"""
+        deadline = current_deadline()
+        result = await tab.send('Page.navigate', url=url)
+        if result.get('errorText'):
+            logger.warning(f"访问 {url} 出错: {result['errorText']}")
+        tab.url = url
+        if not await tab.wait_ele('body', deadline.clamp(15)):
+            logger.warning(f"页面基本元素加载较慢: {url}")
+        # 主动停止加载，防止页面无限转圈
+        await tab.stop_loading()
+        await deadline.asleep(1)
+
+    async def _check_challenge(self, tab: AsyncCDPTab) -> Tuple[bool, bool]:
+        """按域名策略检测挑战；发现挑战后等待其自动通过，Turnstile复选框通过坐标点击"""
+        deadline = current_deadline()
+        tab_name = self._tab_name_of(tab)
+        domain = domain_of(tab.url)
+        strategy = self.challenge_profile.strategy(domain)
+
+        started = time.monotonic()
+        if strategy not in (STRATEGY_SKIP, STRATEGY_PROBE):
+            # 与完整流程一致，先给页面时间完成跳转
+            await deadline.asleep(5)
+        challenge_type = detect_challenge_type(await tab.html())
+        if challenge_type is None:
+            if strategy == STRATEGY_SKIP:
+                self.challenge_profile.record_skip(domain)
+            else:
+                self.challenge_profile.record_check(domain)
+            return True, False
+        if strategy != STRATEGY_FULL:
+            logger.debug(f"{strategy} 模式下发现 {domain} 出现挑战 {challenge_type}，改用完整流程")
+
+        tab_event_bus.publish('challenge_detected', tab_name, url=tab.url, challenge_type=challenge_type)
+        success = False
+        for _ in range(3):
+            if challenge_type == 'turnstile':
+                await self._click_turnstile(tab)
+            await deadline.asleep(5)
+            if detect_challenge_type(await tab.html()) is None:
+                success = True
+                break
+
+        elapsed = round(time.monotonic() - started, 3)
+        tab_event_bus.publish('challenge_solved' if success else 'challenge_failed', tab_name, url=tab.url,
+                              elapsed=elapsed)
+        self.challenge_profile.record_check(domain, challenge_type, elapsed, success)
+        return success, True
+
+    @staticmethod
+    async def _click_turnstile(tab: AsyncCDPTab):
+        """点击Turnstile组件左侧的复选框位置"""
+        point = await tab.run_js(
+            '(() => {'
+            'const input = document.querySelector("input[name=cf-turnstile-response]");'
+            'const box = input && input.parentElement;'
+            'if (!box) { return null; }'
+            'const r = box.getBoundingClientRect();'
+            'return {x: r.left + 30, y: r.top + r.height / 2};'
+            '})()'
+        )
+        if point:
+            await tab.click_at(point['x'], point['y'])
+
+    async def get_tab_html(self, tab: AsyncCDPTab) -> str:
+        """从标签页获取HTML内容"""
+        deadline = current_deadline()
+        await self._check_challenge(tab)
+        try:
+            await deadline.asleep(1)
+            if await tab.is_loading():
+                logger.debug(f"页面仍在加载，主动停止: {tab.url}")
+                await tab.stop_loading()
+            await deadline.asleep(0.5)
+        except RequestAborted:
+            raise
+        except Exception as e:
+            logger.warning(f"等待页面稳定时出错: {e}")
+        await tab.stop_loading()
+        html = await tab.html()
+        logger.debug(f"成功获取网站 {tab.url} 的HTML，长度: {len(html)} 字符")
+        return html
+
+    async def refresh_tab(self, tab: AsyncCDPTab, wait_for: Optional[str] = None, wait_timeout: float = 15) -> str:
+        """重新加载标签页，处理挑战并等待wait_for元素出现后获取HTML，用于定时刷新"""
+        deadline = current_deadline()
+        await tab.send('Page.reload')
+        if not await tab.wait_ele('body', deadline.clamp(15)):
+            logger.warning(f"页面基本元素加载较慢: {tab.url}")
+        await tab.stop_loading()
+        await deadline.asleep(1)
+        await self._check_challenge(tab)
+        if wait_for and not await tab.wait_ele(wait_for, deadline.clamp(wait_timeout)):
+            raise RuntimeError(f"等待元素超时: {wait_for}")
+        await tab.stop_loading()
+        return await tab.html()
+
+    @staticmethod
+    async def _read_recorder(tab: AsyncCDPTab, since: int) -> Optional[dict]:
+        state = await tab.call_js(RECORDER_STATE_JS, since)
+        return json.loads(state) if state is not None else None
+
+    @staticmethod
+    async def _install_recorder(tab: AsyncCDPTab):
+        logger.debug(f"在页面 {tab.url} 中安装DOM变更记录器")
+        await tab.send('Page.addScriptToEvaluateOnNewDocument', source=MUTATION_RECORDER_JS)
+        await tab.run_js(MUTATION_RECORDER_JS)
+
+    @staticmethod
+    async def _recorder_snapshot(tab: AsyncCDPTab) -> dict:
+        return json.loads(await tab.run_js('JSON.stringify(window.__ntcRecorder.snapshot())'))
+
+    async def click_element(self, tab: AsyncCDPTab, selector: str):
+        """在标签页中点击元素"""
+        await self._check_challenge(tab)
+        current_deadline().check()
+        try:
+            await tab.click(selector)
+        except Exception as e:
+            logger.error(f"点击元素失败 {selector}: {e}")
+            raise
+
+    async def _run_action_step(self, tab: AsyncCDPTab, step: Dict[str, Any]):
+        """执行单个操作步骤，返回提取结果（如有）"""
+        action = step['action']
+        selector = step.get('selector')
+        timeout = current_deadline().clamp(step.get('timeout', 10))
+
+        if action == 'navigate':
+            await self.rate_limiter.acquire(step['url'])
+            await self._navigate(tab, step['url'])
+            return tab.url
+
+        if not await tab.wait_ele(selector, timeout) and not (action == 'extract' and step.get('multiple')):
+            raise RuntimeError(f"{'等待元素超时' if action == 'wait_for' else '未找到元素'}: {selector}")
+
+        if action == 'input':
+            await tab.input(selector, step['value'], step.get('clear', True))
+        elif action == 'click':
+            await tab.click(selector)
+        elif action == 'extract':
+            return await tab.extract(selector, step.get('attr'), bool(step.get('multiple')))
+        return None
+
+    def _forget_tab(self, tab_name: str):
+        """从所有登记表中移除标签页，并停止分发其会话的事件"""
+        tab = super()._forget_tab(tab_name)
+        if tab is not None:
+            self.conn.remove_session(tab.session_id)
+        return tab
+
+    async def _close_target(self, tab: AsyncCDPTab):
+        """关闭标签页对应的目标"""
+        try:
+            await tab.close()
+        except Exception as e:
+            logger.error(f"关闭标签页目标 {tab.target_id} 时出错: {e}")
+            self.conn.remove_session(tab.session_id)
+
+    async def close_tab(self, tab_name: str):
+        """关闭特定标签页"""
+        if tab_name not in self.tabs_pool:
+            raise ValueError(f"标签页 '{tab_name}' 未找到")
+        tab = self.tabs_pool[tab_name]
+        url = tab.url
+        self._forget_tab(tab_name)
+        await self._close_target(tab)
+        tab_event_bus.publish('tab_closed', tab_name, url=url)
+        logger.debug(f"已关闭页面: {url}")
+
+    async def _dispose_context(self, context_id: str):
+        await self.conn.send('Target.disposeBrowserContext', {"browserContextId": context_id})
+
+    async def trace_tab(self, tab: AsyncCDPTab, seconds: float, categories: List[str]) -> List[dict]:
+        """在给定时长内记录标签页的CDP性能跟踪，返回Chrome跟踪事件"""
+        events: List[dict] = []
+        complete = asyncio.Event()
+
+        def on_data(params: dict):
+            events.extend(params.get('value', []))
+
+        def on_complete(params: dict):
+            complete.set()
+
+        self.conn.on('Tracing.dataCollected', on_data, tab.session_id)
+        self.conn.on('Tracing.tracingComplete', on_complete, tab.session_id)
+        try:
+            await tab.send('Tracing.start', transferMode='ReportEvents', traceConfig={"includedCategories": categories})
+            try:
+                await current_deadline().asleep(seconds)
+            finally:
+                # 请求被放弃时也要结束跟踪，避免浏览器持续记录
+                await tab.send('Tracing.end')
+                try:
+                    await asyncio.wait_for(complete.wait(), 10)
+                except asyncio.TimeoutError:
+                    logger.warning(f"等待性能跟踪数据超时: {tab.url}")
+        finally:
+            self.conn.off('Tracing.dataCollected', on_data, tab.session_id)
+            self.conn.off('Tracing.tracingComplete', on_complete, tab.session_id)
+        return events
+
+    async def export_tab(self, tab_name: str) -> dict:
+        """导出标签页的可迁移状态，用于在分片之间重建标签页"""
+        tab = self.get_tab(tab_name)
+        cookies = (await tab.send('Network.getCookies', urls=[tab.url]))['cookies']
+        local_storage = await tab.run_js('JSON.stringify(Object.assign({}, localStorage))')
+        return {
+            "tab_name": tab_name,
+            "url": tab.url,
+            "cookie": '; '.join(f"{c['name']}={c['value']}" for c in cookies) or None,
+            "local_storage": json.loads(local_storage) if local_storage else None,
+            "user_agent": await tab.run_js('navigator.userAgent'),
+            "context": self.tab_contexts.get(tab_name),
+            "browser": None,
+        }
+
+    async def move_tab(self, tab_name: str, browser: str) -> dict:
+        """cdp引擎不支持混合模式"""
+        raise ValueError("cdp引擎只有一个浏览器，不支持在浏览器之间移动标签页")
+
+    async def cleanup(self):
+        """清理浏览器资源"""
+        await self.stop_monitoring()
+        try:
+            await self._stop_browser()
+        except Exception as e:
+            logger.error(f"浏览器清理过程中出错: {e}")
+        self.challenge_profile.save()
+        try:
+            self.profile.sync_to_disk(running=False)
+        except Exception as e:
+            logger.error(f"同步配置文件时出错: {e}")
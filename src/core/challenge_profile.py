@@ -0,0 +1,186 @@
+"""按域名学习挑战出现情况，选择检测策略"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from src.config.settings import (
+    CHALLENGE_PROBE_AFTER, CHALLENGE_PROFILE_ENABLED, CHALLENGE_PROFILE_PATH, CHALLENGE_PROFILE_SAVE_INTERVAL,
+    CHALLENGE_SKIP_AFTER, CHALLENGE_SKIP_RECHECK
+)
+
+# 检测策略
+STRATEGY_FULL = 'full'    # 完整的挑战求解流程（challenge_solver）
+STRATEGY_PROBE = 'probe'  # 只对当前HTML做一次快速检测，发现挑战再升级为完整流程
+STRATEGY_SKIP = 'skip'    # 不计入检测，只做与快速探测相同的廉价检查，发现挑战同样升级为完整流程
+
+# 平均求解耗时的指数平滑系数
+SOLVE_TIME_ALPHA = 0.3
+
+
+def domain_of(url: Optional[str]) -> Optional[str]:
+    """提取URL中的域名"""
+    if not url:
+        return None
+    hostname = urlparse(url).hostname
+    return hostname.lower() if hostname else None
+
+
+class ChallengeProfile:
+    """记录每个域名的挑战频率、类型和求解耗时，并据此选择检测策略"""
+
+    def __init__(self, path: Optional[str] = CHALLENGE_PROFILE_PATH, enabled: bool = CHALLENGE_PROFILE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self.domains: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self.load()
+
+    @staticmethod
+    def _new_stats() -> dict:
+        return {
+            "checks": 0,
+            "skips": 0,
+            "challenges": 0,
+            "solved": 0,
+            "challenge_types": {},
+            "clean_streak": 0,
+            "skips_since_check": 0,
+            "avg_solve_time": None,
+            "last_challenge_at": None,
+            "last_check_at": None,
+        }
+
+    def _strategy_for(self, stats: Optional[dict]) -> str:
+        """根据统计数据选择策略（不修改状态）"""
+        if not self.enabled or stats is None:
+            return STRATEGY_FULL
+        streak = stats["clean_streak"]
+        if streak >= CHALLENGE_SKIP_AFTER:
+            # 跳过模式下定期探测，以便发现站点重新启用挑战
+            if stats["skips_since_check"] + 1 >= CHALLENGE_SKIP_RECHECK:
+                return STRATEGY_PROBE
+            return STRATEGY_SKIP
+        if streak >= CHALLENGE_PROBE_AFTER:
+            return STRATEGY_PROBE
+        return STRATEGY_FULL
+
+    def strategy(self, domain: Optional[str]) -> str:
+        """选择本次请求使用的检测策略"""
+        if domain is None:
+            return STRATEGY_FULL
+        with self._lock:
+            return self._strategy_for(self.domains.get(domain))
+
+    def record_skip(self, domain: Optional[str]):
+        """记录一次跳过检测"""
+        if domain is None:
+            return
+        with self._lock:
+            stats = self.domains.setdefault(domain, self._new_stats())
+            stats["skips"] += 1
+            stats["skips_since_check"] += 1
+            self._dirty = True
+        self.maybe_save()
+
+    def record_check(self, domain: Optional[str], challenge_type: Optional[str] = None,
+                     solve_time: Optional[float] = None, solved: bool = False):
+        """记录一次检测结果，challenge_type为None表示未遇到挑战"""
+        if domain is None:
+            return
+        with self._lock:
+            stats = self.domains.setdefault(domain, self._new_stats())
+            stats["checks"] += 1
+            stats["skips_since_check"] = 0
+            stats["last_check_at"] = time.time()
+            if challenge_type is None:
+                stats["clean_streak"] += 1
+            else:
+                # 再次遇到挑战，回退到完整检测
+                stats["clean_streak"] = 0
+                stats["challenges"] += 1
+                stats["last_challenge_at"] = time.time()
+                types = stats["challenge_types"]
+                types[challenge_type] = types.get(challenge_type, 0) + 1
+                if solved:
+                    stats["solved"] += 1
+                    if solve_time is not None:
+                        previous = stats["avg_solve_time"]
+                        stats["avg_solve_time"] = round(
+                            solve_time if previous is None
+                            else previous + SOLVE_TIME_ALPHA * (solve_time - previous), 3
+                        )
+            self._dirty = True
+        self.maybe_save()
+
+    def snapshot(self) -> dict:
+        """返回所有域名的统计数据及当前策略"""
+        with self._lock:
+            return {
+                domain: {
+                    **stats,
+                    "challenge_rate": round(stats["challenges"] / stats["checks"], 3) if stats["checks"] else None,
+                    "strategy": self._strategy_for(stats),
+                }
+                for domain, stats in self.domains.items()
+            }
+
+    def reset(self, domain: Optional[str] = None):
+        """清除某个域名（或全部）的统计数据"""
+        with self._lock:
+            if domain is None:
+                self.domains.clear()
+            elif domain in self.domains:
+                del self.domains[domain]
+            else:
+                raise ValueError(f"域名 '{domain}' 没有挑战统计数据")
+            self._dirty = True
+        self.save()
+
+    def load(self):
+        """从磁盘加载统计数据"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                for domain, stats in data.get("domains", {}).items():
+                    self.domains[domain] = {**self._new_stats(), **stats}
+            logger.info(f"已加载 {len(self.domains)} 个域名的挑战统计数据")
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载挑战统计数据失败: {e}")
+
+    def save(self):
+        """把统计数据写入磁盘"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"domains": self.domains}, ensure_ascii=False, indent=2)
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"保存挑战统计数据失败: {e}")
+
+    def maybe_save(self):
+        """距上次写盘超过间隔时保存"""
+        if time.monotonic() - self._last_save >= CHALLENGE_PROFILE_SAVE_INTERVAL:
+            self.save()
+
+
+# 全局挑战统计实例
+challenge_profile = ChallengeProfile()
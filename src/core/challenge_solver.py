@@ -0,0 +1,267 @@
+"""多路复用的挑战求解状态机：等待由事件循环调度，多个标签页共用少量线程执行检查和点击"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from DrissionPage.items import MixTab
+from loguru import logger
+
+from src.config.settings import (
+    CHALLENGE_LOCATE_TIMEOUT, CHALLENGE_POLL_INTERVAL, CHALLENGE_SETTLE_TIME, CHALLENGE_SOLVE_ATTEMPTS,
+    CHALLENGE_SOLVER_WORKERS, CHALLENGE_SUCCESS_TIMEOUT, CHALLENGE_VERIFY_TIME
+)
+from src.core.deadline import current_deadline
+from src.utils.challenge_utils import detect_challenge_type
+
+# 求解状态：检测挑战 -> 定位组件 -> 点击 -> 等待成功标记 -> 确认挑战页面已消失
+STATE_DETECT = 'detect'
+STATE_LOCATE = 'locate'
+STATE_CLICK = 'click'
+STATE_AWAIT_SUCCESS = 'await_success'
+STATE_VERIFY = 'verify'
+STATE_DONE = 'done'
+SOLVER_STATES = (STATE_DETECT, STATE_LOCATE, STATE_CLICK, STATE_AWAIT_SUCCESS, STATE_VERIFY)
+
+
+class ChallengeTask:
+    """单个标签页的求解进度"""
+
+    def __init__(self, tab: MixTab, tab_name: Optional[str], on_challenge: Optional[Callable[[str], None]] = None):
+        self.tab = tab
+        self.tab_name = tab_name
+        self.on_challenge = on_challenge
+        self.state = STATE_DETECT
+        self.attempt = 1
+        # 检测阶段已完成的检查次数
+        self.checks = 0
+        self.challenge_type: Optional[str] = None
+        self.was_challenge = False
+        self.success = False
+        # Turnstile iframe内的shadow root和复选框
+        self.box = None
+        self.button = None
+        self.started = time.monotonic()
+        self.state_started = self.started
+        self.timings: Dict[str, float] = {}
+
+    def enter(self, state: str):
+        """切换状态并累计上一状态的耗时"""
+        now = time.monotonic()
+        self.timings[self.state] = self.timings.get(self.state, 0.0) + now - self.state_started
+        self.state = state
+        self.state_started = now
+
+    def elapsed_in_state(self) -> float:
+        return time.monotonic() - self.state_started
+
+    def finish(self, success: bool, was_challenge: bool = True):
+        self.success = success
+        self.was_challenge = was_challenge
+        self.enter(STATE_DONE)
+
+    def snapshot(self) -> dict:
+        """返回当前进度，用于查看正在求解的标签页"""
+        return {
+            "tab_name": self.tab_name,
+            "state": self.state,
+            "attempt": self.attempt,
+            "challenge_type": self.challenge_type,
+            "elapsed": round(time.monotonic() - self.started, 3),
+            "state_elapsed": round(self.elapsed_in_state(), 3),
+        }
+
+
+class ChallengeSolver:
+    """
+    驱动所有标签页的求解状态机
+
+    每个状态的处理函数只做一次不等待的检查或点击，返回下一次执行前需要等待的秒数；
+    等待在事件循环中完成，因此同时处于挑战中的标签页不会各自占用一个线程。
+    挑战是否存在一律用detect_challenge_type判断，与按域名策略的快速探测一致
+    """
+
+    def __init__(self, workers: int = CHALLENGE_SOLVER_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.active: Dict[int, ChallengeTask] = {}
+        self.outcomes = {"solved": 0, "failed": 0, "no_challenge": 0, "aborted": 0}
+        self.state_stats = {state: {"count": 0, "total": 0.0, "max": 0.0} for state in SOLVER_STATES}
+        self._handlers = {
+            STATE_DETECT: self._detect,
+            STATE_LOCATE: self._locate,
+            STATE_CLICK: self._click,
+            STATE_AWAIT_SUCCESS: self._await_success,
+            STATE_VERIFY: self._verify,
+        }
+
+    async def solve(self, tab: MixTab, tab_name: Optional[str] = None,
+                    on_challenge: Optional[Callable[[str], None]] = None) -> Tuple[bool, bool]:
+        """
+        求解标签页上的挑战，直到成功、失败或请求被放弃
+
+        Args:
+            tab: 标签页
+            tab_name: 标签页名称
+            on_challenge: 首次检测到挑战时以挑战类型调用（在工作线程中）
+
+        Returns:
+            Tuple[bool, bool]: (成功, 是否挑战)
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='challenge-solver')
+        loop = asyncio.get_running_loop()
+        deadline = current_deadline()
+        task = ChallengeTask(tab, tab_name, on_challenge)
+        self.active[id(task)] = task
+        outcome = 'aborted'
+        try:
+            while task.state != STATE_DONE:
+                delay = await loop.run_in_executor(self._executor, self._handlers[task.state], task)
+                if delay > 0:
+                    await deadline.asleep(delay)
+                else:
+                    deadline.check()
+            if task.was_challenge:
+                outcome = 'solved' if task.success else 'failed'
+            else:
+                outcome = 'no_challenge'
+            return task.success, task.was_challenge
+        finally:
+            del self.active[id(task)]
+            if task.state != STATE_DONE:
+                task.enter(STATE_DONE)
+            self._record(task, outcome)
+
+    def _detect(self, task: ChallengeTask) -> float:
+        """首次检查前等待页面跳转；未发现挑战时再等待一次确认，避免把跳转中的页面当作无挑战"""
+        if task.checks == 0:
+            task.checks = 1
+            return CHALLENGE_SETTLE_TIME
+        challenge_type = detect_challenge_type(task.tab.html)
+        if challenge_type is None:
+            if task.checks == 1:
+                task.checks = 2
+                return CHALLENGE_VERIFY_TIME
+            task.finish(True, was_challenge=False)
+            return 0
+        task.challenge_type = challenge_type
+        logger.debug(f"检测到挑战 {task.challenge_type}: {task.tab_name}")
+        if task.on_challenge:
+            task.on_challenge(task.challenge_type)
+        task.enter(STATE_LOCATE)
+        return 0
+
+    def _locate(self, task: ChallengeTask) -> float:
+        """
+        查找Turnstile复选框；挑战自行消失时直接进入确认
+
+        cloudflare/ddos-guard等待页没有可点击的组件，只能等待其自行通过或变成Turnstile，超时后本次尝试失败
+        """
+        tab = task.tab
+        if self._cleared(tab):
+            task.enter(STATE_VERIFY)
+            return CHALLENGE_VERIFY_TIME
+        try:
+            solution = tab.ele('tag:input@name=cf-turnstile-response', timeout=0)
+            if solution:
+                iframe = solution.parent().shadow_root.ele('tag:iframe', timeout=0)
+                if iframe:
+                    box = iframe.ele('tag:body', timeout=0).shadow_root
+                    button = box.ele('tag:input', timeout=0)
+                    if button:
+                        task.box, task.button = box, button
+                        task.enter(STATE_CLICK)
+                        return 0
+        except Exception as e:
+            logger.debug(f"定位挑战组件时出错: {e}")
+        if task.elapsed_in_state() >= CHALLENGE_LOCATE_TIMEOUT:
+            return self._retry(task, "未找到挑战组件")
+        return CHALLENGE_POLL_INTERVAL
+
+    def _click(self, task: ChallengeTask) -> float:
+        """点击复选框"""
+        try:
+            task.button.click()
+            logger.debug(f"已点击挑战复选框: {task.tab_name}")
+        except Exception as e:
+            logger.debug(f"点击挑战复选框失败: {e}")
+            return self._retry(task, "点击失败")
+        task.enter(STATE_AWAIT_SUCCESS)
+        return CHALLENGE_POLL_INTERVAL
+
+    def _await_success(self, task: ChallengeTask) -> float:
+        """等待组件显示成功标记，或页面已离开挑战"""
+        try:
+            if task.box.ele('tag:div@id=success', timeout=0).style('visibility') == 'visible':
+                task.enter(STATE_VERIFY)
+                return CHALLENGE_VERIFY_TIME
+        except Exception:
+            # 页面跳转后组件已失效
+            pass
+        if self._cleared(task.tab):
+            task.enter(STATE_VERIFY)
+            return 0
+        if task.elapsed_in_state() >= CHALLENGE_SUCCESS_TIMEOUT:
+            return self._retry(task, "等待成功标记超时")
+        return CHALLENGE_POLL_INTERVAL
+
+    def _verify(self, task: ChallengeTask) -> float:
+        """确认挑战页面已消失"""
+        if self._cleared(task.tab):
+            task.finish(True)
+            return 0
+        return self._retry(task, "挑战页面仍然存在")
+
+    @staticmethod
+    def _cleared(tab: MixTab) -> bool:
+        """页面上已没有任何可识别的挑战"""
+        return detect_challenge_type(tab.html) is None
+
+    @staticmethod
+    def _retry(task: ChallengeTask, reason: str) -> float:
+        """本次尝试失败，还有剩余次数时重新定位组件"""
+        logger.debug(f"第 {task.attempt} 次求解挑战失败（{reason}）: {task.tab_name}")
+        if task.attempt >= CHALLENGE_SOLVE_ATTEMPTS:
+            task.finish(False)
+            return 0
+        task.attempt += 1
+        task.box = task.button = None
+        task.enter(STATE_LOCATE)
+        return CHALLENGE_POLL_INTERVAL
+
+    def _record(self, task: ChallengeTask, outcome: str):
+        """累计结果和各状态耗时"""
+        self.outcomes[outcome] += 1
+        for state, seconds in task.timings.items():
+            stats = self.state_stats.get(state)
+            if stats is None:
+                continue
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def stats(self) -> dict:
+        """返回正在求解的标签页、结果统计和各状态的平均/最长耗时"""
+        return {
+            "workers": self.workers,
+            "active": [task.snapshot() for task in self.active.values()],
+            "outcomes": dict(self.outcomes),
+            "states": {
+                state: {
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total"] / stats["count"] * 1000, 1) if stats["count"] else None,
+                    "max_ms": round(stats["max"] * 1000, 1),
+                }
+                for state, stats in self.state_stats.items()
+            },
+        }
+
+    def shutdown(self):
+        """停止执行求解步骤的线程"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局挑战求解器实例
+challenge_solver = ChallengeSolver()
@@ -0,0 +1,81 @@
+"""Chromium启动参数配置"""
+import platform
+from typing import Optional
+
+from DrissionPage import ChromiumOptions
+from fake_useragent import UserAgent
+
+from src.config.settings import BROWSER_DEBUG_PORT, CHROME_PATH, PROFILE_CACHE_SIZE_MB, SHARD_ID
+
+
+def create_chromium_options(user_data_path: str, headless: bool = False, port: Optional[int] = None) -> ChromiumOptions:
+    """配置Chromium浏览器选项，headless为True时使用新版无头模式，port指定远程调试端口"""
+    ua = UserAgent(browsers=['Edge', 'Chrome'], os=['Linux'])
+    co = ChromiumOptions()
+    
+    # 基础配置
+    # co.set_argument('--disable-webgl')
+    co.set_argument('--disable-gpu')
+    co.set_argument('--lang=zh-CN.UTF-8')
+    if headless:
+        # 新版无头模式：页面不再绘制到Xvfb，用于批量任务
+        co.headless(True)
+    else:
+        # 移除headless模式，以便noVNC可以显示
+        co.set_argument('--no-headless')
+    
+    # 新增Chrome参数
+    co.set_argument('--no-first-run')
+    co.set_argument('--force-color-profile=srgb')
+    # 禁用指标记录和报告，减少browsermetrics文件生成
+    co.set_argument('--disable-metrics')
+    co.set_argument('--disable-metrics-reporting')
+    co.set_argument('--disable-breakpad')
+    co.set_argument('--disable-background-networking')
+    co.set_argument('--no-report-upload')
+    co.set_argument('--password-store=basic')
+    co.set_argument('--use-mock-keychain')
+    co.set_argument('--export-tagged-pdf')
+    co.set_argument('--no-default-browser-check')
+    co.set_argument('--disable-background-mode')
+    co.set_argument('--enable-features=NetworkService,NetworkServiceInProcess,LoadCryptoTokenExtension,PermuteTLSExtensions')
+    co.set_argument('--disable-features=FlashDeprecationWarning,EnablePasswordsAccountStorage,UMA')
+    co.set_argument('--deny-permission-prompts')
+    # 语言设置 - 使用完整的区域设置格式
+    co.set_argument('--accept-lang=zh-CN,zh-CN.UTF-8,zh,en-US,en')
+    co.set_argument('--force-language=zh-CN')
+    co.set_argument('--force-lang=zh-CN.UTF-8')
+    
+    # Linux系统特定配置
+    if platform.system() == "Linux":
+        co.set_argument('--no-sandbox')
+        co.set_argument('--disable-dev-shm-usage')
+
+    co.set_user_data_path(user_data_path)
+    # 限制HTTP磁盘缓存大小，避免配置文件无限增长
+    if PROFILE_CACHE_SIZE_MB > 0:
+        co.set_argument(f'--disk-cache-size={PROFILE_CACHE_SIZE_MB * 1024 * 1024}')
+
+    # 同一台机器上的多个分片（或混合模式下的两个浏览器）各自使用独立的调试端口
+    if port:
+        co.set_local_port(port)
+    elif SHARD_ID:
+        co.set_local_port(BROWSER_DEBUG_PORT)
+
+    # 设置自定义浏览器路径（如果提供）
+    if CHROME_PATH:
+        co.set_browser_path(CHROME_PATH)
+    
+    # 设置浏览器首选项（语言相关）
+    # 使用set_pref方法设置单个首选项
+    co.set_pref('intl.accept_languages', 'zh-CN,zh,en-US,en')
+    co.set_pref('spellcheck.dictionary', 'zh-CN')
+    co.set_pref('browser.enable_spellchecking', True)
+    co.set_pref('browser.spellcheck.dictionary', 'zh-CN')
+    co.set_pref('translate.enabled', False)  # 禁用自动翻译
+    co.set_pref('intl.selected_languages', 'zh-CN')
+    co.set_pref('intl.locale.requested', 'zh-CN')
+    
+    # 设置随机User-Agent
+    # co.set_user_agent(ua.random)
+    return co
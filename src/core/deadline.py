@@ -0,0 +1,105 @@
+"""请求截止时间和协作式取消"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestAborted(Exception):
+    """请求已被放弃，浏览器工作应立即停止"""
+    status_code = 500
+
+
+class DeadlineExceeded(RequestAborted, TimeoutError):
+    """请求超过截止时间"""
+    status_code = 504
+
+
+class ClientDisconnected(RequestAborted):
+    """客户端已断开连接"""
+    status_code = 499
+
+
+class Deadline:
+    """请求的截止时间，可被其他线程取消；阻塞操作在等待之间调用check()以尽早退出"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.expires_at = time.monotonic() + timeout if timeout else None
+        self._cancelled = threading.Event()
+        self._error: Optional[RequestAborted] = None
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数，没有截止时间时为None"""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def clamp(self, timeout: float) -> float:
+        """把单次操作的超时限制在剩余时间之内"""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def error(self) -> Optional[RequestAborted]:
+        return self._error
+
+    def cancel(self, error: RequestAborted):
+        """取消请求，正在等待的线程会立即被唤醒"""
+        if not self._cancelled.is_set():
+            self._error = error
+            self._cancelled.set()
+
+    def check(self):
+        """请求已取消或超时时抛出异常"""
+        if self._cancelled.is_set():
+            raise self._error
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            self.cancel(DeadlineExceeded("请求已超过截止时间"))
+            raise self._error
+
+    def sleep(self, seconds: float):
+        """可被取消的等待，替代page.wait()"""
+        self.check()
+        self._cancelled.wait(self.clamp(seconds))
+        self.check()
+
+    async def asleep(self, seconds: float):
+        """事件循环中的可取消等待，取消由所在任务的cancel()完成"""
+        self.check()
+        await asyncio.sleep(self.clamp(seconds))
+        self.check()
+
+
+# 当前请求的截止时间，asyncio.to_thread会把上下文复制到工作线程
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar('current_deadline', default=None)
+
+
+def current_deadline() -> Deadline:
+    """获取当前请求的截止时间，没有时返回不限时的截止时间"""
+    return _current_deadline.get() or Deadline()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline):
+    """在上下文中设置当前请求的截止时间"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def checkpoint():
+    """协作式取消检查点"""
+    current_deadline().check()
+
+
+def wait(seconds: float):
+    """按当前请求的截止时间进行可取消的等待"""
+    current_deadline().sleep(seconds)
@@ -0,0 +1,222 @@
+"""各浏览器引擎共用的标签页登记表、增量变更结果组装和操作步骤执行流程，引擎只实现对标签页的基本操作"""
+import asyncio
+import inspect
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+from src.config.settings import PROFILE_PURGE_INTERVAL, PROFILE_SYNC_INTERVAL
+from src.core.browser_routing import BROWSER_HEADED, BrowserRoutingRules
+from src.core.challenge_profile import challenge_profile
+from src.core.deadline import RequestAborted, current_deadline
+from src.core.rate_limiter import HostRateLimiter
+
+# 读取页面中变更记录器的状态和since（arguments[0]）之后的变更，记录器未安装时返回null
+RECORDER_STATE_JS = (
+    'const r = window.__ntcRecorder;'
+    'if (!r) { return null; }'
+    'return JSON.stringify({epoch: r.epoch, seq: r.seq, changes: r.changes(arguments[0])});'
+)
+
+
+async def call_engine(func: Callable, *args) -> Any:
+    """调用引擎的基本操作：协程直接await，同步的阻塞调用（drission引擎）在工作线程中执行"""
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+class BrowserEngineBase:
+    """
+    浏览器引擎的公共部分
+
+    子类提供profile以及以下基本操作，可以是协程，也可以是在工作线程中执行的同步方法：
+    _check_challenge（协程）、_read_recorder、_install_recorder、_recorder_snapshot、_run_action_step、
+    _dispose_context、close_tab、purge_profile
+    """
+
+    def __init__(self):
+        # 浏览器模式，在/browsers/中报告；只启动一个有头浏览器的引擎为headed
+        self.mode = BROWSER_HEADED
+        self.lock = asyncio.Lock()
+        self.tabs_pool: Dict[str, Any] = {}
+        # 命名浏览器上下文 {context_name: browserContextId}，以及标签页所属上下文
+        self.contexts: Dict[str, str] = {}
+        self.tab_contexts: Dict[str, str] = {}
+        # 按域名的访问速率限制
+        self.rate_limiter = HostRateLimiter()
+        self.routing = BrowserRoutingRules()
+        # 按域名的挑战统计和检测策略
+        self.challenge_profile = challenge_profile
+        # 标签页最近使用时间、已冻结的标签页和各标签页正在执行的调用数
+        self.tab_last_used: Dict[str, float] = {}
+        self.frozen_tabs: Set[str] = set()
+        self.tab_in_use: Dict[str, int] = {}
+
+    def list_tabs(self) -> list:
+        """列出所有活动标签页"""
+        return list(self.tabs_pool.keys())
+
+    def get_tab(self, tab_name: str):
+        """按名称获取特定标签页"""
+        if tab_name not in self.tabs_pool:
+            raise ValueError(f"标签页 '{tab_name}' 未找到")
+        self.tab_last_used[tab_name] = time.monotonic()
+        return self.tabs_pool[tab_name]
+
+    @contextmanager
+    def using_tab(self, tab_name: str, touch: bool = True):
+        """标记一次对标签页的调用，期间标签页不会被冻结；调用结束时刷新最近使用时间（后台刷新传touch=False，不算作使用）"""
+        self.tab_in_use[tab_name] = self.tab_in_use.get(tab_name, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self.tab_in_use.pop(tab_name) - 1
+            if remaining:
+                self.tab_in_use[tab_name] = remaining
+            if touch and tab_name in self.tabs_pool:
+                self.tab_last_used[tab_name] = time.monotonic()
+
+    async def thaw_if_frozen(self, tab_name: str):
+        """恢复已冻结的标签页，不冻结标签页的引擎无需处理"""
+
+    def _tab_name_of(self, tab) -> Optional[str]:
+        """按标签页对象反查名称"""
+        for tab_name, pooled_tab in self.tabs_pool.items():
+            if pooled_tab is tab:
+                return tab_name
+        return None
+
+    def _forget_tab(self, tab_name: str):
+        """从所有登记表中移除标签页，返回被移除的标签页"""
+        tab = self.tabs_pool.pop(tab_name, None)
+        self.tab_contexts.pop(tab_name, None)
+        self.tab_last_used.pop(tab_name, None)
+        self.frozen_tabs.discard(tab_name)
+        return tab
+
+    def browser_stats(self) -> dict:
+        """返回浏览器模式、路由规则和标签页"""
+        return {"mode": self.mode, "rules": self.routing.list_rules(), "tabs": {BROWSER_HEADED: self.list_tabs()}}
+
+    def list_contexts(self) -> dict:
+        """列出所有命名浏览器上下文及其标签页"""
+        return {
+            name: {
+                "context_id": context_id,
+                "tabs": [t for t, c in self.tab_contexts.items() if c == name]
+            }
+            for name, context_id in self.contexts.items()
+        }
+
+    def _pop_context(self, context: str) -> Any:
+        """从登记表中取出上下文，返回交给_dispose_context销毁的浏览器上下文ID"""
+        if context not in self.contexts:
+            raise ValueError(f"浏览器上下文 '{context}' 未找到")
+        return self.contexts.pop(context)
+
+    async def _dispose_context(self, context_id: Any):
+        """在浏览器中销毁上下文，没有真实浏览器上下文的引擎无需处理"""
+
+    async def close_context(self, context: str) -> list:
+        """关闭上下文中的所有标签页并销毁该上下文（包括其Cookie和存储）"""
+        context_id = self._pop_context(context)
+        closed_tabs = [t for t, c in list(self.tab_contexts.items()) if c == context]
+        for tab_name in closed_tabs:
+            try:
+                await call_engine(self.close_tab, tab_name)
+            except Exception as e:
+                logger.error(f"关闭上下文 {context} 中的标签页 {tab_name} 时出错: {e}")
+        await call_engine(self._dispose_context, context_id)
+        logger.info(f"已销毁浏览器上下文: {context}")
+        return closed_tabs
+
+    async def get_tab_changes(self, tab, since: int = 0, epoch: Optional[str] = None) -> dict:
+        """获取标签页自since序号之后的DOM变更，无法增量时回退到全量快照"""
+        changes = None
+        state = await call_engine(self._read_recorder, tab, since)
+        if state is None:
+            # 首次调用：安装记录器，并在后续导航/刷新的新文档中自动安装
+            await call_engine(self._install_recorder, tab)
+        elif epoch is not None and epoch == state['epoch'] and state['changes'] is not None:
+            changes = state['changes']
+
+        if changes is None:
+            # 记录器已重建（页面刷新）或客户端序号已超出保留范围，返回全量快照
+            snapshot = await call_engine(self._recorder_snapshot, tab)
+            return {
+                "full": True,
+                "epoch": snapshot['epoch'],
+                "seq": snapshot['seq'],
+                "html": snapshot['html'],
+                "changes": []
+            }
+
+        return {
+            "full": False,
+            "epoch": state['epoch'],
+            "seq": changes[-1]['seq'] if changes else since,
+            "changes": changes
+        }
+
+    async def run_actions(self, tab, steps: List[Dict[str, Any]], check_challenge: bool = True,
+                          stop_on_error: bool = True) -> dict:
+        """在一次调用中按顺序执行一组操作步骤，只在开始前处理一次挑战"""
+        deadline = current_deadline()
+        started = time.monotonic()
+        result = {"challenge": None, "steps": [], "completed": True}
+
+        if check_challenge:
+            success, cf = await self._check_challenge(tab)
+            result["challenge"] = {
+                "was_challenge": cf,
+                "success": success,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1)
+            }
+
+        for index, step in enumerate(steps):
+            deadline.check()
+            step_started = time.monotonic()
+            step_result = {"index": index, "action": step['action'], "ok": True}
+            try:
+                value = await call_engine(self._run_action_step, tab, step)
+                if value is not None:
+                    step_result["result"] = value
+            except RequestAborted:
+                raise
+            except Exception as e:
+                logger.warning(f"执行第 {index} 步 {step['action']} 失败: {e}")
+                step_result["ok"] = False
+                step_result["error"] = str(e)
+            step_result["elapsed_ms"] = round((time.monotonic() - step_started) * 1000, 1)
+            result["steps"].append(step_result)
+
+            if not step_result["ok"] and not step.get('optional') and stop_on_error:
+                result["completed"] = False
+                break
+
+        result["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    async def maintain_profile(self):
+        """定期清理配置文件缓存，tmpfs模式下定期把持久数据同步回磁盘"""
+        intervals = [i for i in (PROFILE_PURGE_INTERVAL, PROFILE_SYNC_INTERVAL if self.profile.tmpfs_enabled else 0)
+                     if i > 0]
+        if not intervals:
+            return
+        tick = min(intervals)
+        last_purge = last_sync = time.monotonic()
+        while True:
+            await asyncio.sleep(tick)
+            now = time.monotonic()
+            try:
+                if PROFILE_PURGE_INTERVAL > 0 and now - last_purge >= PROFILE_PURGE_INTERVAL:
+                    last_purge = now
+                    await call_engine(self.purge_profile)
+                if self.profile.tmpfs_enabled and PROFILE_SYNC_INTERVAL > 0 and now - last_sync >= PROFILE_SYNC_INTERVAL:
+                    last_sync = now
+                    await asyncio.to_thread(self.profile.sync_to_disk)
+            except Exception as e:
+                logger.error(f"配置文件维护出错: {e}")
@@ -0,0 +1,272 @@
+"""Chromium用户数据目录（配置文件）存储管理"""
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from src.config.settings import PROFILE_TMPFS_PATH, USER_DATA_PATH
+
+# 可随时丢弃的目录（相对于用户数据目录）
+DISPOSABLE_ROOT_DIRS: List[str] = [
+    'ShaderCache', 'GrShaderCache', 'GraphiteDawnCache', 'Crashpad', 'Crash Reports',
+    'BrowserMetrics', 'component_crx_cache',
+]
+
+# 可随时丢弃的目录（相对于每个配置文件目录，如 Default）
+DISPOSABLE_PROFILE_DIRS: List[str] = [
+    'Cache', 'Code Cache', 'GPUCache', 'DawnCache', 'DawnGraphiteCache', 'DawnWebGPUCache',
+    'Service Worker/CacheStorage', 'Service Worker/ScriptCache', 'blob_storage',
+]
+
+# 浏览器运行期间也可以安全删除的目录（浏览器不会持有其中的文件）
+LIVE_DISPOSABLE_ROOT_DIRS: List[str] = ['Crashpad', 'Crash Reports', 'BrowserMetrics']
+
+# 需要持久保存的文件和目录（Cookie、登录数据、本地存储等）
+DURABLE_ROOT_ITEMS: List[str] = ['Local State']
+DURABLE_PROFILE_ITEMS: List[str] = [
+    'Cookies', 'Network/Cookies', 'Login Data', 'Web Data', 'Preferences', 'Secure Preferences',
+    'Local Storage', 'Session Storage', 'IndexedDB',
+]
+
+# 使用SQLite存储的持久文件，通过backup接口复制以获得一致的快照
+SQLITE_ITEMS = {'Cookies', 'Network/Cookies', 'Login Data', 'Web Data'}
+# 数据库被锁定时backup接口会一直重试，超过该秒数后放弃
+SQLITE_BACKUP_TIMEOUT = 1
+
+# 浏览器运行期间持续写入的LevelDB目录，复制出的副本可能不一致，只在浏览器停止后同步
+LEVELDB_ITEMS = {'Local Storage', 'Session Storage', 'IndexedDB'}
+
+
+def dir_size(path: str) -> int:
+    """统计目录占用的字节数"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ProfileManager:
+    """管理用户数据目录：清理可丢弃的缓存，并支持在tmpfs上运行热配置文件"""
+
+    def __init__(self, persistent_path: str = USER_DATA_PATH, tmpfs_path: Optional[str] = PROFILE_TMPFS_PATH):
+        self.persistent_path = persistent_path
+        self.tmpfs_path = tmpfs_path or None
+        self._sync_lock = threading.Lock()
+        self.last_purge: Optional[float] = None
+        self.last_sync: Optional[float] = None
+
+    @property
+    def tmpfs_enabled(self) -> bool:
+        return self.tmpfs_path is not None
+
+    @property
+    def active_path(self) -> str:
+        """浏览器实际使用的用户数据目录"""
+        return self.tmpfs_path if self.tmpfs_enabled else self.persistent_path
+
+    def _profile_dirs(self, base: str) -> List[str]:
+        """列出用户数据目录下的配置文件目录"""
+        if not os.path.isdir(base):
+            return []
+        return [
+            os.path.join(base, name) for name in os.listdir(base)
+            if (name == 'Default' or name.startswith('Profile ')) and os.path.isdir(os.path.join(base, name))
+        ]
+
+    def _disposable_paths(self, base: str, running: bool) -> List[str]:
+        """列出可删除的目录"""
+        if running:
+            return [os.path.join(base, d) for d in LIVE_DISPOSABLE_ROOT_DIRS]
+        paths = [os.path.join(base, d) for d in DISPOSABLE_ROOT_DIRS]
+        for profile_dir in self._profile_dirs(base):
+            paths.extend(os.path.join(profile_dir, d) for d in DISPOSABLE_PROFILE_DIRS)
+        return paths
+
+    def purge(self, running: bool = False, base: Optional[str] = None) -> dict:
+        """删除可丢弃目录，running为True时只删除浏览器运行期间安全的目录"""
+        base = base or self.active_path
+        freed = 0
+        removed = []
+        for path in self._disposable_paths(base, running):
+            if not os.path.exists(path):
+                continue
+            size = dir_size(path)
+            try:
+                shutil.rmtree(path)
+                freed += size
+                removed.append(os.path.relpath(path, base))
+            except OSError as e:
+                logger.warning(f"清理目录 {path} 失败: {e}")
+        self.last_purge = time.time()
+        logger.info(f"配置文件清理完成，释放 {freed / 1024 / 1024:.1f} MB")
+        return {"freed_bytes": freed, "removed": removed}
+
+    def prepare(self) -> str:
+        """启动浏览器前准备用户数据目录，返回浏览器应使用的路径"""
+        os.makedirs(self.persistent_path, exist_ok=True)
+        if self.tmpfs_enabled:
+            self._restore_interrupted(self.persistent_path)
+            # tmpfs中的热配置文件每次从磁盘上的持久数据重新构建
+            if os.path.exists(self.tmpfs_path):
+                shutil.rmtree(self.tmpfs_path, ignore_errors=True)
+            os.makedirs(self.tmpfs_path, exist_ok=True)
+            self._copy_durable(self.persistent_path, self.tmpfs_path)
+            logger.info(f"已在tmpfs中准备配置文件: {self.tmpfs_path}")
+            # 磁盘上旧的缓存不会再被使用
+            self.purge(running=False, base=self.persistent_path)
+        self.purge(running=False)
+        return self.active_path
+
+    def sync_to_disk(self, running: bool = True) -> dict:
+        """
+        tmpfs模式下把持久数据同步回磁盘
+
+        Args:
+            running: 浏览器是否仍在运行，运行期间跳过LevelDB目录和无法通过backup接口复制的数据库，
+                留到浏览器停止（重启或退出）时再同步
+
+        Returns:
+            dict: 已同步和推迟同步的项目
+        """
+        if not self.tmpfs_enabled:
+            return {"synced": False, "reason": "tmpfs模式未启用"}
+        with self._sync_lock:
+            started = time.monotonic()
+            copied, deferred = self._copy_durable(self.tmpfs_path, self.persistent_path, running)
+            self.last_sync = time.time()
+        elapsed = round(time.monotonic() - started, 3)
+        logger.debug(f"配置文件已同步回磁盘，共 {len(copied)} 项，推迟 {len(deferred)} 项，耗时 {elapsed}s")
+        return {"synced": True, "items": copied, "deferred": deferred, "elapsed": elapsed}
+
+    def _durable_items(self, base: str) -> List[str]:
+        """列出需要持久化的相对路径"""
+        items = list(DURABLE_ROOT_ITEMS)
+        for profile_dir in self._profile_dirs(base):
+            name = os.path.basename(profile_dir)
+            items.extend(os.path.join(name, item) for item in DURABLE_PROFILE_ITEMS)
+        return items
+
+    def _copy_durable(self, src_base: str, dst_base: str, running: bool = False) -> Tuple[List[str], List[str]]:
+        """把持久数据从src_base复制到dst_base，返回已复制和因浏览器正在运行而推迟的项目"""
+        copied = []
+        deferred = []
+        for item in self._durable_items(src_base):
+            src = os.path.join(src_base, item)
+            if not os.path.exists(src):
+                continue
+            dst = os.path.join(dst_base, item)
+            name = item.split(os.sep, 1)[-1]
+            try:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                if os.path.isdir(src):
+                    if running and name in LEVELDB_ITEMS:
+                        deferred.append(item)
+                        continue
+                    self._copy_dir(src, dst)
+                elif name in SQLITE_ITEMS:
+                    if not self._copy_sqlite(src, dst, running):
+                        deferred.append(item)
+                        continue
+                else:
+                    self._copy_file(src, dst)
+                copied.append(item)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"复制配置文件项 {item} 失败: {e}")
+        return copied, deferred
+
+    @staticmethod
+    def _copy_file(src: str, dst: str):
+        """复制文件到临时位置后原子替换"""
+        tmp = f"{dst}.sync"
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+
+    @classmethod
+    def _copy_sqlite(cls, src: str, dst: str, running: bool) -> bool:
+        """
+        使用SQLite backup接口复制数据库，返回是否已复制
+
+        Chromium运行期间独占锁定数据库，backup会失败，此时直接复制正在写入的文件可能得到损坏的副本，
+        因此只在浏览器停止后才退回到文件复制
+        """
+        tmp = f"{dst}.sync"
+        give_up = time.monotonic() + SQLITE_BACKUP_TIMEOUT
+
+        def progress(status, remaining, total):
+            if time.monotonic() > give_up:
+                raise sqlite3.OperationalError("database is locked")
+
+        try:
+            source = sqlite3.connect(f"file:{src}?mode=ro", uri=True, timeout=SQLITE_BACKUP_TIMEOUT)
+            try:
+                target = sqlite3.connect(tmp)
+                try:
+                    source.backup(target, progress=progress)
+                finally:
+                    target.close()
+            finally:
+                source.close()
+            os.replace(tmp, dst)
+            return True
+        except sqlite3.Error:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if running:
+                return False
+            cls._copy_file(src, dst)
+            return True
+
+    @staticmethod
+    def _copy_dir(src: str, dst: str):
+        """复制目录到临时位置，先把旧目录移到一旁，新目录就位后再删除旧目录"""
+        tmp = f"{dst}.sync"
+        old = f"{dst}.old"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        shutil.copytree(src, tmp, ignore=shutil.ignore_patterns('LOCK'))
+        if os.path.exists(dst):
+            if os.path.exists(old):
+                shutil.rmtree(old)
+            os.rename(dst, old)
+        os.rename(tmp, dst)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def _restore_interrupted(self, base: str):
+        """上次同步在替换目录途中中断时，把移到一旁的旧目录恢复原位"""
+        for item in self._durable_items(base):
+            path = os.path.join(base, item)
+            old = f"{path}.old"
+            if not os.path.exists(old):
+                continue
+            if os.path.exists(path):
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                os.rename(old, path)
+                logger.warning(f"已恢复未完成同步的配置文件项 {item}")
+
+    def stats(self) -> dict:
+        """返回配置文件占用情况"""
+        disposable = sum(dir_size(p) for p in self._disposable_paths(self.active_path, running=False)
+                         if os.path.exists(p))
+        result = {
+            "active_path": self.active_path,
+            "tmpfs_enabled": self.tmpfs_enabled,
+            "active_bytes": dir_size(self.active_path) if os.path.exists(self.active_path) else 0,
+            "disposable_bytes": disposable,
+            "last_purge": self.last_purge,
+            "last_sync": self.last_sync,
+        }
+        if self.tmpfs_enabled:
+            result["persistent_path"] = self.persistent_path
+            result["persistent_bytes"] = dir_size(self.persistent_path) if os.path.exists(self.persistent_path) else 0
+        return result
@@ -0,0 +1,153 @@
+"""按域名的令牌桶访问调度"""
+import asyncio
+import threading
+import time
+from fnmatch import fnmatch
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.config.settings import HOST_RATE_LIMIT_DEFAULT, HOST_RATE_LIMITS
+from src.core.challenge_profile import domain_of
+from src.core.deadline import current_deadline
+
+
+def parse_limit(spec: str) -> Optional[Tuple[float, int]]:
+    """解析 "速率/突发" 格式的限制，"0" 表示不限制"""
+    spec = spec.strip()
+    if not spec or spec == '0':
+        return None
+    rate, _, burst = spec.partition('/')
+    return float(rate), int(burst or 1)
+
+
+def parse_rules(spec: str) -> List[Tuple[str, Optional[Tuple[float, int]]]]:
+    """解析 "模式=速率/突发" 的逗号分隔规则列表"""
+    rules = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        pattern, _, limit = item.partition('=')
+        try:
+            rules.append((pattern.strip().lower(), parse_limit(limit)))
+        except ValueError:
+            logger.warning(f"忽略无效的速率限制规则: {item}")
+    return rules
+
+
+class TokenBucket:
+    """令牌桶，令牌不足时预约未来的令牌，使等待者按到达顺序排队"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """取走一个令牌，返回需要等待的秒数"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        """归还未使用的预约"""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class HostRateLimiter:
+    """为每个域名维护独立的令牌桶，请求超出速率时排队等待而不是拒绝"""
+
+    def __init__(self, default: str = HOST_RATE_LIMIT_DEFAULT, rules: str = HOST_RATE_LIMITS):
+        self.default = parse_limit(default)
+        self.rules = parse_rules(rules)
+        self.buckets: Dict[str, Optional[TokenBucket]] = {}
+        self.host_stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _limit_for(self, host: str) -> Optional[Tuple[float, int]]:
+        """按规则顺序查找域名的限制"""
+        for pattern, limit in self.rules:
+            if fnmatch(host, pattern):
+                return limit
+        return self.default
+
+    def _reserve(self, host: str) -> float:
+        """为域名预约一个令牌，返回等待秒数"""
+        with self._lock:
+            if host not in self.buckets:
+                limit = self._limit_for(host)
+                self.buckets[host] = TokenBucket(*limit) if limit else None
+            bucket = self.buckets[host]
+            stats = self.host_stats.setdefault(host, {
+                "requests": 0, "delayed": 0, "waiting": 0, "total_wait": 0.0, "max_wait": 0.0
+            })
+            stats["requests"] += 1
+            if bucket is None:
+                return 0.0
+            wait = bucket.reserve(time.monotonic())
+            if wait > 0:
+                stats["delayed"] += 1
+                stats["waiting"] += 1
+                stats["total_wait"] += wait
+                stats["max_wait"] = max(stats["max_wait"], wait)
+            return wait
+
+    def _release(self, host: str, cancelled: bool):
+        """等待结束（或被取消）后更新统计"""
+        with self._lock:
+            self.host_stats[host]["waiting"] -= 1
+            if cancelled and self.buckets.get(host):
+                self.buckets[host].refund()
+
+    async def acquire(self, url: str) -> float:
+        """在事件循环中等待访问url所在域名的许可，返回等待的秒数"""
+        host = domain_of(url)
+        if host is None:
+            return 0.0
+        wait = self._reserve(host)
+        if wait <= 0:
+            return 0.0
+        logger.debug(f"访问 {host} 过于频繁，排队等待 {wait:.2f}s")
+        cancelled = True
+        try:
+            await asyncio.sleep(wait)
+            cancelled = False
+        finally:
+            self._release(host, cancelled)
+        return wait
+
+    def acquire_sync(self, url: str) -> float:
+        """在工作线程中等待访问url所在域名的许可，返回等待的秒数"""
+        host = domain_of(url)
+        if host is None:
+            return 0.0
+        wait = self._reserve(host)
+        if wait <= 0:
+            return 0.0
+        logger.debug(f"访问 {host} 过于频繁，排队等待 {wait:.2f}s")
+        cancelled = True
+        try:
+            # 请求被取消或超时时立即放弃排队
+            current_deadline().sleep(wait)
+            cancelled = False
+        finally:
+            self._release(host, cancelled)
+        return wait
+
+    def stats(self) -> dict:
+        """返回各域名的限制和排队统计"""
+        with self._lock:
+            result = {}
+            for host, stats in self.host_stats.items():
+                bucket = self.buckets.get(host)
+                result[host] = {
+                    **stats,
+                    "total_wait": round(stats["total_wait"], 3),
+                    "max_wait": round(stats["max_wait"], 3),
+                    "avg_wait": round(stats["total_wait"] / stats["delayed"], 3) if stats["delayed"] else 0.0,
+                    "rate": bucket.rate if bucket else None,
+                    "burst": bucket.burst if bucket else None,
+                }
+            return result
@@ -0,0 +1,253 @@
+"""按标签页的定时刷新：后台以低优先级刷新页面并保存最新的HTML快照，读取时直接返回快照"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+from src.config.settings import REFRESH_CONCURRENCY, REFRESH_MIN_INTERVAL, REFRESH_TIMEOUT, REFRESH_YIELD_POLL
+from src.core.browser_manager import browser_manager
+from src.core.deadline import Deadline, DeadlineExceeded, RequestAborted, deadline_scope
+from src.core.engine_base import call_engine
+from src.core.tab_events import tab_event_bus
+
+
+class RefreshJob:
+    """单个标签页的刷新计划和最新快照"""
+
+    def __init__(self, tab_name: str, interval: float, jitter: float = 0.0, wait_for: Optional[str] = None,
+                 wait_timeout: float = 15):
+        self.tab_name = tab_name
+        self.interval = interval
+        self.jitter = jitter
+        self.wait_for = wait_for
+        self.wait_timeout = wait_timeout
+        self.html: Optional[str] = None
+        # 快照的生成时间（时间戳）
+        self.refreshed_at: Optional[float] = None
+        self.next_run: Optional[float] = None
+        self.runs = 0
+        self.failures = 0
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def next_delay(self) -> float:
+        """下一次刷新前等待的秒数，在间隔上加减随机抖动，避免多个标签页同时刷新"""
+        return max(0.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def age(self) -> Optional[float]:
+        """快照的年龄秒数，还没有快照时为None"""
+        return time.time() - self.refreshed_at if self.refreshed_at is not None else None
+
+    def store(self, html: str):
+        self.html = html
+        self.refreshed_at = time.time()
+
+    def status(self) -> dict:
+        age = self.age()
+        return {
+            "tab_name": self.tab_name,
+            "interval": self.interval,
+            "jitter": self.jitter,
+            "wait_for": self.wait_for,
+            "wait_timeout": self.wait_timeout,
+            "refreshed_at": self.refreshed_at,
+            "age": round(age, 3) if age is not None else None,
+            "next_run": self.next_run,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
+
+
+class RefreshScheduler:
+    """
+    为每个登记的标签页运行一个后台刷新循环
+
+    刷新是低优先级的：同时只执行REFRESH_CONCURRENCY个，有前台请求正在使用浏览器时推迟执行（最多推迟一个刷新间隔）。
+    登记了刷新计划的标签页有一把锁，刷新和前台对该标签页的调用互斥执行
+    """
+
+    def __init__(self, concurrency: int = REFRESH_CONCURRENCY):
+        self.concurrency = concurrency
+        self.jobs: Dict[str, RefreshJob] = {}
+        self._tab_locks: Dict[str, asyncio.Lock] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+        # 正在执行的前台浏览器操作数
+        self.foreground = 0
+        self.counters = {"refreshes": 0, "failures": 0, "deferred": 0, "snapshot_reads": 0}
+
+    @contextmanager
+    def foreground_work(self):
+        """标记一次前台浏览器操作，期间后台刷新让路"""
+        self.foreground += 1
+        try:
+            yield
+        finally:
+            self.foreground -= 1
+
+    @asynccontextmanager
+    async def tab_lock(self, tab_name: str):
+        """与标签页的后台刷新互斥执行，没有刷新计划的标签页不加锁"""
+        lock = self._tab_locks.get(tab_name)
+        if lock is None:
+            yield
+            return
+        async with lock:
+            yield
+
+    def schedule(self, tab_name: str, interval: float, jitter: float = 0.0, wait_for: Optional[str] = None,
+                 wait_timeout: float = 15) -> RefreshJob:
+        """登记或替换标签页的刷新计划，立即开始第一次刷新；替换时保留已有快照"""
+        if interval < REFRESH_MIN_INTERVAL:
+            raise ValueError(f"刷新间隔不能小于 {REFRESH_MIN_INTERVAL} 秒")
+        if jitter >= interval:
+            raise ValueError("抖动必须小于刷新间隔")
+        job = RefreshJob(tab_name, interval, jitter, wait_for, wait_timeout)
+        previous = self.jobs.get(tab_name)
+        if previous is not None:
+            previous.task.cancel()
+            job.html, job.refreshed_at = previous.html, previous.refreshed_at
+        self.jobs[tab_name] = job
+        self._tab_locks.setdefault(tab_name, asyncio.Lock())
+        job.next_run = time.time()
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"已登记标签页 {tab_name} 的定时刷新，间隔 {interval}s")
+        return job
+
+    def unschedule(self, tab_name: str) -> bool:
+        """取消标签页的刷新计划，返回计划是否存在"""
+        job = self.jobs.pop(tab_name, None)
+        if job is None:
+            return False
+        self._tab_locks.pop(tab_name, None)
+        job.task.cancel()
+        logger.info(f"已取消标签页 {tab_name} 的定时刷新")
+        return True
+
+    def get(self, tab_name: str) -> Optional[RefreshJob]:
+        return self.jobs.get(tab_name)
+
+    def snapshot(self, tab_name: str, max_age: Optional[float] = None) -> Optional[RefreshJob]:
+        """
+        获取可直接返回的快照
+
+        Args:
+            tab_name: 标签页名称
+            max_age: 允许的最大快照年龄秒数，None表示只要有快照就返回
+
+        Returns:
+            Optional[RefreshJob]: 满足条件时为刷新计划（含快照），否则为None
+        """
+        job = self.jobs.get(tab_name)
+        if job is None or job.html is None:
+            return None
+        if max_age is not None and job.age() > max_age:
+            return None
+        self.counters["snapshot_reads"] += 1
+        return job
+
+    def store(self, tab_name: str, html: str):
+        """前台请求重新渲染后顺便更新快照"""
+        job = self.jobs.get(tab_name)
+        if job is not None:
+            job.store(html)
+
+    def invalidate(self, tab_name: str):
+        """点击或执行操作可能改变了页面，丢弃旧快照，下次读取时重新渲染"""
+        job = self.jobs.get(tab_name)
+        if job is not None:
+            job.html = job.refreshed_at = None
+
+    async def _run(self, job: RefreshJob):
+        """刷新循环，标签页不存在时结束"""
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, job.next_run - time.time()))
+                if job.tab_name not in browser_manager.tabs_pool:
+                    logger.info(f"标签页 {job.tab_name} 已不存在，停止定时刷新")
+                    if self.jobs.get(job.tab_name) is job:
+                        del self.jobs[job.tab_name]
+                        self._tab_locks.pop(job.tab_name, None)
+                    return
+                await self._refresh(job)
+                job.next_run = time.time() + job.next_delay()
+        except asyncio.CancelledError:
+            pass
+
+    async def _refresh(self, job: RefreshJob):
+        """在空闲时执行一次刷新，失败时保留旧快照"""
+        yield_until = time.monotonic() + job.interval
+        if self.foreground > 0:
+            self.counters["deferred"] += 1
+        while self.foreground > 0 and time.monotonic() < yield_until:
+            await asyncio.sleep(REFRESH_YIELD_POLL)
+
+        async with self._slots, self.tab_lock(job.tab_name):
+            # 不通过get_tab取标签页：后台刷新不算作使用，长期无人读取的标签页仍会被冻结
+            tab = browser_manager.tabs_pool.get(job.tab_name)
+            if tab is None:
+                return
+            started = time.monotonic()
+            deadline = Deadline(REFRESH_TIMEOUT or None)
+            try:
+                with browser_manager.using_tab(job.tab_name, touch=False):
+                    await call_engine(browser_manager.thaw_if_frozen, job.tab_name)
+                    url = await asyncio.to_thread(lambda: tab.url)
+                    await browser_manager.rate_limiter.acquire(url)
+                    with deadline_scope(deadline):
+                        html = await asyncio.wait_for(
+                            browser_manager.refresh_tab(tab, job.wait_for, job.wait_timeout), deadline.remaining())
+            except asyncio.CancelledError:
+                # 计划被取消，让工作线程在下一个检查点退出
+                deadline.cancel(RequestAborted("定时刷新已取消"))
+                raise
+            except asyncio.TimeoutError:
+                deadline.cancel(DeadlineExceeded("后台刷新已超过截止时间"))
+                self._failed(job, "后台刷新已超过截止时间")
+                return
+            except Exception as e:
+                self._failed(job, str(e))
+                return
+            finally:
+                job.last_duration = round(time.monotonic() - started, 3)
+
+            # 在锁内保存快照，不会覆盖刷新之后的点击或操作作废快照的结果
+            job.store(html)
+        job.runs += 1
+        job.last_error = None
+        self.counters["refreshes"] += 1
+        tab_event_bus.publish('tab_refreshed', job.tab_name, url=url, elapsed=job.last_duration)
+        logger.debug(f"已刷新标签页 {job.tab_name} 的快照，耗时 {job.last_duration}s")
+
+    def _failed(self, job: RefreshJob, error: str):
+        job.failures += 1
+        job.last_error = error
+        self.counters["failures"] += 1
+        logger.warning(f"后台刷新标签页 {job.tab_name} 失败: {error}")
+
+    def stats(self) -> dict:
+        """返回所有刷新计划、前台负载和刷新统计"""
+        return {
+            "concurrency": self.concurrency,
+            "foreground": self.foreground,
+            **self.counters,
+            "jobs": [job.status() for job in self.jobs.values()],
+        }
+
+    async def stop(self):
+        """停止所有刷新循环"""
+        tasks = [job.task for job in self.jobs.values()]
+        self.jobs.clear()
+        self._tab_locks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 全局定时刷新调度器实例
+refresh_scheduler = RefreshScheduler()
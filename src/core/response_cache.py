@@ -0,0 +1,384 @@
+"""页面级响应缓存：按 URL + 身份指纹缓存渲染后的HTML，支持按域名新鲜期、LRU淘汰、磁盘溢出和过期后后台刷新"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatch
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.config.settings import (
+    REQUEST_DEFAULT_TIMEOUT, RESPONSE_CACHE_DEFAULT_TTL, RESPONSE_CACHE_DISK_PATH, RESPONSE_CACHE_DISK_SIZE_MB,
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ITEM_MB, RESPONSE_CACHE_SIZE_MB, RESPONSE_CACHE_STALE_TTL,
+    RESPONSE_CACHE_TTLS
+)
+from src.core.challenge_profile import domain_of
+from src.core.deadline import Deadline, RequestAborted, deadline_scope
+from src.utils.challenge_utils import detect_challenge_type
+
+# 缓存查找结果
+CACHE_HIT = 'hit'
+CACHE_STALE = 'stale'
+CACHE_MISS = 'miss'
+CACHE_BYPASS = 'bypass'
+
+# 淘汰时把总大小降到上限的该比例以下，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+
+def parse_ttl_rules(spec: str) -> List[Tuple[str, float]]:
+    """解析 "模式=秒数" 的逗号分隔规则列表"""
+    rules = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        pattern, _, ttl = item.partition('=')
+        try:
+            rules.append((pattern.strip().lower(), float(ttl)))
+        except ValueError:
+            logger.warning(f"忽略无效的响应缓存规则: {item}")
+    return rules
+
+
+def identity_fingerprint(cookie: Optional[str] = None, local_storage: Optional[Dict[str, str]] = None,
+                         user_agent: Optional[str] = None, context: Optional[str] = None,
+                         browser: Optional[str] = None) -> str:
+    """
+    计算请求身份的指纹，身份不同的请求不会共用缓存条目
+
+    Cookie按名称排序后参与计算，顺序不同的同一组Cookie视为同一身份
+    """
+    cookies = sorted(c.strip() for c in cookie.split(';') if c.strip()) if cookie else []
+    identity = {
+        "cookie": cookies,
+        "local_storage": sorted((local_storage or {}).items()),
+        "user_agent": user_agent,
+        "context": context,
+        "browser": browser,
+    }
+    return hashlib.sha256(json.dumps(identity, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    内存LRU缓存，可选把淘汰的条目溢出到磁盘
+
+    同一条目的并发未命中合并为一次加载；过期不久的条目先返回旧内容，同时在后台刷新。
+    所有方法都在事件循环中调用，只有磁盘读写放到工作线程
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED, ttl_spec: str = RESPONSE_CACHE_TTLS,
+                 max_bytes: int = RESPONSE_CACHE_SIZE_MB * 1024 * 1024, disk_path: str = RESPONSE_CACHE_DISK_PATH,
+                 disk_max_bytes: int = RESPONSE_CACHE_DISK_SIZE_MB * 1024 * 1024):
+        self.enabled = enabled
+        self.rules = parse_ttl_rules(ttl_spec)
+        self.default_ttl = RESPONSE_CACHE_DEFAULT_TTL
+        self.stale_ttl = RESPONSE_CACHE_STALE_TTL
+        self.max_bytes = max_bytes
+        self.max_item_bytes = RESPONSE_CACHE_MAX_ITEM_MB * 1024 * 1024
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        # {键: 条目}，按最近访问排序
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._memory_bytes = 0
+        # 磁盘上的条目 {键: 大小}，首次使用时扫描目录建立
+        self._disk: Optional["OrderedDict[str, int]"] = None
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        # 正在加载的条目，并发未命中等待同一次加载
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        self.counters = {
+            "hits": 0, "stale_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0,
+            "stores": 0, "uncacheable": 0, "revalidations": 0, "revalidation_failures": 0,
+            "evictions": 0, "spills": 0, "bytes_saved": 0,
+        }
+
+    def ttl_for(self, url: str) -> float:
+        """获取url的新鲜期，按规则顺序匹配域名"""
+        host = domain_of(url)
+        if host:
+            for pattern, ttl in self.rules:
+                if fnmatch(host, pattern):
+                    return ttl
+        return self.default_ttl
+
+    def caches(self, url: str) -> bool:
+        """url的响应是否会写入缓存"""
+        return self.enabled and self.ttl_for(url) > 0
+
+    @staticmethod
+    def cache_key(url: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{url}\0{fingerprint}".encode('utf-8')).hexdigest()
+
+    async def fetch(self, url: str, fingerprint: str,
+                    loader: Callable[[], Awaitable[str]]) -> Tuple[str, str, Optional[float]]:
+        """
+        优先从缓存返回页面HTML，未命中时调用loader加载并写入缓存
+
+        Args:
+            url: 页面地址
+            fingerprint: 请求身份的指纹
+            loader: 加载页面的协程函数，返回HTML
+
+        Returns:
+            Tuple[str, str, Optional[float]]: (HTML, 缓存结果, 缓存内容的年龄秒数)
+        """
+        if not self.caches(url):
+            return await self.bypass(loader)
+        ttl = self.ttl_for(url)
+
+        key = self.cache_key(url, fingerprint)
+        entry = await self._lookup(key)
+        now = time.time()
+        if entry is not None:
+            age = round(now - entry["stored"], 3)
+            self.counters["bytes_saved"] += entry["size"]
+            if now < entry["fresh_until"]:
+                self.counters["hits"] += 1
+                return entry["html"], CACHE_HIT, age
+            self.counters["stale_hits"] += 1
+            self._revalidate(key, url, ttl, loader)
+            return entry["html"], CACHE_STALE, age
+
+        while key in self._inflight:
+            inflight = self._inflight[key]
+            self.counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight), CACHE_MISS, None
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # 发起加载的请求已被放弃，由本请求重新加载
+
+        self.counters["misses"] += 1
+        return await self._load(key, url, ttl, loader), CACHE_MISS, None
+
+    async def bypass(self, loader: Callable[[], Awaitable[str]]) -> Tuple[str, str, Optional[float]]:
+        """不经过缓存直接加载页面（请求要求跳过缓存、缓存未启用或URL不缓存），结果不写入缓存"""
+        self.counters["bypassed"] += 1
+        return await loader(), CACHE_BYPASS, None
+
+    async def _load(self, key: str, url: str, ttl: float, loader: Callable[[], Awaitable[str]]) -> str:
+        """加载页面并写入缓存，加载期间到达的同键请求共用结果"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            html = await loader()
+        except (RequestAborted, asyncio.CancelledError):
+            # 发起请求自身的超时或断开不影响等待中的请求，它们会重新加载
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他请求等待时避免 "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        future.set_result(html)
+        await self._store(key, url, ttl, html)
+        return html
+
+    def _revalidate(self, key: str, url: str, ttl: float, loader: Callable[[], Awaitable[str]]):
+        """在后台刷新过期条目，同一条目同时只刷新一次"""
+        if key in self._revalidating or key in self._inflight:
+            return
+
+        async def run():
+            # 后台刷新不受原请求截止时间和断开连接的影响
+            with deadline_scope(Deadline(REQUEST_DEFAULT_TIMEOUT or None)):
+                try:
+                    await self._load(key, url, ttl, loader)
+                    self.counters["revalidations"] += 1
+                except Exception as e:
+                    self.counters["revalidation_failures"] += 1
+                    logger.warning(f"后台刷新缓存页面失败 {url}: {e}")
+                finally:
+                    self._revalidating.pop(key, None)
+
+        self._revalidating[key] = asyncio.create_task(run())
+
+    async def _lookup(self, key: str) -> Optional[dict]:
+        """先查内存再查磁盘，丢弃已超过过期宽限期的条目"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        else:
+            entry = await self._load_from_disk(key)
+            if entry is None:
+                return None
+            self.counters["disk_hits"] += 1
+            self._remember(key, entry)
+        if time.time() >= entry["stale_until"]:
+            self._forget(key)
+            return None
+        return entry
+
+    async def _store(self, key: str, url: str, ttl: float, html: str):
+        """写入内存缓存；挑战页面和过大的页面不缓存"""
+        size = len(html.encode('utf-8'))
+        if not html or size > self.max_item_bytes or detect_challenge_type(html) is not None:
+            self.counters["uncacheable"] += 1
+            return
+        now = time.time()
+        self._remember(key, {
+            "url": url,
+            "html": html,
+            "size": size,
+            "stored": now,
+            "fresh_until": now + ttl,
+            "stale_until": now + ttl + self.stale_ttl,
+        })
+        self.counters["stores"] += 1
+        spilled = self._evict()
+        if spilled and self.disk_path:
+            await asyncio.to_thread(self._spill, spilled)
+
+    def _remember(self, key: str, entry: dict):
+        self._forget(key)
+        self._memory[key] = entry
+        self._memory_bytes += entry["size"]
+
+    def _forget(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry["size"]
+
+    def _evict(self) -> List[Tuple[str, dict]]:
+        """内存超过上限时按最近访问淘汰，返回仍在宽限期内、可以溢出到磁盘的条目"""
+        if self._memory_bytes <= self.max_bytes:
+            return []
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        now = time.time()
+        spilled = []
+        while self._memory and self._memory_bytes > target:
+            key, entry = self._memory.popitem(last=False)
+            self._memory_bytes -= entry["size"]
+            self.counters["evictions"] += 1
+            if now < entry["stale_until"]:
+                spilled.append((key, entry))
+        return spilled
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.disk_path, key[:2], f"{key}.json")
+
+    def _scan_disk(self):
+        """首次使用时按修改时间建立磁盘条目索引"""
+        if self._disk is not None:
+            return
+        files = []
+        if os.path.isdir(self.disk_path):
+            for root, _, names in os.walk(self.disk_path):
+                for name in names:
+                    if name.endswith('.json'):
+                        stat = os.stat(os.path.join(root, name))
+                        files.append((stat.st_mtime, name[:-5], stat.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(files))
+        self._disk_bytes = sum(self._disk.values())
+
+    def _spill(self, entries: List[Tuple[str, dict]]):
+        """把淘汰的条目写入磁盘，超过磁盘上限时删除最早写入的条目"""
+        with self._disk_lock:
+            self._spill_locked(entries)
+
+    def _spill_locked(self, entries: List[Tuple[str, dict]]):
+        self._scan_disk()
+        for key, entry in entries:
+            path = self._entry_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning(f"缓存页面溢出到磁盘失败 {entry['url']}: {e}")
+                continue
+            self._disk_bytes += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self.counters["spills"] += 1
+        while self._disk and self._disk_bytes > self.disk_max_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._remove_file(key)
+
+    async def _load_from_disk(self, key: str) -> Optional[dict]:
+        """从磁盘读取条目并移出磁盘（条目回到内存）"""
+        if not self.disk_path:
+            return None
+        return await asyncio.to_thread(self._read_disk_entry, key)
+
+    def _read_disk_entry(self, key: str) -> Optional[dict]:
+        with self._disk_lock:
+            self._scan_disk()
+            size = self._disk.pop(key, None)
+            if size is None:
+                return None
+            self._disk_bytes -= size
+            return self._read_entry_file(key)
+
+    def _read_entry_file(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._entry_path(key), 'rb') as f:
+                entry = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取磁盘缓存失败 {key}: {e}")
+            entry = None
+        self._remove_file(key)
+        return entry
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    async def clear(self) -> int:
+        """清空内存和磁盘缓存，返回删除的条目数"""
+        count = len(self._memory)
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self.disk_path:
+            count += await asyncio.to_thread(self._clear_disk)
+        return count
+
+    def _clear_disk(self) -> int:
+        with self._disk_lock:
+            self._scan_disk()
+            count = len(self._disk)
+            for key in list(self._disk):
+                self._remove_file(key)
+            self._disk.clear()
+            self._disk_bytes = 0
+        return count
+
+    def stats(self) -> dict:
+        """返回命中率、节省的渲染流量和内存/磁盘占用"""
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        hits = self.counters["hits"] + self.counters["stale_hits"]
+        return {
+            "enabled": self.enabled,
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "bytes_saved_mb": round(self.counters["bytes_saved"] / 1024 / 1024, 2),
+            "entries": len(self._memory),
+            "size_mb": round(self._memory_bytes / 1024 / 1024, 2),
+            "max_size_mb": round(self.max_bytes / 1024 / 1024, 2),
+            "disk_entries": len(self._disk) if self._disk is not None else None,
+            "disk_size_mb": round(self._disk_bytes / 1024 / 1024, 2) if self.disk_path else None,
+            "inflight": len(self._inflight),
+            "revalidating": len(self._revalidating),
+            "rules": [{"pattern": pattern, "ttl": ttl} for pattern, ttl in self.rules],
+            "default_ttl": self.default_ttl,
+            "stale_ttl": self.stale_ttl,
+        }
+
+
+# 全局响应缓存实例
+response_cache = ResponseCache()
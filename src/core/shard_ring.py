@@ -0,0 +1,51 @@
+"""一致性哈希环，用于按标签页名称把请求分配到分片"""
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.config.settings import SHARD_VIRTUAL_NODES
+
+
+def _hash(key: str) -> int:
+    """把字符串映射到64位哈希值"""
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """带虚拟节点的一致性哈希环，节点增减时只有少量键改变归属"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = SHARD_VIRTUAL_NODES):
+        self.vnodes = vnodes
+        self.nodes: Set[str] = set()
+        self._keys: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        """加入节点"""
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            self._owners[point] = node
+            bisect.insort(self._keys, point)
+
+    def remove(self, node: str):
+        """移除节点"""
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._keys.remove(point)
+
+    def get(self, key: str) -> Optional[str]:
+        """获取键所属的节点，环为空时返回None"""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[self._keys[index]]
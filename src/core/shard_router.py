@@ -0,0 +1,247 @@
+"""分片路由：按标签页名称把请求转发到拥有该标签页的分片，并在分片加入/离开时迁移标签页"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+from loguru import logger
+
+from src.config.settings import (
+    SHARD_AUTO_REBALANCE, SHARD_HEALTH_INTERVAL, SHARD_NODES, SHARD_REQUEST_TIMEOUT
+)
+from src.core.shard_ring import HashRing
+
+# 迁移标签页时从导出状态中带到新分片的字段
+MIGRATED_FIELDS = ('url', 'tab_name', 'cookie', 'local_storage', 'user_agent', 'context', 'browser')
+
+
+class ShardUnavailable(Exception):
+    """没有可用的分片处理请求"""
+
+
+class ShardRouter:
+    """维护分片成员、一致性哈希环和标签页归属表"""
+
+    def __init__(self, nodes: str = SHARD_NODES):
+        self.ring = HashRing()
+        self.shards: Dict[str, dict] = {}
+        # 标签页实际所在的分片，优先于哈希环（迁移前或直接在分片上创建的标签页）
+        self.placement: Dict[str, str] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+        self._lock = asyncio.Lock()
+        self._health_task = None
+        # 分片加入后自动启动的重新平衡任务，保留引用以免被回收
+        self._rebalance_tasks: Set[asyncio.Task] = set()
+        for url in nodes.split(','):
+            if url.strip():
+                self._register(url.strip().rstrip('/'))
+
+    def _register(self, url: str):
+        """登记分片，健康检查通过后才加入哈希环"""
+        self.shards.setdefault(url, {
+            "healthy": False,
+            "tabs": 0,
+            "last_check": None,
+            "last_error": None,
+            "draining": False,
+        })
+
+    async def start(self):
+        """创建HTTP客户端，完成首次健康检查并启动定期检查"""
+        self.client = httpx.AsyncClient(timeout=SHARD_REQUEST_TIMEOUT)
+        await self.check_health()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        """停止健康检查和重新平衡并关闭HTTP客户端"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._rebalance_tasks):
+            task.cancel()
+        await asyncio.gather(*self._rebalance_tasks, return_exceptions=True)
+        if self.client:
+            await self.client.aclose()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(SHARD_HEALTH_INTERVAL)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f"分片健康检查出错: {e}")
+
+    async def check_health(self):
+        """通过标签页列表检查各分片存活状态，同时同步标签页归属"""
+        urls = list(self.shards)
+        results = await asyncio.gather(*[self._list_tabs(url) for url in urls])
+        joined = False
+        for url, tabs in zip(urls, results):
+            shard = self.shards.get(url)
+            if shard is None:
+                continue
+            shard["last_check"] = time.time()
+            if tabs is None:
+                if shard["healthy"]:
+                    logger.warning(f"分片 {url} 不可用，已从哈希环移除")
+                    shard["healthy"] = False
+                    self.ring.remove(url)
+                    # 分片上的标签页已随浏览器丢失
+                    for tab_name in [t for t, s in self.placement.items() if s == url]:
+                        del self.placement[tab_name]
+                continue
+            if not shard["healthy"]:
+                logger.info(f"分片 {url} 已可用，加入哈希环")
+                shard["healthy"] = True
+                shard["last_error"] = None
+                if not shard["draining"]:
+                    self.ring.add(url)
+                    joined = True
+            shard["tabs"] = len(tabs)
+            listed = set(tabs)
+            for tab_name in tabs:
+                self.placement[tab_name] = url
+            for tab_name in [t for t, s in self.placement.items() if s == url and t not in listed]:
+                del self.placement[tab_name]
+
+        if joined and SHARD_AUTO_REBALANCE and len(self.ring.nodes) > 1:
+            task = asyncio.create_task(self.rebalance())
+            self._rebalance_tasks.add(task)
+            task.add_done_callback(self._rebalance_done)
+
+    def _rebalance_done(self, task: asyncio.Task):
+        """自动重新平衡结束，记录失败原因"""
+        self._rebalance_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"自动重新平衡出错: {task.exception()}")
+
+    async def _list_tabs(self, url: str) -> Optional[List[str]]:
+        """获取分片上的标签页列表，分片不可用时返回None"""
+        try:
+            response = await self.client.get(f"{url}/tabs/", timeout=SHARD_HEALTH_INTERVAL)
+            response.raise_for_status()
+            return response.json()["tabs"]
+        except Exception as e:
+            if url in self.shards:
+                self.shards[url]["last_error"] = str(e)
+            return None
+
+    def owner(self, tab_name: str) -> str:
+        """获取标签页所在（或新建时应放置）的分片"""
+        url = self.placement.get(tab_name)
+        if url and self.shards.get(url, {}).get("healthy"):
+            return url
+        url = self.ring.get(tab_name)
+        if url is None:
+            raise ShardUnavailable("没有可用的分片")
+        return url
+
+    async def forward(self, url: str, method: str, path: str, params: Any = None,
+                      content: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """把请求原样转发到分片"""
+        try:
+            return await self.client.request(method, f"{url}{path}", params=params, content=content, headers=headers)
+        except httpx.TransportError as e:
+            if url in self.shards:
+                self.shards[url]["last_error"] = str(e)
+            raise ShardUnavailable(f"分片 {url} 请求失败: {e}")
+
+    async def forward_tab(self, tab_name: str, method: str, path: str, params: Any = None,
+                          content: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None
+                          ) -> Tuple[str, httpx.Response]:
+        """把标签页相关的请求转发到其所在分片，归属未知时重新同步后再试一次"""
+        url = self.owner(tab_name)
+        response = await self.forward(url, method, path, params, content, headers)
+        if response.status_code == 404 and tab_name not in self.placement:
+            await self.check_health()
+            retry_url = self.placement.get(tab_name)
+            if retry_url and retry_url != url:
+                url = retry_url
+                response = await self.forward(url, method, path, params, content, headers)
+        return url, response
+
+    async def fanout(self, method: str, path: str, params: Any = None,
+                     content: Optional[bytes] = None) -> Dict[str, Any]:
+        """把请求发送到所有健康的分片，返回 {分片: 响应JSON或错误}"""
+        urls = [url for url, shard in self.shards.items() if shard["healthy"]]
+
+        async def call(url: str):
+            try:
+                response = await self.client.request(method, f"{url}{path}", params=params, content=content)
+                return {"status_code": response.status_code, "body": response.json()}
+            except Exception as e:
+                return {"status_code": 502, "body": {"detail": str(e)}}
+
+        results = await asyncio.gather(*[call(url) for url in urls])
+        return dict(zip(urls, results))
+
+    async def migrate(self, tab_name: str, source: str, target: str) -> bool:
+        """按导出的状态在目标分片上重建标签页，再关闭源分片上的标签页"""
+        try:
+            state = await self.client.get(f"{source}/tabs/{tab_name}/state")
+            state.raise_for_status()
+            payload = {k: v for k, v in state.json().items() if k in MIGRATED_FIELDS}
+            created = await self.client.post(f"{target}/tabs/", json=payload)
+            created.raise_for_status()
+        except Exception as e:
+            logger.error(f"迁移标签页 {tab_name}（{source} -> {target}）失败: {e}")
+            return False
+        self.placement[tab_name] = target
+        try:
+            await self.client.delete(f"{source}/tabs/{tab_name}")
+        except Exception as e:
+            logger.warning(f"关闭源分片 {source} 上的标签页 {tab_name} 失败: {e}")
+        logger.info(f"已迁移标签页 {tab_name}: {source} -> {target}")
+        return True
+
+    async def rebalance(self) -> List[dict]:
+        """把归属与哈希环不一致的标签页迁移到哈希环指定的分片"""
+        async with self._lock:
+            moves = []
+            for tab_name, source in list(self.placement.items()):
+                target = self.ring.get(tab_name)
+                if target is None or target == source or not self.shards.get(source, {}).get("healthy"):
+                    continue
+                ok = await self.migrate(tab_name, source, target)
+                moves.append({"tab_name": tab_name, "from": source, "to": target, "ok": ok})
+            if moves:
+                logger.info(f"重新平衡完成，迁移 {sum(m['ok'] for m in moves)}/{len(moves)} 个标签页")
+            return moves
+
+    async def join(self, url: str) -> dict:
+        """加入新分片，健康检查通过后按需迁移标签页"""
+        url = url.rstrip('/')
+        self._register(url)
+        self.shards[url]["draining"] = False
+        await self.check_health()
+        return self.stats()["shards"][url]
+
+    async def leave(self, url: str) -> List[dict]:
+        """让分片离开：先从哈希环移除，把其上的标签页迁移到其他分片，再注销"""
+        url = url.rstrip('/')
+        if url not in self.shards:
+            raise ValueError(f"分片 '{url}' 未找到")
+        self.shards[url]["draining"] = True
+        self.ring.remove(url)
+        moves = await self.rebalance() if self.ring.nodes and self.shards[url]["healthy"] else []
+        del self.shards[url]
+        for tab_name in [t for t, s in self.placement.items() if s == url]:
+            del self.placement[tab_name]
+        return moves
+
+    def stats(self) -> dict:
+        """返回分片状态和标签页分布"""
+        return {
+            "shards": {
+                url: {**shard, "in_ring": url in self.ring.nodes}
+                for url, shard in self.shards.items()
+            },
+            "tabs": len(self.placement),
+        }
+
+
+# 全局分片路由实例
+shard_router = ShardRouter()
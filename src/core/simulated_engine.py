@@ -0,0 +1,290 @@
+"""进程内模拟的浏览器引擎：不启动浏览器，用于单独测量API层、访问调度和标签页登记表的开销"""
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.config.settings import (
+    SIM_ACTION_LATENCY, SIM_CHALLENGE_RATE, SIM_CHALLENGE_SOLVE_TIME, SIM_CHALLENGE_SUCCESS_RATE, SIM_CRASH_RATE,
+    SIM_FAILURE_RATE, SIM_HANG_RATE, SIM_HANG_TIME, SIM_NAVIGATION_LATENCY, SIM_PAGE_SIZE_KB, SIM_SEED
+)
+from src.core.challenge_profile import STRATEGY_SKIP, ChallengeProfile, domain_of
+from src.core.deadline import RequestAborted, current_deadline
+from src.core.engine_base import BrowserEngineBase
+from src.core.profile_manager import ProfileManager
+from src.core.tab_events import tab_event_bus
+
+# 未指定User-Agent时模拟标签页使用的值
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                      'Chrome/126.0.0.0 Safari/537.36')
+
+# 出现挑战时返回的页面，能被detect_challenge_type识别
+CHALLENGE_HTML = ('<html><head><title>Just a moment...</title></head><body>'
+                  '<div id="challenge-spinner"></div><input type="hidden" name="cf-turnstile-response">'
+                  '</body></html>')
+
+# 填充页面正文的段落
+FILLER_PARAGRAPH = '<p class="item">simulated content</p>'
+
+
+def parse_range(spec: str) -> Tuple[float, float]:
+    """解析 "值" 或 "最小-最大" 格式的范围"""
+    low, _, high = spec.strip().partition('-')
+    return float(low), float(high) if high else float(low)
+
+
+class SimulatedFault(RuntimeError):
+    """故障注入产生的错误"""
+
+
+class SimulatedTab:
+    """模拟的标签页，只保存导航状态和生成的页面"""
+
+    def __init__(self, tab_name: str, user_agent: str):
+        self.tab_name = tab_name
+        self.url = 'about:blank'
+        self.user_agent = user_agent
+        self.cookies: Dict[str, str] = {}
+        self.local_storage: Dict[str, str] = {}
+        self.page = ''
+        self.epoch = ''
+        self.challenged = False
+        self.crashed = False
+        self.closed = False
+
+    @property
+    def html(self) -> str:
+        return CHALLENGE_HTML if self.challenged else self.page
+
+    async def close(self):
+        self.closed = True
+
+
+class SimulatedBrowserManager(BrowserEngineBase):
+    """
+    与BrowserManager接口一致的模拟浏览器管理器
+
+    标签页操作都是协程，只按配置的耗时等待并生成页面，可注入挑战、错误、卡住和标签页崩溃。
+    挑战检测沿用按域名的策略，但不模拟完整策略开始前的固定等待
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.mode = 'simulated'
+        # 不使用真实的用户数据目录，配置文件端点在临时目录上工作
+        self.profile = ProfileManager(tempfile.mkdtemp(prefix='ntc-simulated-'), None)
+        # 模拟的域名和耗时只记在内存中，不写入CHALLENGE_PROFILE_PATH中的真实挑战统计
+        self.challenge_profile = ChallengeProfile(path=None)
+        self.random = random.Random(SIM_SEED or None)
+        self.navigation_latency = parse_range(SIM_NAVIGATION_LATENCY)
+        self.action_latency = parse_range(SIM_ACTION_LATENCY)
+        self.page_size_kb = parse_range(SIM_PAGE_SIZE_KB)
+        self.challenge_solve_time = parse_range(SIM_CHALLENGE_SOLVE_TIME)
+        self.counters = {"navigations": 0, "actions": 0, "challenges": 0, "failures": 0, "hangs": 0, "crashes": 0}
+        self._started = False
+
+    @property
+    def dp(self) -> Optional[bool]:
+        """兼容BrowserManager.dp，用于状态检查"""
+        return True if self._started else None
+
+    @property
+    def resource_usage(self) -> dict:
+        """模拟引擎没有浏览器进程，返回标签页数量和故障注入统计"""
+        return {"simulated": True, "tabs": len(self.tabs_pool), **self.counters}
+
+    def _uniform(self, bounds: Tuple[float, float]) -> float:
+        low, high = bounds
+        return low if low == high else self.random.uniform(low, high)
+
+    def _render(self, url: str) -> str:
+        """生成接近配置大小的HTML页面"""
+        size = int(self._uniform(self.page_size_kb) * 1024)
+        head = f'<html><head><title>{url}</title></head><body><h1 id="title">{url}</h1>'
+        tail = '</body></html>'
+        count = max(size - len(head) - len(tail), 0) // len(FILLER_PARAGRAPH)
+        return head + FILLER_PARAGRAPH * count + tail
+
+    async def _operate(self, tab: SimulatedTab, latency: Tuple[float, float]):
+        """模拟一次浏览器操作：等待操作耗时，并按配置注入卡住、错误和崩溃"""
+        deadline = current_deadline()
+        if tab.crashed:
+            raise SimulatedFault(f"标签页 {tab.tab_name} 已崩溃")
+        self.counters["actions"] += 1
+        if self.random.random() < SIM_HANG_RATE:
+            self.counters["hangs"] += 1
+            await deadline.asleep(SIM_HANG_TIME)
+        await deadline.asleep(self._uniform(latency))
+        if self.random.random() < SIM_FAILURE_RATE:
+            self.counters["failures"] += 1
+            raise SimulatedFault("模拟的浏览器操作失败")
+        if self.random.random() < SIM_CRASH_RATE:
+            self.counters["crashes"] += 1
+            tab.crashed = True
+            tab_event_bus.publish('tab_crashed', tab.tab_name)
+            raise SimulatedFault(f"模拟的标签页崩溃: {tab.tab_name}")
+
+    async def start(self):
+        """模拟引擎无需启动浏览器"""
+        self._started = True
+        logger.info("使用模拟浏览器引擎，不会启动浏览器")
+
+    async def start_monitoring(self):
+        """模拟引擎没有需要监控的浏览器进程"""
+
+    async def stop_monitoring(self):
+        """模拟引擎没有需要停止的监控任务"""
+
+    async def purge_profile(self) -> dict:
+        """清理临时配置文件目录"""
+        result = await asyncio.to_thread(self.profile.purge, True)
+        result["http_cache_cleared"] = True
+        return result
+
+    async def create_tab(self, url: str, tab_name: str, cookie: Optional[str] = None,
+                         local_storage: Optional[Dict[str, str]] = None, user_agent: Optional[str] = None,
+                         context: Optional[str] = None, browser: Optional[str] = None) -> dict:
+        """创建模拟标签页并完成一次导航（只有一个浏览器，忽略browser）"""
+        if tab_name in self.tabs_pool:
+            raise ValueError(f"标签页名称 '{tab_name}' 已存在")
+
+        logger.debug(f"正在访问: {url}")
+        tab = SimulatedTab(tab_name, user_agent or DEFAULT_USER_AGENT)
+        if cookie:
+            for item in cookie.split(';'):
+                name, sep, value = item.strip().partition('=')
+                if sep and name:
+                    tab.cookies[name] = value
+        if local_storage:
+            tab.local_storage.update(local_storage)
+        if context:
+            self.contexts.setdefault(context, uuid.uuid4().hex.upper())
+            self.tab_contexts[tab_name] = context
+
+        try:
+            await self._navigate(tab, url)
+        except (Exception, asyncio.CancelledError) as e:
+            logger.error(f"创建标签页 {tab_name} 时出错: {e!r}")
+            self.tab_contexts.pop(tab_name, None)
+            if isinstance(e, (RequestAborted, asyncio.CancelledError)):
+                raise
+            raise RuntimeError(f"创建标签页失败，内部错误: {e}")
+
+        self.tabs_pool[tab_name] = tab
+        self.tab_last_used[tab_name] = time.monotonic()
+        tab_event_bus.publish('tab_created', tab_name, url=tab.url)
+        return {"code": 0, "message": "标签页创建成功", "tab_name": tab_name}
+
+    async def _navigate(self, tab: SimulatedTab, url: str):
+        """模拟导航：等待导航耗时，生成新页面并按概率出现挑战"""
+        await self._operate(tab, self.navigation_latency)
+        tab.url = url
+        tab.page = self._render(url)
+        tab.epoch = uuid.uuid4().hex[:12]
+        tab.challenged = self.random.random() < SIM_CHALLENGE_RATE
+        self.counters["navigations"] += 1
+        tab_event_bus.publish('navigation_committed', tab.tab_name, url=url)
+        tab_event_bus.publish('load_finished', tab.tab_name, url=url)
+
+    async def _check_challenge(self, tab: SimulatedTab) -> Tuple[bool, bool]:
+        """按域名策略处理模拟挑战，跳过检测的域名仍出现挑战时同样求解"""
+        domain = domain_of(tab.url)
+        if not tab.challenged:
+            if self.challenge_profile.strategy(domain) == STRATEGY_SKIP:
+                self.challenge_profile.record_skip(domain)
+            else:
+                self.challenge_profile.record_check(domain)
+            return True, False
+
+        started = time.monotonic()
+        self.counters["challenges"] += 1
+        tab_event_bus.publish('challenge_detected', tab.tab_name, url=tab.url, challenge_type='turnstile')
+        await current_deadline().asleep(self._uniform(self.challenge_solve_time))
+        success = self.random.random() < SIM_CHALLENGE_SUCCESS_RATE
+        tab.challenged = not success
+        elapsed = round(time.monotonic() - started, 3)
+        tab_event_bus.publish('challenge_solved' if success else 'challenge_failed', tab.tab_name, url=tab.url,
+                              elapsed=elapsed)
+        self.challenge_profile.record_check(domain, 'turnstile', elapsed, success)
+        return success, True
+
+    async def get_tab_html(self, tab: SimulatedTab) -> str:
+        """获取模拟页面的HTML"""
+        await self._check_challenge(tab)
+        await self._operate(tab, self.action_latency)
+        return tab.html
+
+    async def refresh_tab(self, tab: SimulatedTab, wait_for: Optional[str] = None, wait_timeout: float = 15) -> str:
+        """模拟重新加载：重新导航到当前URL后获取HTML，wait_for在模拟页面中总是立即满足"""
+        await self._navigate(tab, tab.url)
+        return await self.get_tab_html(tab)
+
+    async def _read_recorder(self, tab: SimulatedTab, since: int) -> dict:
+        """模拟页面不会变化，记录器总是已安装且没有新的变更"""
+        await self._operate(tab, self.action_latency)
+        return {"epoch": tab.epoch, "seq": 0, "changes": []}
+
+    @staticmethod
+    async def _recorder_snapshot(tab: SimulatedTab) -> dict:
+        return {"epoch": tab.epoch, "seq": 0, "html": tab.html}
+
+    async def click_element(self, tab: SimulatedTab, selector: str):
+        """模拟点击元素"""
+        await self._check_challenge(tab)
+        current_deadline().check()
+        await self._operate(tab, self.action_latency)
+
+    async def _run_action_step(self, tab: SimulatedTab, step: Dict[str, Any]):
+        """执行单个模拟操作步骤，提取操作返回固定文本"""
+        if step['action'] == 'navigate':
+            await self.rate_limiter.acquire(step['url'])
+            await self._navigate(tab, step['url'])
+            return tab.url
+
+        await self._operate(tab, self.action_latency)
+        if step['action'] == 'extract':
+            value = tab.url if step.get('attr') == 'href' else 'simulated content'
+            return [value] * 3 if step.get('multiple') else value
+        return None
+
+    async def close_tab(self, tab_name: str):
+        """关闭特定标签页"""
+        if tab_name not in self.tabs_pool:
+            raise ValueError(f"标签页 '{tab_name}' 未找到")
+        tab = self.tabs_pool[tab_name]
+        self._forget_tab(tab_name)
+        await tab.close()
+        tab_event_bus.publish('tab_closed', tab_name, url=tab.url)
+        logger.debug(f"已关闭页面: {tab.url}")
+
+    async def trace_tab(self, tab: SimulatedTab, seconds: float, categories: List[str]) -> List[dict]:
+        """模拟标签页没有渲染进程可供跟踪，等待给定时长后返回空的事件列表"""
+        await current_deadline().asleep(seconds)
+        return []
+
+    async def export_tab(self, tab_name: str) -> dict:
+        """导出标签页的可迁移状态，用于在分片之间重建标签页"""
+        tab = self.get_tab(tab_name)
+        return {
+            "tab_name": tab_name,
+            "url": tab.url,
+            "cookie": '; '.join(f"{k}={v}" for k, v in tab.cookies.items()) or None,
+            "local_storage": dict(tab.local_storage) or None,
+            "user_agent": tab.user_agent,
+            "context": self.tab_contexts.get(tab_name),
+            "browser": None,
+        }
+
+    async def move_tab(self, tab_name: str, browser: str) -> dict:
+        """模拟引擎不支持混合模式"""
+        raise ValueError("模拟引擎只有一个浏览器，不支持在浏览器之间移动标签页")
+
+    async def cleanup(self):
+        """清理临时配置文件目录"""
+        await self.stop_monitoring()
+        shutil.rmtree(self.profile.persistent_path, ignore_errors=True)
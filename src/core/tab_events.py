@@ -0,0 +1,118 @@
+"""标签页生命周期事件总线"""
+import asyncio
+import itertools
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+
+from loguru import logger
+
+from src.config.settings import TAB_EVENT_QUEUE_SIZE
+
+# 支持的事件类型
+TAB_EVENT_TYPES = (
+    'tab_created',
+    'navigation_committed',
+    'load_finished',
+    'challenge_detected',
+    'challenge_solved',
+    'challenge_failed',
+    'tab_crashed',
+    'tab_frozen',
+    'tab_thawed',
+    'tab_closed',
+    'tab_evicted',
+    'tab_moved',
+    'tab_refreshed',
+)
+
+
+class TabEventSubscription:
+    """单个订阅者的事件队列和过滤条件"""
+
+    def __init__(self, event_types: Optional[Iterable[str]] = None, tab_names: Optional[Iterable[str]] = None,
+                 queue_size: int = TAB_EVENT_QUEUE_SIZE):
+        self.event_types: Optional[Set[str]] = set(event_types) if event_types else None
+        self.tab_names: Optional[Set[str]] = set(tab_names) if tab_names else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        """判断事件是否符合订阅条件"""
+        if self.event_types and event['type'] not in self.event_types:
+            return False
+        if self.tab_names and event['tab_name'] not in self.tab_names:
+            return False
+        return True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """等待下一个事件，超时返回None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class TabEventBus:
+    """把浏览器工作线程和CDP回调线程中产生的事件分发给异步订阅者"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[TabEventSubscription] = set()
+        self._seq = itertools.count(1)
+        self._seq_lock = threading.Lock()
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """绑定事件分发所在的事件循环"""
+        self._loop = loop
+
+    def subscribe(self, event_types: Optional[Iterable[str]] = None,
+                  tab_names: Optional[Iterable[str]] = None) -> TabEventSubscription:
+        """注册订阅者，必须在事件循环中调用"""
+        subscription = TabEventSubscription(event_types, tab_names)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: TabEventSubscription):
+        """移除订阅者"""
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, tab_name: str, **data):
+        """发布事件，可在任意线程中调用"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        with self._seq_lock:
+            seq = next(self._seq)
+        event = {
+            "seq": seq,
+            "type": event_type,
+            "tab_name": tab_name,
+            "timestamp": time.time(),
+            "data": data,
+        }
+        try:
+            loop.call_soon_threadsafe(self._dispatch, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _dispatch(self, event: Dict[str, Any]):
+        """在事件循环中把事件放入各订阅者队列"""
+        for subscription in list(self._subscribers):
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+                if subscription.dropped % 100 == 1:
+                    logger.warning(f"事件订阅者处理过慢，已丢弃 {subscription.dropped} 个事件")
+
+
+# 全局事件总线实例
+tab_event_bus = TabEventBus()
@@ -1,4 +1,5 @@
 """主FastAPI应用"""
+import asyncio
 import datetime
 import uvicorn
 
@@ -6,21 +7,28 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from src.api.routes import router
-from src.config.settings import APP_HOST, APP_PORT, APP_VERSION
+from src.api.routes import (
+    assets_router, browsers_router, challenges_router, contexts_router, debug_router, fetch_router, profile_router,
+    router, scheduler_router
+)
+from src.config.settings import APP_HOST, APP_PORT, APP_VERSION, BROWSER_ENGINE, BROWSER_MODE
 from src.core.browser_manager import browser_manager
+from src.core.refresh_scheduler import refresh_scheduler
+from src.core.tab_events import tab_event_bus
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """定义应用生命周期事件"""
+    tab_event_bus.bind_loop(asyncio.get_running_loop())
     await browser_manager.start_monitoring()
     try:
         # 启动浏览器
-        browser_manager.dp.latest_tab
+        await browser_manager.start()
         yield  # 等待应用运行
     finally:
         # 应用关闭逻辑
+        await refresh_scheduler.stop()
         await browser_manager.cleanup()
 
 
@@ -34,6 +42,14 @@ app = FastAPI(
 
 # 包含API路由
 app.include_router(router)
+app.include_router(contexts_router)
+app.include_router(profile_router)
+app.include_router(challenges_router)
+app.include_router(scheduler_router)
+app.include_router(assets_router)
+app.include_router(debug_router)
+app.include_router(browsers_router)
+app.include_router(fetch_router)
 
 
 @app.get("/")
@@ -47,8 +63,28 @@ async def root():
             "create_tab": "POST /tabs/",
             "list_tabs": "GET /tabs/",
             "get_html": "GET /tabs/{tab_name}/html",
+            "get_changes": "GET /tabs/{tab_name}/changes?since=<seq>",
+            "export_tab": "GET /tabs/{tab_name}/state",
             "click_element": "POST /tabs/click/",
+            "run_actions": "POST /tabs/{tab_name}/actions",
+            "move_tab": "POST /tabs/{tab_name}/move",
             "close_tab": "DELETE /tabs/{tab_name}",
+            "list_contexts": "GET /contexts/",
+            "close_context": "DELETE /contexts/{context}",
+            "profile_stats": "GET /profile/",
+            "purge_profile": "POST /profile/purge",
+            "challenge_profile": "GET /challenges/profile",
+            "challenge_solver": "GET /challenges/solver",
+            "host_scheduler": "GET /scheduler/hosts",
+            "refresh_schedule": "PUT /tabs/{tab_name}/schedule",
+            "refresh_scheduler": "GET /scheduler/refresh",
+            "asset_cache": "GET /assets/",
+            "debug_profile": "GET /debug/profile",
+            "debug_trace": "GET /debug/trace",
+            "browsers": "GET /browsers/",
+            "fetch_page": "POST /fetch/",
+            "response_cache": "GET /fetch/cache",
+            "tab_events": "GET /tabs/events (SSE) | WS /tabs/events/ws",
             "status": "GET /status"
         }
     }
@@ -66,6 +102,9 @@ async def status():
         "message": "NAS Tools Chrome Server is running successfully",
         "version": APP_VERSION,
         "browser_manager": browser_status,
+        "engine": BROWSER_ENGINE,
+        "browser_mode": BROWSER_MODE,
+        "resources": browser_manager.resource_usage,
         "timestamp": datetime.datetime.now().isoformat()
     }
 
@@ -0,0 +1,70 @@
+"""分片路由器FastAPI应用，把请求按标签页名称分配到多个分片进程/节点"""
+import datetime
+import uvicorn
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from src.api.router_routes import aggregate_router, contexts_proxy, fetch_proxy, shards_router, tabs_proxy
+from src.config.settings import APP_HOST, APP_VERSION, ROUTER_PORT
+from src.core.shard_router import shard_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """定义应用生命周期事件"""
+    await shard_router.start()
+    try:
+        yield
+    finally:
+        await shard_router.stop()
+
+
+# 创建FastAPI应用
+app = FastAPI(
+    title="NAS Tools Chrome Shard Router",
+    description="按标签页名称一致性哈希，把请求转发到多个NAS Tools Chrome分片",
+    version=APP_VERSION,
+    lifespan=lifespan
+)
+
+app.include_router(tabs_proxy)
+app.include_router(contexts_proxy)
+app.include_router(fetch_proxy)
+app.include_router(aggregate_router)
+app.include_router(shards_router)
+
+
+@app.get("/")
+async def root():
+    """根端点，提供API信息"""
+    return {
+        "message": "NAS Tools Chrome Shard Router",
+        "version": APP_VERSION,
+        "docs": "/docs",
+        "endpoints": {
+            "shards": "GET /shards/",
+            "join_shard": "POST /shards/",
+            "leave_shard": "DELETE /shards/?url=<shard_url>",
+            "rebalance": "POST /shards/rebalance",
+            "status": "GET /status"
+        }
+    }
+
+
+@app.get("/status")
+async def status():
+    """健康检查端点，汇总各分片状态"""
+    results = await shard_router.fanout("GET", "/status")
+    return {
+        "status": "running",
+        "message": "NAS Tools Chrome Shard Router is running successfully",
+        "version": APP_VERSION,
+        "shards": {url: r["body"] for url, r in results.items()},
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run("src.router_main:app", host=APP_HOST, port=ROUTER_PORT, reload=False)
@@ -1,7 +1,6 @@
 """挑战检测和处理工具"""
-from typing import Tuple
+from typing import Optional
 
-from DrissionPage.items import MixTab
 from loguru import logger
 from pyquery import PyQuery
 
@@ -58,140 +57,25 @@ def under_box_challenge(html_text: str) -> bool:
     return False
 
 
-def sync_cf_retry(page: MixTab, tries: int = 5) -> Tuple[bool, bool]:
+def detect_challenge_type(html_text: str) -> Optional[str]:
     """
-    同步重试CloudFlare挑战解决
+    识别页面当前的挑战类型
     
     Args:
-        page: 浏览器页面/标签页
-        tries: 重试尝试次数
+        html_text: 要检查的HTML内容
         
     Returns:
-        Tuple[bool, bool]: (成功, 是否挑战)
+        Optional[str]: 'turnstile'、'ddos-guard'、'cloudflare'，无挑战时为None
     """
-    success = False
-    cf = True
-    user_tries = tries
-    
-    while tries > 0:
-        # 非CF网站
-        if not under_challenge(page.html):
-            success = True
-            break
-            
-        try:
-            page.wait(5)
-            if not under_challenge(page.html):
-                success = True
-                break
-                
-            cf_solution = page.ele('tag:input@name=cf-turnstile-response', timeout=3)
-            cf_wrapper = cf_solution.parent()
-            cf_iframe = cf_wrapper.shadow_root.ele("tag:iframe", timeout=3)
+    if not html_text:
+        return None
 
-            box = cf_iframe.ele('tag:body').shadow_root
-            cf_button = box.ele("tag:input")
-            cf_button.click()
-            
-        except Exception as e:
-            page.wait(1)
-            logger.debug(f"DrissionPage 错误: {e}")
-            success = False
-            
-        tries -= 1
-        
-    if tries == user_tries:
-        cf = False
-        
-    return success, cf
+    if under_box_challenge(html_text):
+        return 'turnstile'
 
+    if under_challenge(html_text):
+        page_title = PyQuery(html_text)('title').text().lower()
+        return 'ddos-guard' if 'ddos-guard' in page_title else 'cloudflare'
 
-def sync_cf_box_retry(page: MixTab, tries: int = 3) -> Tuple[bool, bool]:
-    """
-    同步重试CloudFlare盒子挑战解决
-    
-    Args:
-        page: Browser page/tab
-        tries: Number of retry attempts
-        
-    Returns:
-        Tuple[bool, bool]: (success, was_challenge)
-    """
-    success = False
-    cf = True
-    user_tries = tries
-    
-    while tries > 0:
-        # 首先等待页面加载完成
-        page.wait(5)
-        
-        # 检查是否处于挑战状态
-        if not under_box_challenge(page.html):
-            # 等待额外时间确保页面完全加载
-            page.wait(2)
-            # 再次检查挑战状态
-            if not under_box_challenge(page.html):
-                success = True
-                cf = False
-                break
-            else:
-                logger.debug("Challenge detected after additional wait")
-        
-        try:
-            # 等待cf-turnstile-response元素可用，增加超时时间
-            cf_solution = page.ele('tag:input@name=cf-turnstile-response', timeout=10)
-            if not cf_solution:
-                logger.debug("cf-turnstile-response element not found, waiting longer...")
-                page.wait(3)
-                cf_solution = page.ele('tag:input@name=cf-turnstile-response', timeout=10)
-                if not cf_solution:
-                    logger.debug("cf-turnstile-response element still not found after additional wait")
-                    # 如果找不到元素，等待更长时间再重试
-                    page.wait(5)
-                    continue
-            
-            cf_wrapper = cf_solution.parent()
-            cf_iframe = cf_wrapper.shadow_root.ele("tag:iframe", timeout=10)
+    return None
 
-            box = cf_iframe.ele('tag:body').shadow_root
-            
-            # 等待挑战按钮可用
-            cf_button = None
-            for _ in range(5):  # 最多重试5次等待按钮
-                try:
-                    cf_button = box.ele("tag:input", timeout=3)
-                    if cf_button:
-                        break
-                    page.wait(1)
-                except Exception:
-                    page.wait(1)
-            
-            if cf_button:
-                cf_button.click()
-                logger.debug("CloudFlare challenge button clicked")
-            else:
-                logger.debug("CloudFlare challenge button not found")
-                
-            # 等待挑战完成
-            for _ in range(10):  # 最多等待10秒
-                try:
-                    visibility = box.ele('tag:div@id=success').style('visibility')
-                    if visibility == 'visible':
-                        success = True
-                        logger.debug("CloudFlare challenge completed successfully")
-                        break
-                    page.wait(1)
-                except Exception:
-                    page.wait(1)
-                    
-        except Exception as e:
-            page.wait(1)
-            logger.debug(f"DrissionPage Error: {e}")
-            success = False
-            
-        tries -= 1
-        
-    if tries == user_tries:
-        cf = False
-        
-    return success, cf
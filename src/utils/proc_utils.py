@@ -0,0 +1,76 @@
+"""从/proc读取进程树资源占用的工具"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def _read_stat(pid: int) -> Optional[List[str]]:
+    """读取/proc/<pid>/stat中进程名之后的字段"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # 进程名可能包含空格和括号，从最后一个右括号之后开始解析
+    return data[data.rfind(')') + 2:].split()
+
+
+def process_tree(root_pid: int) -> List[int]:
+    """
+    获取以root_pid为根的进程树
+
+    Args:
+        root_pid: 根进程ID
+
+    Returns:
+        List[int]: 进程树中的所有进程ID（包括根进程）
+    """
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        fields = _read_stat(int(entry))
+        if fields:
+            children.setdefault(int(fields[1]), []).append(int(entry))
+
+    if not os.path.exists(f'/proc/{root_pid}'):
+        return []
+    pids = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def process_tree_usage(root_pid: int) -> Tuple[int, int, int]:
+    """
+    统计进程树的内存和CPU占用
+
+    Args:
+        root_pid: 根进程ID
+
+    Returns:
+        Tuple[int, int, int]: (RSS字节数, 累计CPU时钟滴答数, 进程数)
+    """
+    rss = 0
+    ticks = 0
+    pids = process_tree(root_pid)
+    for pid in pids:
+        fields = _read_stat(pid)
+        if fields:
+            # utime和stime分别是stat的第14、15个字段
+            ticks += int(fields[11]) + int(fields[12])
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                rss += int(f.read().split()[1]) * PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            pass
+    return rss, ticks, len(pids)
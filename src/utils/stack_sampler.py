@@ -0,0 +1,55 @@
+"""Python进程调用栈采样工具，输出火焰图使用的折叠格式"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+
+def _frame_label(frame) -> str:
+    """以函数名和定义位置标识栈帧，同一函数的不同行合并在一起"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float, thread_prefix: Optional[str] = None,
+                  stop: Optional[threading.Event] = None) -> Tuple[Counter, int]:
+    """
+    定期采样所有线程的调用栈
+
+    Args:
+        seconds: 采样时长
+        interval: 采样间隔
+        thread_prefix: 只采样名称以此开头的线程
+        stop: 设置后提前结束采样
+
+    Returns:
+        Tuple[Counter, int]: (以线程名为根、分号分隔的调用栈 -> 出现次数, 采样轮数)
+    """
+    stop = stop or threading.Event()
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    rounds = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident, f"thread-{ident}")
+            if ident == own or (thread_prefix and not name.startswith(thread_prefix)):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(name)
+            counts[';'.join(reversed(stack))] += 1
+        rounds += 1
+        if stop.wait(interval):
+            break
+    return counts, rounds
+
+
+def fold(counts: Counter) -> str:
+    """转换为flamegraph.pl / speedscope可直接读取的折叠格式"""
+    return '\n'.join(f"{stack} {count}" for stack, count in counts.most_common()) + '\n'